@@ -0,0 +1,81 @@
+"""count votes per statement
+
+Revision ID: a6c2e9f41d83
+Revises: f3a8d71c4b20
+Create Date: 2026-10-18 16:02:41.733905
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6c2e9f41d83'
+down_revision: Union[str, Sequence[str], None] = 'f3a8d71c4b20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Statement-level triggers over transition tables: a batch of votes (write-behind flushes,
+    # cascades from users/posts) updates each affected post once instead of once per vote.
+    op.execute("DROP TRIGGER votes_vote_count ON votes")
+    op.execute("DROP FUNCTION posts_vote_count_trg()")
+    op.execute("""
+        CREATE FUNCTION posts_vote_count_insert_trg() RETURNS trigger AS $$
+        BEGIN
+            UPDATE posts SET vote_count = vote_count + counts.total
+            FROM (SELECT post_id, count(*) AS total FROM new_votes GROUP BY post_id) AS counts
+            WHERE posts.id = counts.post_id;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE FUNCTION posts_vote_count_delete_trg() RETURNS trigger AS $$
+        BEGIN
+            UPDATE posts SET vote_count = vote_count - counts.total
+            FROM (SELECT post_id, count(*) AS total FROM old_votes GROUP BY post_id) AS counts
+            WHERE posts.id = counts.post_id;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER votes_vote_count_insert
+        AFTER INSERT ON votes REFERENCING NEW TABLE AS new_votes
+        FOR EACH STATEMENT EXECUTE FUNCTION posts_vote_count_insert_trg()
+    """)
+    op.execute("""
+        CREATE TRIGGER votes_vote_count_delete
+        AFTER DELETE ON votes REFERENCING OLD TABLE AS old_votes
+        FOR EACH STATEMENT EXECUTE FUNCTION posts_vote_count_delete_trg()
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER votes_vote_count_delete ON votes")
+    op.execute("DROP TRIGGER votes_vote_count_insert ON votes")
+    op.execute("DROP FUNCTION posts_vote_count_delete_trg()")
+    op.execute("DROP FUNCTION posts_vote_count_insert_trg()")
+    op.execute("""
+        CREATE FUNCTION posts_vote_count_trg() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                UPDATE posts SET vote_count = vote_count + 1 WHERE id = NEW.post_id;
+            ELSE
+                UPDATE posts SET vote_count = vote_count - 1 WHERE id = OLD.post_id;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER votes_vote_count
+        AFTER INSERT OR DELETE ON votes
+        FOR EACH ROW EXECUTE FUNCTION posts_vote_count_trg()
+    """)
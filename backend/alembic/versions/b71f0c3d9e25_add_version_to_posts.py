@@ -0,0 +1,52 @@
+"""add version to posts
+
+Revision ID: b71f0c3d9e25
+Revises: a6c2e9f41d83
+Create Date: 2026-10-18 18:11:07.412386
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b71f0c3d9e25'
+down_revision: Union[str, Sequence[str], None] = 'a6c2e9f41d83'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('posts', sa.Column('version', sa.Integer(), server_default=sa.text('1'), nullable=False))
+    # Bumped on every edit of what a post renders as; vote_count changes leave it alone,
+    # ETags combine the two
+    op.execute("""
+        CREATE FUNCTION posts_version_trg() RETURNS trigger AS $$
+        BEGIN
+            NEW.version := OLD.version + 1;
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER posts_version
+        BEFORE UPDATE OF title, content, category, published ON posts
+        FOR EACH ROW
+        WHEN ((OLD.title, OLD.content, OLD.category, OLD.published)
+              IS DISTINCT FROM (NEW.title, NEW.content, NEW.category, NEW.published))
+        EXECUTE FUNCTION posts_version_trg()
+    """)
+    # Every feed query checks whether the viewer has drafts (queries.VIEWER_HAS_DRAFTS);
+    # drafts are few, so this finds one, or none, without walking all of a user's posts
+    op.create_index('ix_posts_user_id_drafts', 'posts', ['user_id'], unique=False, postgresql_where=sa.text('NOT published'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_posts_user_id_drafts', table_name='posts', postgresql_where=sa.text('NOT published'))
+    op.execute("DROP TRIGGER posts_version ON posts")
+    op.execute("DROP FUNCTION posts_version_trg()")
+    op.drop_column('posts', 'version')
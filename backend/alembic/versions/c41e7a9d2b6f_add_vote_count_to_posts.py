@@ -0,0 +1,57 @@
+"""add vote_count to posts
+
+Revision ID: c41e7a9d2b6f
+Revises: 5994c39faa5a
+Create Date: 2026-10-18 10:12:37.415208
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41e7a9d2b6f'
+down_revision: Union[str, Sequence[str], None] = '5994c39faa5a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('posts', sa.Column('vote_count', sa.Integer(), server_default=sa.text('0'), nullable=False))
+
+    # Backfill from the existing votes before the trigger takes over
+    op.execute("""
+        UPDATE posts SET vote_count = counts.total
+        FROM (SELECT post_id, count(*) AS total FROM votes GROUP BY post_id) AS counts
+        WHERE posts.id = counts.post_id
+    """)
+
+    # Keep the counter in the same transaction as every vote insert/delete,
+    # including rows removed by ON DELETE CASCADE from users.
+    op.execute("""
+        CREATE FUNCTION posts_vote_count_trg() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                UPDATE posts SET vote_count = vote_count + 1 WHERE id = NEW.post_id;
+            ELSE
+                UPDATE posts SET vote_count = vote_count - 1 WHERE id = OLD.post_id;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER votes_vote_count
+        AFTER INSERT OR DELETE ON votes
+        FOR EACH ROW EXECUTE FUNCTION posts_vote_count_trg()
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER votes_vote_count ON votes")
+    op.execute("DROP FUNCTION posts_vote_count_trg()")
+    op.drop_column('posts', 'vote_count')
@@ -0,0 +1,98 @@
+"""add follows and timeline
+
+Revision ID: c9d4e6a2f180
+Revises: b71f0c3d9e25
+Create Date: 2026-10-18 19:24:52.108634
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c9d4e6a2f180'
+down_revision: Union[str, Sequence[str], None] = 'b71f0c3d9e25'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('follower_count', sa.Integer(), server_default=sa.text('0'), nullable=False))
+    # the few accounts big enough to be pulled at read time instead of fanned out
+    op.create_index(op.f('ix_users_follower_count'), 'users', ['follower_count'], unique=False)
+    op.create_table('follows',
+    sa.Column('follower_id', sa.Integer(), nullable=False),
+    sa.Column('followee_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.CheckConstraint('follower_id <> followee_id', name='follows_not_self'),
+    sa.ForeignKeyConstraint(['followee_id'], ['users.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['follower_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('follower_id', 'followee_id')
+    )
+    # fan-out reads an author's followers
+    op.create_index(op.f('ix_follows_followee_id'), 'follows', ['followee_id'], unique=False)
+    op.create_table('timeline',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('post_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['post_id'], ['posts.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'post_id')
+    )
+    # a deleted post cascades to every timeline it was fanned out to
+    op.create_index(op.f('ix_timeline_post_id'), 'timeline', ['post_id'], unique=False)
+    # (user_id, id) serves everything ix_posts_user_id did, and also one author's newest
+    # posts in order, which is how followers pull posts that weren't fanned out
+    op.drop_index(op.f('ix_posts_user_id'), table_name='posts')
+    op.create_index('ix_posts_user_id_id', 'posts', ['user_id', 'id'], unique=False)
+
+    # Same statement-level counting as votes_vote_count_*: a cascade from a deleted user
+    # updates each affected account once
+    op.execute("""
+        CREATE FUNCTION users_follower_count_insert_trg() RETURNS trigger AS $$
+        BEGIN
+            UPDATE users SET follower_count = follower_count + counts.total
+            FROM (SELECT followee_id, count(*) AS total FROM new_follows GROUP BY followee_id) AS counts
+            WHERE users.id = counts.followee_id;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE FUNCTION users_follower_count_delete_trg() RETURNS trigger AS $$
+        BEGIN
+            UPDATE users SET follower_count = follower_count - counts.total
+            FROM (SELECT followee_id, count(*) AS total FROM old_follows GROUP BY followee_id) AS counts
+            WHERE users.id = counts.followee_id;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER follows_follower_count_insert
+        AFTER INSERT ON follows REFERENCING NEW TABLE AS new_follows
+        FOR EACH STATEMENT EXECUTE FUNCTION users_follower_count_insert_trg()
+    """)
+    op.execute("""
+        CREATE TRIGGER follows_follower_count_delete
+        AFTER DELETE ON follows REFERENCING OLD TABLE AS old_follows
+        FOR EACH STATEMENT EXECUTE FUNCTION users_follower_count_delete_trg()
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER follows_follower_count_delete ON follows")
+    op.execute("DROP TRIGGER follows_follower_count_insert ON follows")
+    op.execute("DROP FUNCTION users_follower_count_delete_trg()")
+    op.execute("DROP FUNCTION users_follower_count_insert_trg()")
+    op.drop_index('ix_posts_user_id_id', table_name='posts')
+    op.create_index(op.f('ix_posts_user_id'), 'posts', ['user_id'], unique=False)
+    op.drop_index(op.f('ix_timeline_post_id'), table_name='timeline')
+    op.drop_table('timeline')
+    op.drop_index(op.f('ix_follows_followee_id'), table_name='follows')
+    op.drop_table('follows')
+    op.drop_index(op.f('ix_users_follower_count'), table_name='users')
+    op.drop_column('users', 'follower_count')
@@ -0,0 +1,45 @@
+"""add hot score to posts
+
+Revision ID: d5b8a3f7c612
+Revises: c9d4e6a2f180
+Create Date: 2026-10-18 21:03:16.529471
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5b8a3f7c612'
+down_revision: Union[str, Sequence[str], None] = 'c9d4e6a2f180'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Votes decayed by age without depending on the current time: each doubling of votes is
+    # worth 12 hours of recency, so a post ranks level with one posted 12 hours later that
+    # has half its votes. Rankings then never go stale and the score only changes with
+    # vote_count, in the same UPDATE the votes_vote_count_* triggers already make.
+    # extract(epoch) of a timestamptz doesn't depend on the session time zone, so the
+    # function can be declared immutable, which a generated column requires.
+    op.execute("""
+        CREATE FUNCTION posts_hot_score(vote_count integer, created_at timestamptz) RETURNS double precision
+        AS $$
+            SELECT ln(greatest(vote_count, 1)) / ln(2)
+                   + CAST(extract(epoch FROM created_at) AS double precision) / 43200
+        $$ LANGUAGE sql IMMUTABLE PARALLEL SAFE
+    """)
+    op.add_column('posts', sa.Column('hot_score', sa.Double(), sa.Computed('posts_hot_score(vote_count, created_at)', persisted=True), nullable=True))
+    # GET /posts/trending walks this backwards from the top
+    op.create_index('ix_posts_published_hot_score', 'posts', ['hot_score', 'id'], unique=False, postgresql_where=sa.text('published'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_posts_published_hot_score', table_name='posts', postgresql_where=sa.text('published'))
+    op.drop_column('posts', 'hot_score')
+    op.execute("DROP FUNCTION posts_hot_score(integer, timestamptz)")
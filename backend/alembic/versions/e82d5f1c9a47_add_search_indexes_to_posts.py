@@ -0,0 +1,40 @@
+"""add search indexes to posts
+
+Revision ID: e82d5f1c9a47
+Revises: c41e7a9d2b6f
+Create Date: 2026-10-18 11:03:52.190344
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e82d5f1c9a47'
+down_revision: Union[str, Sequence[str], None] = 'c41e7a9d2b6f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.add_column('posts', sa.Column(
+        'search_vector', postgresql.TSVECTOR(),
+        sa.Computed("to_tsvector('english', title || ' ' || content)", persisted=True)
+    ))
+    op.create_index('ix_posts_search_vector', 'posts', ['search_vector'], unique=False, postgresql_using='gin')
+    op.create_index(
+        'ix_posts_title_trgm', 'posts', ['title'], unique=False,
+        postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'}
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_posts_title_trgm', table_name='posts', postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'})
+    op.drop_index('ix_posts_search_vector', table_name='posts', postgresql_using='gin')
+    op.drop_column('posts', 'search_vector')
@@ -0,0 +1,35 @@
+"""add secondary indexes
+
+Revision ID: f3a8d71c4b20
+Revises: e82d5f1c9a47
+Create Date: 2026-10-18 14:26:07.518236
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a8d71c4b20'
+down_revision: Union[str, Sequence[str], None] = 'e82d5f1c9a47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # votes' primary key leads with user_id, so lookups and cascades by post_id need their own index
+    op.create_index(op.f('ix_votes_post_id'), 'votes', ['post_id'], unique=False)
+    # "my posts" half of the feed filter, and cascading deletes from users
+    op.create_index(op.f('ix_posts_user_id'), 'posts', ['user_id'], unique=False)
+    # "published" half of the feed filter, already in feed (id) order
+    op.create_index('ix_posts_published_id', 'posts', ['id'], unique=False, postgresql_where=sa.text('published'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_posts_published_id', table_name='posts', postgresql_where=sa.text('published'))
+    op.drop_index(op.f('ix_posts_user_id'), table_name='posts')
+    op.drop_index(op.f('ix_votes_post_id'), table_name='votes')
@@ -0,0 +1,136 @@
+import asyncio
+import math
+import time
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from . import cache, oauth2
+from .config import settings
+
+# Admission control, in front of routing:
+# - RateLimitMiddleware: token buckets per user id (from the JWT `sub`) and per client IP,
+#   with separate budgets for /login, writes and reads. Over budget -> 429 + Retry-After.
+# - LoadSheddingMiddleware: at most `max_concurrent_requests` requests are served at once;
+#   the rest queue, and one that waits longer than `max_queue_wait_ms` gets a 503 instead
+#   of adding to a latency spiral that would eventually time everyone out.
+# Both are per worker process. Metrics scrapes and the root health check are exempt.
+
+EXEMPT_PATHS = ("/", "/metrics", "/metrics/pool")
+READ_METHODS = ("GET", "HEAD", "OPTIONS")
+
+def _exempt(scope) -> bool:
+    return scope["type"] != "http" or scope["path"] in EXEMPT_PATHS
+
+def _request_kind(scope) -> str:
+    if scope["path"] == "/login":
+        return "login"
+    return "read" if scope["method"] in READ_METHODS else "write"
+
+def _per_minute(kind: str) -> float:
+    return {
+        "login": settings.rate_limit_login_per_minute,
+        "write": settings.rate_limit_write_per_minute,
+        "read": settings.rate_limit_read_per_minute,
+    }[kind]
+
+# Verified user id of a bearer token, or None for anonymous/invalid (the route rejects those itself)
+def _user_id(scope) -> int | None:
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() != "bearer":
+                return None
+            try:
+                return oauth2.decode_user_id(token)
+            except HTTPException:
+                return None
+    return None
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, capacity: float):
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    # Take a token if there is one; otherwise return the seconds until there will be
+    def take(self, rate: float, capacity: float) -> float:
+        now = time.monotonic()
+        self.tokens = min(capacity, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / rate
+
+def _error(status_code: int, detail: str, retry_after: float) -> JSONResponse:
+    return JSONResponse(
+        status_code=status_code, content={"detail": detail},
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+    )
+
+class RateLimitMiddleware:
+    def __init__(self, app):
+        self.app = app
+        # An idle bucket refills completely within burst seconds, so dropping it then loses nothing
+        self.buckets = cache.TTLCache(maxsize=100_000, ttl=settings.rate_limit_burst_seconds)
+
+    def _wait(self, key: str, per_minute: float) -> float:
+        rate = per_minute / 60
+        capacity = max(1.0, rate * settings.rate_limit_burst_seconds)
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(capacity)
+        wait = bucket.take(rate, capacity)
+        self.buckets.set(key, bucket)
+        return wait
+
+    async def __call__(self, scope, receive, send):
+        if not settings.rate_limit_enabled or _exempt(scope):
+            await self.app(scope, receive, send)
+            return
+
+        kind = _request_kind(scope)
+        per_minute = _per_minute(kind)
+        if per_minute > 0:
+            client = scope.get("client")
+            ip = client[0] if client else "unknown"
+            # an IP may front many users (NAT, offices), so it gets a multiple of one user's budget
+            wait = self._wait(f"{kind}:ip:{ip}", per_minute * settings.rate_limit_ip_multiplier)
+            user_id = _user_id(scope) if kind != "login" else None
+            if user_id is not None:
+                wait = max(wait, self._wait(f"{kind}:user:{user_id}", per_minute))
+            if wait > 0:
+                await _error(429, "Too many requests", wait)(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+class LoadSheddingMiddleware:
+    def __init__(self, app):
+        self.app = app
+        self._slots = None
+        self._loop = None
+
+    # asyncio primitives belong to one event loop; recreate if the app moves to another (tests)
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._slots = asyncio.Semaphore(settings.max_concurrent_requests)
+            self._loop = loop
+        return self._slots
+
+    async def __call__(self, scope, receive, send):
+        if settings.max_concurrent_requests <= 0 or _exempt(scope):
+            await self.app(scope, receive, send)
+            return
+
+        slots = self._semaphore()
+        try:
+            async with asyncio.timeout(settings.max_queue_wait_ms / 1000):
+                await slots.acquire()
+        except TimeoutError:
+            await _error(503, "Server busy, try again shortly", 1)(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            slots.release()
@@ -0,0 +1,32 @@
+from sqlalchemy import insert
+from . import models
+
+# Bulk post inserts for POST /posts/batch, all inside the caller's transaction.
+# Up to `post_batch_copy_threshold` rows go through a multi-row INSERT .. RETURNING;
+# bigger batches are streamed with COPY, which can't return ids, so those are
+# reserved from the sequence up front.
+
+COPY_POSTS = "COPY posts (id, title, content, category, published, user_id) FROM STDIN"
+RESERVE_POST_IDS = "SELECT nextval(pg_get_serial_sequence('posts', 'id')) FROM generate_series(1, %s)"
+
+def insert_posts_statement():
+    return insert(models.Post).returning(models.Post.id, sort_by_parameter_order=True)
+
+def _copy_row(post_id: int, row: dict) -> tuple:
+    return (post_id, row["title"], row["content"], row["category"], row["published"], row["user_id"])
+
+# `conn` is the session's psycopg connection: db.connection().connection.driver_connection
+def copy_posts(conn, rows: list[dict]) -> list[int]:
+    ids = [post_id for (post_id,) in conn.execute(RESERVE_POST_IDS, (len(rows),))]
+    with conn.cursor() as cur, cur.copy(COPY_POSTS) as copy:
+        for post_id, row in zip(ids, rows):
+            copy.write_row(_copy_row(post_id, row))
+    return ids
+
+async def copy_posts_async(conn, rows: list[dict]) -> list[int]:
+    ids = [post_id for (post_id,) in await (await conn.execute(RESERVE_POST_IDS, (len(rows),))).fetchall()]
+    async with conn.cursor() as cur:
+        async with cur.copy(COPY_POSTS) as copy:
+            for post_id, row in zip(ids, rows):
+                await copy.write_row(_copy_row(post_id, row))
+    return ids
@@ -0,0 +1,54 @@
+from typing import NamedTuple
+from . import cache
+from .config import settings
+
+# Total counts for GET /posts and GET /users, sent when a client asks for them with
+# ?count=true. count(*) over a large table reads every row it counts, so the planner's row
+# estimate for the list's filter (EXPLAIN, from pg_class.reltuples and column statistics)
+# comes first: up to total_count_exact_max rows the list is counted exactly, beyond that
+# the estimate is the answer. X-Total-Count-Exact tells clients which one they got.
+#
+# Totals are cached per filter for total_count_ttl seconds in each worker and are not
+# invalidated by writes; a count is a hint for a pager, not a figure to reconcile against.
+
+TOTAL_COUNT_HEADER = "X-Total-Count"
+TOTAL_COUNT_EXACT_HEADER = "X-Total-Count-Exact"
+
+class TotalCount(NamedTuple):
+    value: int
+    exact: bool
+
+    def headers(self) -> dict:
+        return {TOTAL_COUNT_HEADER: str(self.value), TOTAL_COUNT_EXACT_HEADER: "true" if self.exact else "false"}
+
+totals = cache.TTLCache(maxsize=settings.total_count_cache_size, ttl=settings.total_count_ttl)
+
+# Rows the top plan node of an EXPLAIN (FORMAT JSON) result is expected to return
+def _planner_rows(plan) -> int:
+    return round(plan[0]["Plan"]["Plan Rows"])
+
+# `statements` from queries.*_COUNT_STATEMENTS; `key` identifies the filter in `params`
+def total_count(db, key: tuple, statements, params: dict) -> TotalCount:
+    count = totals.get(key)
+    if count is None:
+        plan = db.connection().exec_driver_sql(statements.explain, {**statements.fixed_params, **params}).scalar_one()
+        rows = _planner_rows(plan)
+        if rows > settings.total_count_exact_max:
+            count = TotalCount(rows, exact=False)
+        else:
+            count = TotalCount(db.execute(statements.exact, params).scalar_one(), exact=True)
+        totals.set(key, count)
+    return count
+
+async def total_count_async(db, key: tuple, statements, params: dict) -> TotalCount:
+    count = totals.get(key)
+    if count is None:
+        connection = await db.connection()
+        plan = (await connection.exec_driver_sql(statements.explain, {**statements.fixed_params, **params})).scalar_one()
+        rows = _planner_rows(plan)
+        if rows > settings.total_count_exact_max:
+            count = TotalCount(rows, exact=False)
+        else:
+            count = TotalCount((await db.execute(statements.exact, params)).scalar_one(), exact=True)
+        totals.set(key, count)
+    return count
@@ -1,6 +1,9 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker, declarative_base
-from . import config
+from sqlalchemy.pool import NullPool
+from . import config, instrumentation
+from .pool import InstrumentedQueuePool, InstrumentedAsyncQueuePool
 
 
 # Instead of connecting via db driver like
@@ -10,7 +13,29 @@ from . import config
 # create a database URL like
 # SQLALCHEMY_DATABASE_URL = 'postgresql://<username>:<password>@<ip-addr (or) hostname>/<dbname>'
 
-engine = create_engine(url=config.db_url) # Engine = connection manager.
+# Pool options from Settings. In PgBouncer transaction mode PgBouncer is the pool:
+# open a fresh connection per checkout and never use server-side prepared statements,
+# since consecutive transactions may land on different server connections.
+# Otherwise statements repeated on a connection (the ones in queries.py) are prepared
+# after `db_prepare_threshold` executions, so Postgres parses and plans them only once.
+def engine_options(poolclass) -> dict:
+    settings = config.settings
+    if settings.db_pgbouncer:
+        return {"poolclass": NullPool, "connect_args": {"prepare_threshold": None}}
+    prepare_threshold = settings.db_prepare_threshold if settings.db_prepare_threshold >= 0 else None
+    return {
+        "poolclass": poolclass,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+        "connect_args": {"prepare_threshold": prepare_threshold},
+    }
+
+engine = create_engine(url=config.db_url, **engine_options(InstrumentedQueuePool)) # Engine = connection manager.
+
+instrumentation.instrument_engine(engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine) # This line creates a factory that can make Sessions.
 
@@ -22,4 +47,16 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# Async mode (settings.db_async): the same psycopg driver, awaited on the event loop instead of
+# holding a threadpool worker for the whole round-trip. Nothing connects until first use.
+async_engine = create_async_engine(url=config.db_url, **engine_options(InstrumentedAsyncQueuePool))
+instrumentation.instrument_engine(async_engine.sync_engine)
+
+# expire_on_commit=False: async code can't lazy-load expired attributes after a commit
+AsyncSessionLocal = async_sessionmaker(autoflush=False, expire_on_commit=False, bind=async_engine)
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,11 +1,22 @@
 from typing import Annotated
 from fastapi import Depends
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from .database import get_db
-from . import oauth2, models
+from .database import get_db, get_async_db
+from . import oauth2, schemas, replicas
 
 DBSession = Annotated[Session, Depends(get_db)]
-CurrentUser = Annotated[models.User, Depends(oauth2.get_current_user)]
+# Read-only routes: a replica when one is healthy and the caller hasn't just written
+ReadDBSession = Annotated[Session, Depends(replicas.get_read_db)]
+# Routes that write; resolving it keeps the user's reads on the primary for a while
+CurrentUser = Annotated[schemas.UserResponse, Depends(replicas.get_writing_user)]
+TokenUser = Annotated[schemas.TokenUser | schemas.UserResponse, Depends(oauth2.get_token_user)]
 PasswordRequestForm = Annotated[OAuth2PasswordRequestForm, Depends()]
+
+# Async mode (routers/aio)
+AsyncDBSession = Annotated[AsyncSession, Depends(get_async_db)]
+AsyncReadDBSession = Annotated[AsyncSession, Depends(replicas.get_read_db_async)]
+AsyncCurrentUser = Annotated[schemas.UserResponse, Depends(replicas.get_writing_user_async)]
+AsyncTokenUser = Annotated[schemas.TokenUser | schemas.UserResponse, Depends(oauth2.get_token_user_async)]
@@ -0,0 +1,39 @@
+import hashlib
+from fastapi import Response
+
+# Strong ETags for post responses, computed from the selected row(s) before anything is
+# serialized. A post's rendered JSON changes only when its `version` (bumped by the
+# posts_version trigger on edits), its vote_count or its owner's email does, so those
+# fields identify the representation. A matching If-None-Match gets an empty 304.
+
+# Responses depend on who is asking, so only the client may keep them, and must revalidate
+CACHE_HEADERS = {"Cache-Control": "private, no-cache"}
+
+def _etag(parts: list) -> str:
+    return '"' + hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest() + '"'
+
+# Rows selected with queries.POST_WITH_VOTES_COLUMNS
+def _post_key(row) -> tuple:
+    return (row.id, row.version, row.vote_count, row.owner_email)
+
+def post_etag(row) -> str:
+    return _etag([_post_key(row)])
+
+def page_etag(rows, next_cursor: str | None) -> str:
+    return _etag([_post_key(row) for row in rows] + [next_cursor])
+
+# If-None-Match uses weak comparison: W/ prefixes are ignored, and * matches anything
+def matches(if_none_match: str | None, etag: str) -> bool:
+    if if_none_match is None:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+def headers(etag: str, extra: dict | None = None) -> dict:
+    return {"ETag": etag, **CACHE_HEADERS, **(extra or {})}
+
+def not_modified(headers: dict) -> Response:
+    return Response(status_code=304, headers=headers)
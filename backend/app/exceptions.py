@@ -4,4 +4,42 @@ credentials_exception = HTTPException(
     status_code=status.HTTP_401_UNAUTHORIZED,
     detail="Could not validate credentials",
     headers={"WWW-Authenticate": "Bearer"}
-)
\ No newline at end of file
+)
+
+invalid_cursor_exception = HTTPException(
+    status_code=status.HTTP_400_BAD_REQUEST,
+    detail="Invalid cursor"
+)
+
+
+hashing_busy_exception = HTTPException(
+    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+    detail="Server busy, try again shortly",
+    headers={"Retry-After": "1"}
+)
+
+post_not_found_exception = HTTPException(
+    status_code=status.HTTP_404_NOT_FOUND,
+    detail="Post not found"
+)
+
+vote_buffer_full_exception = HTTPException(
+    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+    detail="Server busy, try again shortly",
+    headers={"Retry-After": "1"}
+)
+
+user_not_found_exception = HTTPException(
+    status_code=status.HTTP_404_NOT_FOUND,
+    detail="User not found"
+)
+
+cannot_follow_self_exception = HTTPException(
+    status_code=status.HTTP_400_BAD_REQUEST,
+    detail="You cannot follow yourself"
+)
+
+invalid_refresh_token_exception = HTTPException(
+    status_code=status.HTTP_401_UNAUTHORIZED,
+    detail="Invalid refresh token"
+)
@@ -0,0 +1,79 @@
+import csv
+import io
+import zlib
+from typing import Literal
+from pydantic_core import to_json
+
+# Streaming exports. Rows come off a server-side cursor (`yield_per`) one partition at
+# a time; each partition is encoded and handed to the StreamingResponse before the next
+# is fetched, so memory stays flat however large the table is.
+
+EXPORT_CHUNK_ROWS = 1000
+
+ExportFormat = Literal["ndjson", "csv"]
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+CSV_MEDIA_TYPE = "text/csv"
+
+def ndjson_chunk(rows, to_dict) -> bytes:
+    return b"".join(to_json(to_dict(row)) + b"\n" for row in rows)
+
+def _csv(rows) -> bytes:
+    out = io.StringIO()
+    csv.writer(out).writerows(rows)
+    return out.getvalue().encode()
+
+def csv_header(columns: list[str]) -> bytes:
+    return _csv([columns])
+
+def csv_chunk(rows, columns: list[str]) -> bytes:
+    return _csv([getattr(row, column) for column in columns] for row in rows)
+
+# (encode, prefix, media type) for writing rows as `format`: NDJSON objects shaped by
+# `to_dict`, or CSV with a header row of `columns`
+def encoder(format: ExportFormat, to_dict, columns: list[str]):
+    if format == "csv":
+        return (lambda rows: csv_chunk(rows, columns)), csv_header(columns), CSV_MEDIA_TYPE
+    return (lambda rows: ndjson_chunk(rows, to_dict)), b"", NDJSON_MEDIA_TYPE
+
+# One encoded chunk per partition, after an optional `prefix` such as a CSV header
+def encode_partitions(partitions, encode, prefix: bytes = b""):
+    if prefix:
+        yield prefix
+    for rows in partitions:
+        yield encode(rows)
+
+async def encode_partitions_async(partitions, encode, prefix: bytes = b""):
+    if prefix:
+        yield prefix
+    async for rows in partitions:
+        yield encode(rows)
+
+def attachment(filename: str) -> dict:
+    return {"Content-Disposition": f'attachment; filename="{filename}"'}
+
+# gzip each chunk with a sync flush, so whatever part of the stream a client received
+# before a dropped connection still decompresses (and it can resume from the last id)
+def gzip_chunks(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+async def gzip_chunks_async(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    async for chunk in chunks:
+        yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+def accepts_gzip(accept_encoding: str | None) -> bool:
+    for coding in (accept_encoding or "").lower().split(","):
+        name, _, params = coding.partition(";")
+        if name.strip() == "gzip":
+            try:
+                return not params or float(params.strip().removeprefix("q=")) > 0
+            except ValueError:
+                return False
+    return False
+
+GZIP_HEADERS = {"Content-Encoding": "gzip", "Vary": "Accept-Encoding"}
@@ -0,0 +1,84 @@
+import threading
+from fastapi import Response
+from pydantic_core import to_json
+from . import cache, etags, pagination, serialization
+from .config import settings
+
+# Rendered GET /posts pages, shared by every caller who would get the same page, keyed by
+# (limit, offset, cursor, search). Callers with unpublished posts of their own see those
+# in their feed too, so their pages are neither served from nor stored in the cache; the
+# feed query reports this as `viewer_has_drafts`, and a caller is served cached pages only
+# once a query has shown they have none.
+#
+# Every write that can change a page (post create/update/delete, votes, user edits) calls
+# invalidate() after committing, which bumps the version that all entries are keyed by.
+# A request remembers the version from before its query, so a page read just before a
+# write is never stored as current. Like the other in-process caches this only reaches
+# the current worker; feed_cache_ttl bounds how stale other workers' pages can get.
+
+class Page:
+    __slots__ = ("etag", "next_cursor", "_rows", "_body")
+
+    def __init__(self, rows, next_cursor: str | None):
+        self.etag = etags.page_etag(rows, next_cursor)
+        self.next_cursor = next_cursor
+        self._rows = rows
+        self._body = None
+
+    # Serialized on first use, so a 304 never pays for it
+    def body(self) -> bytes:
+        if self._body is None:
+            self._body = to_json([serialization.post_with_votes(row) for row in self._rows])
+            self._rows = None
+        return self._body
+
+    def response(self, if_none_match: str | None) -> Response:
+        extra = {pagination.NEXT_CURSOR_HEADER: self.next_cursor} if self.next_cursor is not None else None
+        headers = etags.headers(self.etag, extra)
+        if etags.matches(if_none_match, self.etag):
+            return etags.not_modified(headers)
+        return Response(content=self.body(), media_type="application/json", headers=headers)
+
+class FeedCache:
+    def __init__(self, maxsize: int, ttl: float):
+        self.pages = cache.TTLCache(maxsize=maxsize, ttl=ttl)
+        # user id -> (has unpublished posts, version when that was read)
+        self.draft_authors = cache.TTLCache(maxsize=settings.user_cache_size, ttl=ttl)
+        # user id -> version of their last post write; older draft_authors entries don't count
+        self.author_versions = cache.TTLCache(maxsize=settings.user_cache_size, ttl=ttl)
+        self.version = 0
+        self._lock = threading.Lock()
+
+    # `author_id`: whose posts were written, since that may change whether they have drafts
+    def invalidate(self, author_id: int | None = None):
+        with self._lock:
+            self.version += 1
+            if author_id is not None:
+                self.author_versions.set(author_id, self.version)
+        self.pages.clear()
+
+    def _sees_public_feed(self, user_id: int) -> bool:
+        drafts = self.draft_authors.get(user_id)
+        if drafts is None:
+            return False
+        has_drafts, as_of = drafts
+        return not has_drafts and as_of >= self.author_versions.get(user_id, 0)
+
+    def get(self, user_id: int, key: tuple) -> Page | None:
+        version = self.version
+        if not self._sees_public_feed(user_id):
+            return None
+        return self.pages.get((version, *key))
+
+    # `rows` came from a feed statement run while `version` was current
+    def set(self, version: int, user_id: int, key: tuple, rows, page: Page):
+        if not rows:
+            return
+        has_drafts = rows[0].viewer_has_drafts
+        if version >= self.author_versions.get(user_id, 0):
+            self.draft_authors.set(user_id, (has_drafts, version))
+        if not has_drafts:
+            page.body()
+            self.pages.set((version, *key), page)
+
+feed_cache = FeedCache(maxsize=settings.feed_cache_size, ttl=settings.feed_cache_ttl)
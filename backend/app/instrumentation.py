@@ -0,0 +1,185 @@
+import logging
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from sqlalchemy import event
+from starlette.routing import Match
+from .config import settings
+
+# Per-route request metrics, per-request database timing and a slow-query log.
+# MetricsMiddleware times every request and keeps Prometheus-style series per route
+# template (e.g. "/posts/{id}"); engine events add each statement's count and duration
+# to the request it ran for, which is also reported back in a Server-Timing header.
+# Everything is per worker process; Prometheus sums across workers when scraping each.
+
+logger = logging.getLogger("app.slow_query")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+UNMATCHED_ROUTE = "unmatched"
+# Clients can send any method name; anything else shares one label, so they can't add series
+STANDARD_METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "DELETE", "CONNECT", "OPTIONS", "TRACE", "PATCH"})
+OTHER_METHOD = "OTHER"
+
+@dataclass
+class RequestStats:
+    route: str
+    statements: int = 0
+    db_seconds: float = 0.0
+    slow_queries: int = 0
+
+@dataclass
+class RouteMetrics:
+    bucket_counts: list[int] = field(default_factory=lambda: [0] * len(LATENCY_BUCKETS))
+    seconds_sum: float = 0.0
+    count: int = 0
+    in_flight: int = 0
+    statuses: dict[int, int] = field(default_factory=dict)
+    db_statements: int = 0
+    db_seconds: float = 0.0
+    slow_queries: int = 0
+
+    def observe(self, seconds: float, status: int, stats: RequestStats):
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                self.bucket_counts[i] += 1
+                break
+        self.seconds_sum += seconds
+        self.count += 1
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        self.db_statements += stats.statements
+        self.db_seconds += stats.db_seconds
+        self.slow_queries += stats.slow_queries
+
+# (method, route template) -> metrics; only touched from the event loop thread
+routes: dict[tuple[str, str], RouteMetrics] = {}
+
+# Set for the duration of each request. Sync routes run in a threadpool with a copy of
+# the context, so their statements still find (and add to) the same RequestStats.
+current_request: ContextVar[RequestStats | None] = ContextVar("current_request", default=None)
+
+def _method(scope) -> str:
+    return scope["method"] if scope["method"] in STANDARD_METHODS else OTHER_METHOD
+
+def _route_template(app, scope) -> str:
+    for route in app.router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    return UNMATCHED_ROUTE
+
+def _server_timing(stats: RequestStats, seconds: float) -> bytes:
+    return (
+        f'db;dur={stats.db_seconds * 1000:.2f};desc="{stats.statements} statements", '
+        f"app;dur={seconds * 1000:.2f}"
+    ).encode()
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        key = (_method(scope), _route_template(scope["app"], scope))
+        metrics = routes.setdefault(key, RouteMetrics())
+        stats = RequestStats(route=key[1])
+        token = current_request.set(stats)
+        status = 500
+        start = time.perf_counter()
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", _server_timing(stats, time.perf_counter() - start)))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        metrics.in_flight += 1
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            metrics.in_flight -= 1
+            metrics.observe(time.perf_counter() - start, status, stats)
+            current_request.reset(token)
+
+# Statement hooks
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    seconds = time.perf_counter() - conn.info["query_start"].pop()
+    stats = current_request.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.db_seconds += seconds
+    if settings.slow_query_ms and seconds * 1000 >= settings.slow_query_ms:
+        route = "-"
+        if stats is not None:
+            stats.slow_queries += 1
+            route = stats.route
+        logger.warning("slow query: %.1f ms on %s\n%s", seconds * 1000, route, statement)
+
+def _handle_error(context):
+    # a failed statement never reaches after_cursor_execute
+    starts = context.connection.info.get("query_start") if context.connection is not None else None
+    if starts:
+        starts.pop()
+
+def instrument_engine(engine):
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+# Prometheus text exposition (format 0.0.4)
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{name}="{value}"' for name, value in labels.items()) + "}"
+
+def render_prometheus(pools: dict[str, dict]) -> str:
+    lines = [
+        "# HELP http_request_duration_seconds Request latency by route.",
+        "# TYPE http_request_duration_seconds histogram",
+    ]
+    for (method, route), metrics in sorted(routes.items()):
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS, metrics.bucket_counts):
+            cumulative += count
+            lines.append(f"http_request_duration_seconds_bucket{_labels(method=method, route=route, le=bound)} {cumulative}")
+        lines.append(f"http_request_duration_seconds_bucket{_labels(method=method, route=route, le='+Inf')} {metrics.count}")
+        lines.append(f"http_request_duration_seconds_sum{_labels(method=method, route=route)} {metrics.seconds_sum}")
+        lines.append(f"http_request_duration_seconds_count{_labels(method=method, route=route)} {metrics.count}")
+
+    series = [
+        ("http_requests_in_flight", "gauge", "Requests currently being served.", lambda m: m.in_flight),
+        ("http_request_db_statements_total", "counter", "SQL statements executed while serving requests.", lambda m: m.db_statements),
+        ("http_request_db_seconds_total", "counter", "Time spent in SQL statements while serving requests.", lambda m: m.db_seconds),
+        ("http_request_slow_queries_total", "counter", "Statements slower than SLOW_QUERY_MS.", lambda m: m.slow_queries),
+    ]
+    for name, kind, help_text, value in series:
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+        for (method, route), metrics in sorted(routes.items()):
+            lines.append(f"{name}{_labels(method=method, route=route)} {value(metrics)}")
+
+    lines += ["# HELP http_requests_total Responses by route and status code.", "# TYPE http_requests_total counter"]
+    for (method, route), metrics in sorted(routes.items()):
+        for status, count in sorted(metrics.statuses.items()):
+            lines.append(f"http_requests_total{_labels(method=method, route=route, status=status)} {count}")
+
+    pool_series = [
+        ("db_pool_checked_out", "gauge", "checked_out"),
+        ("db_pool_overflow", "gauge", "overflow"),
+        ("db_pool_checkouts_total", "counter", "checkouts"),
+        ("db_pool_timeouts_total", "counter", "timeouts"),
+        ("db_pool_wait_seconds_total", "counter", "wait_seconds_total"),
+    ]
+    for name, kind, key in pool_series:
+        lines += [f"# TYPE {name} {kind}"]
+        for engine, status in pools.items():
+            if key in status:
+                lines.append(f"{name}{_labels(engine=engine)} {status[key]}")
+    return "\n".join(lines) + "\n"
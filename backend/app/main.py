@@ -1,7 +1,21 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 # from .database import engine, Base
-from .routers import post, user, auth, vote
+from .pagination import NEXT_CURSOR_HEADER
+from .counts import TOTAL_COUNT_HEADER, TOTAL_COUNT_EXACT_HEADER
+from .config import settings
+from .instrumentation import MetricsMiddleware
+from .admission import RateLimitMiddleware, LoadSheddingMiddleware
+from . import utils, replicas
+from .vote_buffer import vote_buffer
+from .routers import metrics
+
+if settings.db_async:
+    from .routers.aio import post, user, auth, vote, feed
+else:
+    from .routers import post, user, auth, vote, feed
 
 # Base.metadata.create_all(bind=engine)
 
@@ -9,20 +23,47 @@ origins = [
     "*"
 ]
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    monitor = None
+    if replicas.replica_set.replicas:
+        await replicas.replica_set.check_all()
+        monitor = asyncio.create_task(replicas.replica_set.monitor())
+    flusher = None
+    if settings.vote_write_behind:
+        flusher = asyncio.create_task(vote_buffer.run(settings.vote_flush_interval_ms / 1000))
+    yield
+    if monitor is not None:
+        monitor.cancel()
+    if flusher is not None:
+        flusher.cancel()
+        # votes already answered with 202 must still be written
+        await asyncio.to_thread(vote_buffer.flush)
+    if utils.hash_pool is not None:
+        utils.hash_pool.shutdown()
+
+app = FastAPI(lifespan=lifespan)
 
+# Outermost last: metrics see every response, CORS headers go on 429/503s too,
+# and rate-limited clients are rejected before they take a concurrency slot
+app.add_middleware(LoadSheddingMiddleware)
+app.add_middleware(RateLimitMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER, TOTAL_COUNT_EXACT_HEADER, "Server-Timing", "ETag"],
 )
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(post.router)
 app.include_router(user.router)
 app.include_router(auth.router)
 app.include_router(vote.router)
+app.include_router(feed.router)
+app.include_router(metrics.router)
 
 @app.get("/")
 def read_root():
@@ -1,5 +1,6 @@
 from .database import Base
-from sqlalchemy import Column, Integer, String, Boolean, TIMESTAMP, text, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, Double, TIMESTAMP, text, ForeignKey, Computed, Index, CheckConstraint, LargeBinary, Uuid
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import relationship
 
 class User(Base):
@@ -8,6 +9,7 @@ class User(Base):
     email = Column(String, nullable=False, unique=True, index=True)
     password = Column(String, nullable=False)
     created_at = Column(TIMESTAMP(timezone=True), server_default=text('now()'), nullable=False)
+    follower_count = Column(Integer, server_default=text("0"), nullable=False, index=True) # maintained by the follows_follower_count_* triggers
 
 class Post(Base):
     __tablename__ = 'posts'
@@ -18,9 +20,53 @@ class Post(Base):
     published = Column(Boolean, server_default=text("true"), nullable=False)
     created_at = Column(TIMESTAMP(timezone=True), server_default=text('now()'), nullable=False)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    vote_count = Column(Integer, server_default=text("0"), nullable=False) # maintained by the votes_vote_count_* triggers
+    version = Column(Integer, server_default=text("1"), nullable=False) # bumped by the posts_version trigger on edits
+    search_vector = Column(TSVECTOR, Computed("to_tsvector('english', title || ' ' || content)", persisted=True))
+    # votes decayed by age, for GET /posts/trending (see the posts_hot_score SQL function)
+    hot_score = Column(Double, Computed("posts_hot_score(vote_count, created_at)", persisted=True))
     owner = relationship("User")
 
+    __table_args__ = (
+        Index("ix_posts_search_vector", "search_vector", postgresql_using="gin"),
+        Index("ix_posts_title_trgm", "title", postgresql_using="gin", postgresql_ops={"title": "gin_trgm_ops"}),
+        Index("ix_posts_published_id", "id", postgresql_where=text("published")),
+        Index("ix_posts_user_id_id", "user_id", "id"),
+        Index("ix_posts_user_id_drafts", "user_id", postgresql_where=text("NOT published")),
+        Index("ix_posts_published_hot_score", "hot_score", "id", postgresql_where=text("published")),
+    )
+
 class Vote(Base):
     __tablename__ = "votes"
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
-    post_id = Column(Integer, ForeignKey("posts.id", ondelete="CASCADE"), primary_key=True)
\ No newline at end of file
+    post_id = Column(Integer, ForeignKey("posts.id", ondelete="CASCADE"), primary_key=True, index=True)
+
+class Follow(Base):
+    __tablename__ = "follows"
+    follower_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    followee_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True, index=True)
+    created_at = Column(TIMESTAMP(timezone=True), server_default=text('now()'), nullable=False)
+
+    __table_args__ = (
+        CheckConstraint("follower_id <> followee_id", name="follows_not_self"),
+    )
+
+# Home timelines: the posts fanned out to each follower (see timeline.py)
+class TimelineEntry(Base):
+    __tablename__ = "timeline"
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    post_id = Column(Integer, ForeignKey("posts.id", ondelete="CASCADE"), primary_key=True, index=True)
+
+# Rotating refresh tokens (see refresh_tokens.py). Only a SHA-256 of each token is stored.
+# A family is every token rotated from one login; used ones are kept until they expire so
+# that presenting one again can be recognized as reuse.
+class RefreshToken(Base):
+    __tablename__ = "refresh_tokens"
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    family_id = Column(Uuid, nullable=False, index=True)
+    token_hash = Column(LargeBinary, nullable=False, unique=True)
+    created_at = Column(TIMESTAMP(timezone=True), server_default=text('now()'), nullable=False)
+    expires_at = Column(TIMESTAMP(timezone=True), nullable=False)
+    used_at = Column(TIMESTAMP(timezone=True))
+    revoked_at = Column(TIMESTAMP(timezone=True))
@@ -2,8 +2,9 @@ from typing import Annotated
 import jwt
 from datetime import datetime, timedelta, timezone
 from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from . import models, database, exceptions, config, schemas
+from . import database, exceptions, config, schemas, cache, queries
 from fastapi import Depends
 from fastapi.security import OAuth2PasswordBearer
 
@@ -13,6 +14,7 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl='/login')
 SECRET_KEY = config.settings.jwt_secret_key
 ALGORITHM = config.settings.jwt_algorithm
 ACCESS_TOKEN_EXPIRE_MINUTES = config.settings.jwt_expire_time
+TRUST_TOKEN_CLAIMS = config.settings.auth_trust_token_claims
 
 # Token created
 def create_access_token(data: schemas.TokenData, expires_delta: timedelta | None = None):
@@ -25,11 +27,16 @@ def create_access_token(data: schemas.TokenData, expires_delta: timedelta | None
     encoded_jwt = jwt.encode(to_encode.model_dump(), SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-# Decode the received token, verify it, and return the current user
-def get_current_user(
-        token: Annotated[str, Depends(oauth2_scheme)],
-        db: Annotated[Session, Depends(database.get_db)]
-):
+# Response to a login or refresh: a new access token for `user_id`, and its refresh token
+def token_response(user_id: int, refresh_token: str) -> schemas.Token:
+    access_token = create_access_token(
+        data=schemas.TokenData(sub=str(user_id)),
+        expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+    return schemas.Token(access_token=access_token, token_type="bearer", refresh_token=refresh_token)
+
+# Decode the received token, verify it, and return the user id it was issued for
+def decode_user_id(token: str) -> int:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         token_data = schemas.TokenData(**payload)
@@ -38,10 +45,59 @@ def get_current_user(
     if token_data.sub is None:
         raise exceptions.credentials_exception
     try:
-        user_id = int(token_data.sub)
+        return int(token_data.sub)
     except ValueError:
         raise exceptions.credentials_exception
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+
+# Identity fields of recently authenticated users, keyed by user id.
+# routers/user.py pops entries whenever a user is updated or deleted.
+user_cache = cache.TTLCache(
+    maxsize=config.settings.user_cache_size, ttl=config.settings.user_cache_ttl
+)
+
+# Decode the received token, verify it, and return the current user
+def get_current_user(
+        token: Annotated[str, Depends(oauth2_scheme)],
+        db: Annotated[Session, Depends(database.get_db)]
+) -> schemas.UserResponse:
+    user_id = decode_user_id(token)
+    user = user_cache.get(user_id)
     if user is None:
-        raise exceptions.credentials_exception
+        db_user = db.execute(queries.USER_BY_ID, {"id": user_id}).first()
+        if db_user is None:
+            raise exceptions.credentials_exception
+        user = schemas.UserResponse.model_validate(db_user)
+        user_cache.set(user_id, user)
+    return user
+
+async def get_current_user_async(
+        token: Annotated[str, Depends(oauth2_scheme)],
+        db: Annotated[AsyncSession, Depends(database.get_async_db)]
+) -> schemas.UserResponse:
+    user_id = decode_user_id(token)
+    user = user_cache.get(user_id)
+    if user is None:
+        db_user = (await db.execute(queries.USER_BY_ID, {"id": user_id})).first()
+        if db_user is None:
+            raise exceptions.credentials_exception
+        user = schemas.UserResponse.model_validate(db_user)
+        user_cache.set(user_id, user)
     return user
+
+# For read-only routes: with auth_trust_token_claims on, a valid signature is enough and
+# the user row is never read (a deleted user keeps read access until the token expires).
+def get_token_user(
+        token: Annotated[str, Depends(oauth2_scheme)],
+        db: Annotated[Session, Depends(database.get_db)]
+) -> schemas.TokenUser | schemas.UserResponse:
+    if TRUST_TOKEN_CLAIMS:
+        return schemas.TokenUser(id=decode_user_id(token))
+    return get_current_user(token, db)
+
+async def get_token_user_async(
+        token: Annotated[str, Depends(oauth2_scheme)],
+        db: Annotated[AsyncSession, Depends(database.get_async_db)]
+) -> schemas.TokenUser | schemas.UserResponse:
+    if TRUST_TOKEN_CLAIMS:
+        return schemas.TokenUser(id=decode_user_id(token))
+    return await get_current_user_async(token, db)
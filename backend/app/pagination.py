@@ -0,0 +1,36 @@
+import base64
+import json
+import math
+from . import exceptions
+
+# Keyset (cursor) pagination helpers.
+# A cursor is the sort key of the last row a client has seen, e.g. {"id": 42},
+# packed into an opaque url-safe string. The next page starts strictly after it,
+# so every page is an index range scan no matter how deep the client scrolls.
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(**keys) -> str:
+    raw = json.dumps(keys, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+# `id` keys are int4 primary keys; every other key is a float sort value (rank, score)
+_ID_MIN, _ID_MAX = -2**31, 2**31 - 1
+
+def _valid_key(field: str, value) -> bool:
+    if isinstance(value, bool):
+        return False
+    if field == "id":
+        return isinstance(value, int) and _ID_MIN <= value <= _ID_MAX
+    return isinstance(value, (int, float)) and math.isfinite(value)
+
+# Returns the requested sort key values in order, or raises 400 for anything a client tampered
+# with, including values the database would reject (out of int4 range, NaN, infinity)
+def decode_cursor(cursor: str, *fields: str) -> tuple:
+    try:
+        keys = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, UnicodeDecodeError):
+        raise exceptions.invalid_cursor_exception
+    if not isinstance(keys, dict) or not all(_valid_key(field, keys.get(field)) for field in fields):
+        raise exceptions.invalid_cursor_exception
+    return tuple(keys[field] for field in fields)
@@ -0,0 +1,62 @@
+import threading
+import time
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+
+# Connection pools that also record how long requests wait to get a connection,
+# so pool_size/max_overflow can be sized from data instead of guessed.
+
+class PoolWaitStats:
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            self.checkouts += 1
+            self.timeouts += timed_out
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+class _TimedCheckoutMixin:
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolWaitStats()
+
+    # Covers both queueing for a free connection and opening an overflow one
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            self.wait_stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        self.wait_stats.record(time.perf_counter() - start)
+        return conn
+
+class InstrumentedQueuePool(_TimedCheckoutMixin, QueuePool):
+    pass
+
+class InstrumentedAsyncQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    pass
+
+# Snapshot of a pool for the /metrics endpoints
+def pool_status(pool) -> dict:
+    if not isinstance(pool, _TimedCheckoutMixin):
+        return {"class": type(pool).__name__}
+    stats = pool.wait_stats
+    return {
+        "class": type(pool).__name__,
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": pool._max_overflow,
+        "checkouts": stats.checkouts,
+        "timeouts": stats.timeouts,
+        "wait_seconds_total": round(stats.wait_seconds_total, 6),
+        "wait_seconds_max": round(stats.wait_seconds_max, 6),
+    }
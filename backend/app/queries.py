@@ -0,0 +1,213 @@
+from typing import NamedTuple
+from sqlalchemy import Select, bindparam, delete, exists, false, true, func, or_, and_, cast, select, tuple_, Double, Integer, String
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.dialects.postgresql.psycopg import PGDialect_psycopg
+from sqlalchemy.orm import aliased
+from . import models, pagination
+
+# Statement building shared by the sync routers and their async twins in routers/aio.
+# These take either a legacy `db.query(...)` Query or a 2.0 `select(...)`; both expose
+# the same generative filter/order_by/add_columns/offset/limit API.
+# The hot statements further down are instead built once, at import.
+
+# Exactly the columns a PostWithVotes needs, owner included, as flat labelled columns,
+# plus the post's version for its ETag (see etags.py).
+# Used with `.join(models.Post.owner)`; see serialization.post_with_votes for the shape.
+POST_WITH_VOTES_COLUMNS = (
+    models.Post.id, models.Post.title, models.Post.content, models.Post.category,
+    models.Post.published, models.Post.created_at, models.Post.user_id, models.Post.vote_count,
+    models.Post.version,
+    models.User.id.label("owner_id"), models.User.email.label("owner_email"),
+    models.User.created_at.label("owner_created_at"),
+)
+
+USER_COLUMNS = (models.User.id, models.User.email, models.User.created_at)
+
+# Keyset page of users in id order
+def users_page(query, limit: int, cursor: str | None):
+    if cursor is not None:
+        (last_id,) = pagination.decode_cursor(cursor, "id")
+        query = query.filter(models.User.id > last_id)
+    return query.order_by(models.User.id).limit(limit)
+
+def next_users_cursor(users, limit: int) -> str | None:
+    if not users or len(users) < limit:
+        return None
+    return pagination.encode_cursor(id=users[-1].id)
+
+# Posts are visible if published, or if they belong to the current user
+def visible_posts(query, user_id: int):
+    return query.filter(
+        or_(
+            models.Post.user_id == user_id,
+            models.Post.published == True
+        )
+    )
+
+# Everything `user_id` may see after `after_id`, in id order, for streaming exports
+def posts_export(query, user_id: int, after_id: int):
+    return visible_posts(query, user_id).filter(models.Post.id > after_id).order_by(models.Post.id)
+
+# Hot statements: built once with every value a bind parameter, and run as
+# `db.execute(STATEMENT, params)`. A request then builds no query and SQLAlchemy finds the
+# compiled SQL in its cache straight away; psycopg sees the same SQL text every time and
+# prepares it server side (settings.db_prepare_threshold), so Postgres plans it only once
+# per connection.
+
+_POSTS_WITH_OWNER = select(*POST_WITH_VOTES_COLUMNS).join(models.Post.owner)
+
+# params: id
+POST_BY_ID = _POSTS_WITH_OWNER.where(models.Post.id == bindparam("id"))
+
+# params: id
+USER_BY_ID = select(*USER_COLUMNS).where(models.User.id == bindparam("id"))
+
+# params: user_id, post_id. Both RETURNING the row they changed, if any.
+VOTE_INSERT = insert(models.Vote).on_conflict_do_nothing().returning(models.Vote.post_id)
+VOTE_DELETE = delete(models.Vote).where(
+    models.Vote.user_id == bindparam("user_id"), models.Vote.post_id == bindparam("post_id")
+).returning(models.Vote.post_id)
+
+# params: follower_id, followee_id. Same RETURNING convention as the vote statements.
+FOLLOW_INSERT = insert(models.Follow).on_conflict_do_nothing().returning(models.Follow.followee_id)
+FOLLOW_DELETE = delete(models.Follow).where(
+    models.Follow.follower_id == bindparam("follower_id"), models.Follow.followee_id == bindparam("followee_id")
+).returning(models.Follow.followee_id)
+
+# Whether the caller has unpublished posts, i.e. whether their feed differs from the public
+# one (feed_cache.py). Uncorrelated, so Postgres evaluates it once per statement.
+_drafts = aliased(models.Post)
+VIEWER_HAS_DRAFTS = exists().where(
+    _drafts.user_id == bindparam("user_id"), _drafts.published == false()
+).label("viewer_has_drafts")
+
+# params: search
+def _search_ts_query():
+    return func.websearch_to_tsquery("english", bindparam("search", type_=String))
+
+# params: search, title_pattern. Full-text match on title + content (GIN on search_vector)
+# or a substring match on the title (pg_trgm GIN on title).
+def _matches_search(ts_query):
+    return or_(
+        models.Post.search_vector.op("@@")(ts_query),
+        models.Post.title.icontains(bindparam("title_pattern"), escape="/")
+    )
+
+# Keyset pagination: start right after the last seen sort key instead of skipping `offset` rows.
+# `offset` is only kept for older clients and is ignored once a cursor is sent.
+def _feed_statement(search: bool, after: bool) -> Select:
+    query = visible_posts(_POSTS_WITH_OWNER, bindparam("user_id")).add_columns(VIEWER_HAS_DRAFTS)
+    if search:
+        ts_query = _search_ts_query()
+        # ts_rank returns a float4; cast so the rank round-trips exactly through the cursor
+        rank = cast(func.ts_rank(models.Post.search_vector, ts_query), Double)
+        # best matches first
+        query = query.add_columns(rank.label("rank")).filter(_matches_search(ts_query)).order_by(rank.desc(), models.Post.id)
+        if after:
+            last_rank = bindparam("last_rank")
+            query = query.filter(
+                or_(rank < last_rank, and_(rank == last_rank, models.Post.id > bindparam("last_id")))
+            )
+    else:
+        query = query.order_by(models.Post.id)
+        if after:
+            query = query.filter(models.Post.id > bindparam("last_id"))
+    if not after:
+        query = query.offset(bindparam("offset", type_=Integer))
+    return query.limit(bindparam("limit", type_=Integer))
+
+# (searching, has cursor) -> statement
+FEED_STATEMENTS = {
+    (search, after): _feed_statement(search, after) for search in (False, True) for after in (False, True)
+}
+
+# LIKE pattern characters in a search term are matched literally
+def _escape_like(term: str) -> str:
+    return term.replace("/", "//").replace("%", "/%").replace("_", "/_")
+
+# Search parameters shared by the feed and count statements
+def _search_params(search: str) -> dict:
+    return {"search": search, "title_pattern": _escape_like(search)}
+
+# The feed statement for these request parameters, and the values to run it with
+def feed_page(user_id: int, limit: int, offset: int, cursor: str | None, search: str) -> tuple[Select, dict]:
+    params = {"user_id": user_id, "limit": limit}
+    if cursor is None:
+        params["offset"] = offset
+    elif search:
+        params["last_rank"], params["last_id"] = pagination.decode_cursor(cursor, "rank", "id")
+    else:
+        (params["last_id"],) = pagination.decode_cursor(cursor, "id")
+    if search:
+        params.update(_search_params(search))
+    return FEED_STATEMENTS[(bool(search), cursor is not None)], params
+
+# Cursor for the page after `posts`, or None when this was the last page
+def next_feed_cursor(posts, limit: int, search: str) -> str | None:
+    if not posts or len(posts) < limit:
+        return None
+    last = posts[-1]
+    if search:
+        return pagination.encode_cursor(rank=last.rank, id=last.id)
+    return pagination.encode_cursor(id=last.id)
+
+# Published posts by hot_score, best first: one backward range scan of
+# ix_posts_published_hot_score. Scores move as votes arrive, so a post can show up on two
+# pages or on none while a client pages through.
+def _trending_statement(after: bool) -> Select:
+    query = (
+        _POSTS_WITH_OWNER.add_columns(models.Post.hot_score)
+        .where(models.Post.published == true())
+        .order_by(models.Post.hot_score.desc(), models.Post.id.desc())
+        .limit(bindparam("limit", type_=Integer))
+    )
+    if after:
+        query = query.where(
+            tuple_(models.Post.hot_score, models.Post.id) < tuple_(bindparam("last_score", type_=Double), bindparam("last_id", type_=Integer))
+        )
+    return query
+
+# has cursor -> statement
+TRENDING_STATEMENTS = {after: _trending_statement(after) for after in (False, True)}
+
+def trending_page(limit: int, cursor: str | None) -> tuple[Select, dict]:
+    params = {"limit": limit}
+    if cursor is not None:
+        params["last_score"], params["last_id"] = pagination.decode_cursor(cursor, "score", "id")
+    return TRENDING_STATEMENTS[cursor is not None], params
+
+def next_trending_cursor(posts, limit: int) -> str | None:
+    if not posts or len(posts) < limit:
+        return None
+    return pagination.encode_cursor(score=posts[-1].hot_score, id=posts[-1].id)
+
+# Total counts for paginated lists (counts.py): the rows a list would page through, counted
+# exactly, or estimated by the planner with EXPLAIN. EXPLAIN takes no part in SQLAlchemy's
+# statement compilation, so its SQL is compiled here once, for psycopg, and run with
+# `exec_driver_sql`; `fixed_params` holds values the compiler bound itself ("english").
+class CountStatements(NamedTuple):
+    exact: Select
+    explain: str
+    fixed_params: dict
+
+def _count_statements(rows: Select) -> CountStatements:
+    compiled = rows.compile(dialect=PGDialect_psycopg())
+    return CountStatements(
+        exact=select(func.count()).select_from(rows.subquery()),
+        explain="EXPLAIN (FORMAT JSON) " + compiled.string,
+        fixed_params={name: value for name, value in compiled.params.items() if value is not None},
+    )
+
+def _visible_posts_statement(search: bool) -> Select:
+    query = visible_posts(select(models.Post.id), bindparam("user_id", type_=Integer))
+    return query.where(_matches_search(_search_ts_query())) if search else query
+
+# searching -> statements; params: user_id, and search, title_pattern when searching
+POSTS_COUNT_STATEMENTS = {search: _count_statements(_visible_posts_statement(search)) for search in (False, True)}
+USERS_COUNT_STATEMENTS = _count_statements(select(models.User.id))
+
+def posts_count(user_id: int, search: str) -> tuple[CountStatements, dict]:
+    params = {"user_id": user_id}
+    if search:
+        params.update(_search_params(search))
+    return POSTS_COUNT_STATEMENTS[bool(search)], params
@@ -0,0 +1,92 @@
+import hashlib
+import logging
+import secrets
+import uuid
+from sqlalchemy import text
+from .config import settings
+
+# Long-lived, rotating refresh tokens, so an expired access token is replaced without a
+# password check: POST /token/refresh costs one lookup on the unique token_hash index
+# and no argon2. Tokens are 256 random bits, so a plain SHA-256 is enough to store them;
+# a database leak gives nobody a usable token.
+#
+# Each refresh marks the presented token used and hands out a new one in the same family
+# (every token descending from one login). A used token presented again means two parties
+# hold the family, so the whole family is revoked and both have to log in again.
+# Changing the password revokes all of a user's families.
+#
+# Callers run the statements returned here with their own session, sync or async.
+
+logger = logging.getLogger("app.refresh_tokens")
+
+# params: user_id, family_id, token_hash, ttl. Also drops the user's expired tokens.
+ISSUE = text("""
+    WITH pruned AS (
+        DELETE FROM refresh_tokens WHERE user_id = :user_id AND expires_at <= now()
+    )
+    INSERT INTO refresh_tokens (user_id, family_id, token_hash, expires_at)
+    VALUES (:user_id, :family_id, :token_hash, now() + make_interval(secs => :ttl))
+""")
+
+# params: token_hash, new_token_hash, ttl. Returns the user id when the token was valid,
+# no row otherwise. A token can be used only once: of two concurrent refreshes with it, the
+# second waits on the row lock and then finds it used. The family's expired tokens go too.
+ROTATE = text("""
+    WITH used AS (
+        UPDATE refresh_tokens SET used_at = now()
+        WHERE token_hash = :token_hash
+          AND used_at IS NULL AND revoked_at IS NULL AND expires_at > now()
+        RETURNING user_id, family_id
+    ), pruned AS (
+        DELETE FROM refresh_tokens USING used
+        WHERE refresh_tokens.family_id = used.family_id AND refresh_tokens.expires_at <= now()
+    )
+    INSERT INTO refresh_tokens (user_id, family_id, token_hash, expires_at)
+    SELECT user_id, family_id, :new_token_hash, now() + make_interval(secs => :ttl) FROM used
+    RETURNING user_id
+""")
+
+# params: token_hash. Revokes the family of an already used token; returns a row if it did.
+REVOKE_REUSED = text("""
+    UPDATE refresh_tokens SET revoked_at = now()
+    WHERE family_id = (SELECT family_id FROM refresh_tokens WHERE token_hash = :token_hash AND used_at IS NOT NULL)
+      AND revoked_at IS NULL
+    RETURNING family_id
+""")
+
+# params: token_hash. Logging out: the token's whole family.
+REVOKE = text("""
+    UPDATE refresh_tokens SET revoked_at = now()
+    WHERE family_id = (SELECT family_id FROM refresh_tokens WHERE token_hash = :token_hash)
+      AND revoked_at IS NULL
+""")
+
+# params: user_id
+REVOKE_USER = text("UPDATE refresh_tokens SET revoked_at = now() WHERE user_id = :user_id AND revoked_at IS NULL")
+
+def _hash(token: str) -> bytes:
+    return hashlib.sha256(token.encode()).digest()
+
+def _ttl() -> int:
+    return settings.refresh_token_expire_days * 86400
+
+# A new token for a fresh login, and the statement that stores it
+def issue(user_id: int) -> tuple[str, tuple]:
+    token = secrets.token_urlsafe(32)
+    params = {"user_id": user_id, "family_id": uuid.uuid4(), "token_hash": _hash(token), "ttl": _ttl()}
+    return token, (ISSUE, params)
+
+# The token that replaces `token`, and the statement that swaps them (see ROTATE)
+def rotate(token: str) -> tuple[str, tuple]:
+    new_token = secrets.token_urlsafe(32)
+    return new_token, (ROTATE, {"token_hash": _hash(token), "new_token_hash": _hash(new_token), "ttl": _ttl()})
+
+# Run after ROTATE found nothing to rotate
+def revoke_reused(token: str) -> tuple:
+    return REVOKE_REUSED, {"token_hash": _hash(token)}
+
+def revoke(token: str) -> tuple:
+    return REVOKE, {"token_hash": _hash(token)}
+
+def revoke_user(user_id: int) -> tuple:
+    return REVOKE_USER, {"user_id": user_id}
@@ -0,0 +1,168 @@
+import asyncio
+import itertools
+import math
+import time
+from typing import Annotated
+from fastapi import Cookie, Depends, Response
+from sqlalchemy import create_engine, exc, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session
+from . import cache, config, database, instrumentation, oauth2, schemas
+from .pool import InstrumentedQueuePool, InstrumentedAsyncQueuePool
+
+# Read-replica routing. Read-only routes take a ReadDBSession, which is bound to a healthy
+# replica (round robin) unless the caller wrote something within the last
+# `db_read_your_writes_seconds`, in which case it stays on the primary so the caller sees
+# their own change despite replication lag. Writes always use the primary DBSession.
+# The write time travels with the client in a short-lived cookie, so the next read is kept
+# on the primary whichever worker process serves it.
+# Replicas are health-checked in the background and skipped while down or lagging.
+
+# Seconds of replay lag; 0 on a caught-up standby (or on a server that isn't a standby)
+LAG_SQL = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+class Replica:
+    def __init__(self, url: str):
+        self.name = make_url(url).render_as_string(hide_password=True)
+        self.engine = create_engine(url, **database.engine_options(InstrumentedQueuePool))
+        self.async_engine = create_async_engine(url, **database.engine_options(InstrumentedAsyncQueuePool))
+        instrumentation.instrument_engine(self.engine)
+        instrumentation.instrument_engine(self.async_engine.sync_engine)
+        # unknown until the first check passes
+        self.healthy = False
+        self.lag_seconds = None
+
+class ReplicaSet:
+    def __init__(self, urls: list[str], max_lag: float, check_interval: float, check_timeout: float):
+        self.replicas = [Replica(url) for url in urls]
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.check_timeout = check_timeout
+        self._next = itertools.count()
+
+    # A healthy replica in round-robin order, or None to use the primary
+    def pick(self) -> Replica | None:
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        return healthy[next(self._next) % len(healthy)]
+
+    async def check(self, replica: Replica):
+        try:
+            async with asyncio.timeout(self.check_timeout):
+                async with replica.async_engine.connect() as conn:
+                    replica.lag_seconds = float(await conn.scalar(LAG_SQL))
+            replica.healthy = replica.lag_seconds <= self.max_lag
+        except (exc.DBAPIError, OSError, TimeoutError):
+            replica.healthy = False
+            replica.lag_seconds = None
+
+    async def check_all(self):
+        await asyncio.gather(*(self.check(replica) for replica in self.replicas))
+
+    # Runs for the app's lifetime (started from main.lifespan)
+    async def monitor(self):
+        while True:
+            await self.check_all()
+            await asyncio.sleep(self.check_interval)
+
+    def status(self) -> list[dict]:
+        return [
+            {"replica": replica.name, "healthy": replica.healthy, "lag_seconds": replica.lag_seconds}
+            for replica in self.replicas
+        ]
+
+settings = config.settings
+replica_set = ReplicaSet(
+    settings.db_replica_urls,
+    max_lag=settings.db_replica_max_lag,
+    check_interval=settings.db_replica_check_interval,
+    check_timeout=settings.db_replica_check_timeout,
+)
+
+# Set by the writing routes when replicas are configured: when the caller last wrote (epoch seconds)
+WROTE_AT_COOKIE = "wrote_at"
+
+# Users who wrote recently, per worker process. Covers clients that drop the cookie, as
+# long as the same worker serves their next read. Marking happens when a route resolves
+# deps.CurrentUser, which only the writing routes use.
+recent_writers = cache.TTLCache(maxsize=settings.user_cache_size, ttl=settings.db_read_your_writes_seconds)
+
+def _mark_writer(user_id: int, response: Response):
+    recent_writers.set(user_id, True)
+    if not replica_set.replicas:
+        return
+    response.set_cookie(
+        WROTE_AT_COOKIE, f"{time.time():.3f}",
+        max_age=math.ceil(settings.db_read_your_writes_seconds), httponly=True, samesite="strict"
+    )
+
+def get_writing_user(
+        user: Annotated[schemas.UserResponse, Depends(oauth2.get_current_user)],
+        response: Response
+) -> schemas.UserResponse:
+    _mark_writer(user.id, response)
+    return user
+
+async def get_writing_user_async(
+        user: Annotated[schemas.UserResponse, Depends(oauth2.get_current_user_async)],
+        response: Response
+) -> schemas.UserResponse:
+    _mark_writer(user.id, response)
+    return user
+
+# A malformed cookie counts as no recent write
+def _wrote_recently(user_id: int, wrote_at: str | None) -> bool:
+    if recent_writers.get(user_id):
+        return True
+    try:
+        return time.time() - float(wrote_at) < settings.db_read_your_writes_seconds
+    except (TypeError, ValueError):
+        return False
+
+def _read_replica(user_id: int, wrote_at: str | None) -> Replica | None:
+    if _wrote_recently(user_id, wrote_at):
+        return None
+    return replica_set.pick()
+
+# Falls back to the request's primary session (the one auth already uses) when no replica applies
+def get_read_db(
+        user: Annotated[schemas.TokenUser | schemas.UserResponse, Depends(oauth2.get_token_user)],
+        primary: Annotated[Session, Depends(database.get_db)],
+        wrote_at: Annotated[str | None, Cookie(alias=WROTE_AT_COOKIE, include_in_schema=False)] = None
+):
+    replica = _read_replica(user.id, wrote_at)
+    if replica is None:
+        yield primary
+        return
+    db = database.SessionLocal(bind=replica.engine)
+    try:
+        yield db
+    except exc.OperationalError:
+        # connection-level failure: stop routing here until the next health check passes
+        replica.healthy = False
+        raise
+    finally:
+        db.close()
+
+async def get_read_db_async(
+        user: Annotated[schemas.TokenUser | schemas.UserResponse, Depends(oauth2.get_token_user_async)],
+        primary: Annotated[AsyncSession, Depends(database.get_async_db)],
+        wrote_at: Annotated[str | None, Cookie(alias=WROTE_AT_COOKIE, include_in_schema=False)] = None
+):
+    replica = _read_replica(user.id, wrote_at)
+    if replica is None:
+        yield primary
+        return
+    async with database.AsyncSessionLocal(bind=replica.async_engine) as db:
+        try:
+            yield db
+        except exc.OperationalError:
+            replica.healthy = False
+            raise
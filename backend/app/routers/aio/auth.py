@@ -0,0 +1,48 @@
+from fastapi import APIRouter, status
+from sqlalchemy import select
+from ... import schemas, models, utils, deps, oauth2, exceptions, refresh_tokens
+
+# Async twin of routers/auth.py, served when settings.db_async is on.
+
+router = APIRouter(
+    tags=["Authentication"]
+)
+
+@router.post("/login", response_model=schemas.Token)
+async def login_user(
+    user_creds: deps.PasswordRequestForm,
+    db: deps.AsyncDBSession
+):
+    user = await db.scalar(select(models.User).where(models.User.email == user_creds.username))
+
+    if user is None or not await utils.verify_password_async(user_creds.password, user.password):
+        raise exceptions.credentials_exception
+
+    refresh_token, (statement, params) = refresh_tokens.issue(user.id)
+    await db.execute(statement, params)
+    await db.commit()
+    return oauth2.token_response(user.id, refresh_token)
+
+@router.post("/token/refresh", response_model=schemas.Token)
+async def refresh_access_token(
+    body: schemas.RefreshTokenRequest,
+    db: deps.AsyncDBSession
+):
+    refresh_token, (statement, params) = refresh_tokens.rotate(body.refresh_token)
+    user_id = (await db.execute(statement, params)).scalar()
+    if user_id is None:
+        reused = (await db.execute(*refresh_tokens.revoke_reused(body.refresh_token))).first()
+        await db.commit()
+        if reused is not None:
+            refresh_tokens.logger.warning("refresh token reused, family %s revoked", reused.family_id)
+        raise exceptions.invalid_refresh_token_exception
+    await db.commit()
+    return oauth2.token_response(user_id, refresh_token)
+
+@router.post("/token/revoke", status_code=status.HTTP_204_NO_CONTENT)
+async def revoke_refresh_token(
+    body: schemas.RefreshTokenRequest,
+    db: deps.AsyncDBSession
+):
+    await db.execute(*refresh_tokens.revoke(body.refresh_token))
+    await db.commit()
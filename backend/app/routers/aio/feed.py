@@ -0,0 +1,23 @@
+from typing import Annotated
+from fastapi import APIRouter, Header, Query
+from ... import schemas, deps, timeline
+from ...feed_cache import Page
+from ..feed import FEED_PAGE_MAX
+
+# Async twin of routers/feed.py, served when settings.db_async is on.
+
+router = APIRouter(
+    prefix="/feed",
+    tags=['Feed']
+)
+
+@router.get("/", response_model=list[schemas.PostWithVotes])
+async def get_feed(
+    db: deps.AsyncReadDBSession,
+    current_user: deps.AsyncTokenUser,
+    limit: Annotated[int, Query(ge=1, le=FEED_PAGE_MAX)] = 10,
+    cursor: str | None = None,
+    if_none_match: Annotated[str | None, Header()] = None
+):
+    posts = (await db.execute(*timeline.page(current_user.id, limit, cursor))).all()
+    return Page(posts, timeline.next_cursor(posts, limit)).response(if_none_match)
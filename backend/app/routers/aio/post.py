@@ -0,0 +1,183 @@
+from typing import Annotated
+from fastapi import status, HTTPException, APIRouter, Body, Header, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
+from ... import models, schemas, deps, queries, bulk, serialization, export, etags, timeline, counts
+from ...feed_cache import feed_cache, Page
+from ...config import settings
+from ..post import EXPORT_RESPONSES, POSTS_PAGE_MAX, TRENDING_PAGE_MAX
+
+# Async twin of routers/post.py, served when settings.db_async is on.
+# Owners are always eager-loaded: an async session can't lazy-load them during serialization.
+
+router = APIRouter(
+    prefix="/posts",
+    tags=['Posts']
+)
+
+@router.post("/", status_code=status.HTTP_201_CREATED, response_model=schemas.PostResponse)
+async def create_post(
+    post: schemas.PostCreate,
+    db: deps.AsyncDBSession,
+    current_user: deps.AsyncCurrentUser
+):
+    new_post = models.Post(**post.model_dump(), user_id=current_user.id)
+    db.add(new_post)
+    await db.flush()
+    post_id = new_post.id
+    for statement, params in timeline.fan_out([post_id]):
+        await db.execute(statement, params)
+    await db.commit()
+    feed_cache.invalidate(current_user.id)
+    # reload with the owner in the same statement instead of a refresh plus a lazy load
+    return (await db.execute(
+        select(models.Post).options(joinedload(models.Post.owner))
+        .where(models.Post.id == post_id).execution_options(populate_existing=True)
+    )).scalar_one()
+
+@router.post("/batch", status_code=status.HTTP_201_CREATED, response_model=schemas.PostBatchResponse)
+async def create_posts_batch(
+    posts: Annotated[list[schemas.PostCreate], Body(min_length=1, max_length=settings.post_batch_max)],
+    db: deps.AsyncDBSession,
+    current_user: deps.AsyncCurrentUser
+):
+    rows = [{**post.model_dump(), "user_id": current_user.id} for post in posts]
+    if len(rows) >= settings.post_batch_copy_threshold:
+        raw = await (await db.connection()).get_raw_connection()
+        ids = await bulk.copy_posts_async(raw.driver_connection, rows)
+    else:
+        ids = list((await db.execute(bulk.insert_posts_statement(), rows)).scalars())
+    for statement, params in timeline.fan_out(ids):
+        await db.execute(statement, params)
+    await db.commit()
+    feed_cache.invalidate(current_user.id)
+    return schemas.PostBatchResponse(ids=ids)
+
+@router.get("/", response_model=list[schemas.PostWithVotes])
+async def get_posts(
+    db: deps.AsyncReadDBSession,
+    current_user: deps.AsyncTokenUser,
+    limit: Annotated[int, Query(ge=1, le=POSTS_PAGE_MAX)] = 10,
+    offset: int = 0,
+    cursor: str | None = None,
+    search: str = "",
+    count: bool = False,
+    if_none_match: Annotated[str | None, Header()] = None
+):
+    key = (limit, offset if cursor is None else None, cursor, search)
+    page = feed_cache.get(current_user.id, key)
+    if page is None:
+        version = feed_cache.version
+        posts = (await db.execute(*queries.feed_page(current_user.id, limit, offset, cursor, search))).all()
+        page = Page(posts, queries.next_feed_cursor(posts, limit, search))
+        feed_cache.set(version, current_user.id, key, posts, page)
+    response = page.response(if_none_match)
+    if count:
+        statements, params = queries.posts_count(current_user.id, search)
+        total = await counts.total_count_async(db, ("posts", current_user.id, search), statements, params)
+        response.headers.update(total.headers())
+    return response
+
+@router.get("/export", response_class=StreamingResponse, responses=EXPORT_RESPONSES)
+async def export_posts(
+    db: deps.AsyncReadDBSession,
+    current_user: deps.AsyncTokenUser,
+    after_id: int = 0,
+    accept_encoding: Annotated[str | None, Header()] = None
+):
+    result = await db.stream(queries.posts_export(
+        select(*queries.POST_WITH_VOTES_COLUMNS).join(models.Post.owner), current_user.id, after_id
+    ).execution_options(yield_per=export.EXPORT_CHUNK_ROWS))
+    chunks = export.encode_partitions_async(
+        result.partitions(), lambda rows: export.ndjson_chunk(rows, serialization.post_with_votes)
+    )
+    headers = export.attachment("posts.ndjson")
+    if export.accepts_gzip(accept_encoding):
+        chunks = export.gzip_chunks_async(chunks)
+        headers.update(export.GZIP_HEADERS)
+    return StreamingResponse(chunks, media_type=export.NDJSON_MEDIA_TYPE, headers=headers)
+
+@router.get("/trending", response_model=list[schemas.PostWithVotes])
+async def get_trending_posts(
+    db: deps.AsyncReadDBSession,
+    current_user: deps.AsyncTokenUser,
+    limit: Annotated[int, Query(ge=1, le=TRENDING_PAGE_MAX)] = 10,
+    cursor: str | None = None,
+    if_none_match: Annotated[str | None, Header()] = None
+):
+    posts = (await db.execute(*queries.trending_page(limit, cursor))).all()
+    return Page(posts, queries.next_trending_cursor(posts, limit)).response(if_none_match)
+
+@router.get("/{id}", response_model=schemas.PostWithVotes)
+async def get_post(
+    id: int,
+    db: deps.AsyncReadDBSession,
+    current_user: deps.AsyncTokenUser,
+    if_none_match: Annotated[str | None, Header()] = None
+):
+    post = (await db.execute(queries.POST_BY_ID, {"id": id})).first()
+    if post is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Post with id {id} not found!"
+        )
+    if not (post.published or post.user_id == current_user.id):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to perform requested action"
+        )
+    headers = etags.headers(etags.post_etag(post))
+    if etags.matches(if_none_match, headers["ETag"]):
+        return etags.not_modified(headers)
+    return serialization.json_response(serialization.post_with_votes(post), headers)
+
+@router.put("/{id}", status_code=status.HTTP_204_NO_CONTENT)
+async def update_post(
+    id: int, payload: schemas.PostCreate,
+    db: deps.AsyncDBSession,
+    current_user: deps.AsyncCurrentUser
+):
+    post = await db.scalar(select(models.Post).where(models.Post.id == id))
+    if post is None:
+        raise HTTPException(
+            status_code=404, detail=f"Post with id {id} not found!"
+        )
+    if post.user_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to perform requested action"
+        )
+    # a draft being published reaches followers now, an unpublished post leaves their timelines
+    published_changed = payload.published != post.published
+    post.title = payload.title
+    post.content = payload.content
+    post.category = payload.category
+    post.published = payload.published
+    if published_changed:
+        await db.flush()
+        for statement, params in timeline.set_published(id, payload.published):
+            await db.execute(statement, params)
+    await db.commit()
+    feed_cache.invalidate(current_user.id)
+    return
+
+@router.delete("/{id}", response_model=schemas.PostResponse)
+async def delete_post(
+    id: int,
+    db: deps.AsyncDBSession,
+    current_user: deps.AsyncCurrentUser
+):
+    deleted_post = await db.scalar(
+        select(models.Post).options(joinedload(models.Post.owner)).where(models.Post.id == id)
+    )
+    if deleted_post is None:
+        raise HTTPException(
+            status_code=404, detail=f"Post with id {id} not found!"
+        )
+    if deleted_post.user_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to perform requested action"
+        )
+    await db.delete(deleted_post)
+    await db.commit()
+    feed_cache.invalidate(current_user.id)
+    return deleted_post
@@ -0,0 +1,148 @@
+from typing import Annotated
+from fastapi import status, HTTPException, APIRouter, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from ... import models, schemas, utils, deps, oauth2, exceptions, export, pagination, queries, serialization, timeline, counts, refresh_tokens
+from ...feed_cache import feed_cache
+from ..user import USERS_PAGE_MAX, USER_EXPORT_COLUMNS, EXPORT_RESPONSES, follow_integrity_error
+
+# Async twin of routers/user.py, served when settings.db_async is on.
+
+router = APIRouter(
+    prefix="/users",
+    tags=['Users']
+)
+
+@router.post("/", status_code=status.HTTP_201_CREATED, response_model=schemas.UserResponse)
+async def create_user(
+    user: schemas.UserCreate,
+    db: deps.AsyncDBSession
+):
+    existing = await db.scalar(select(models.User).where(models.User.email == user.email))
+    if existing:
+        raise HTTPException(status_code=409, detail="Email already registered")
+    new_user = models.User(**user.model_dump())
+    new_user.password = await utils.get_password_hash_async(user.password)
+    db.add(new_user)
+    await db.commit()
+    await db.refresh(new_user)
+    return new_user
+
+@router.get("/", response_model=list[schemas.UserResponse])
+async def get_users(
+    db: deps.AsyncReadDBSession,
+    current_user: deps.AsyncTokenUser,
+    limit: Annotated[int, Query(ge=1, le=USERS_PAGE_MAX)] = 100,
+    cursor: str | None = None,
+    count: bool = False
+):
+    users = (await db.execute(queries.users_page(select(*queries.USER_COLUMNS), limit, cursor))).all()
+    next_cursor = queries.next_users_cursor(users, limit)
+    headers = {pagination.NEXT_CURSOR_HEADER: next_cursor} if next_cursor is not None else {}
+    if count:
+        headers.update((await counts.total_count_async(db, ("users",), queries.USERS_COUNT_STATEMENTS, {})).headers())
+    return serialization.json_response([serialization.user_response(user) for user in users], headers)
+
+@router.get("/export", response_class=StreamingResponse, responses=EXPORT_RESPONSES)
+async def export_users(
+    db: deps.AsyncReadDBSession,
+    current_user: deps.AsyncTokenUser,
+    format: export.ExportFormat = "ndjson"
+):
+    result = await db.stream(
+        select(*queries.USER_COLUMNS).order_by(models.User.id)
+        .execution_options(yield_per=export.EXPORT_CHUNK_ROWS)
+    )
+    encode, prefix, media_type = export.encoder(format, serialization.user_response, USER_EXPORT_COLUMNS)
+    return StreamingResponse(
+        export.encode_partitions_async(result.partitions(), encode, prefix),
+        media_type=media_type, headers=export.attachment(f"users.{format}")
+    )
+
+@router.get("/{id}", response_model=schemas.UserResponse)
+async def get_user(
+    id: int,
+    db: deps.AsyncReadDBSession,
+    current_user: deps.AsyncTokenUser
+):
+    user = await db.scalar(select(models.User).where(models.User.id == id))
+    if user is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"User with id {id} not found!"
+        )
+    return user
+
+@router.put("/{id}", response_model=schemas.UserResponse)
+async def update_user(
+    id: int, payload: schemas.UserCreate, db: deps.AsyncDBSession,
+    current_user: deps.AsyncCurrentUser
+):
+    if current_user.id != id:
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+    # Check if email already exists (and belongs to a different user)
+    existing = await db.scalar(select(models.User).where(models.User.email == payload.email))
+    if existing and existing.id != current_user.id:
+        raise HTTPException(status_code=409, detail="Email already registered")
+
+    user = await db.scalar(select(models.User).where(models.User.id == current_user.id))
+    if user is None: # deleted since its identity was cached
+        oauth2.user_cache.pop(current_user.id)
+        raise exceptions.credentials_exception
+    user.email = payload.email
+    user.password = await utils.get_password_hash_async(payload.password)
+    # sessions started with the old password end at their next refresh
+    await db.execute(*refresh_tokens.revoke_user(current_user.id))
+    await db.commit()
+    oauth2.user_cache.pop(current_user.id)
+    # their posts render with the owner's email
+    feed_cache.invalidate()
+    await db.refresh(user)
+    return user
+
+@router.delete("/{id}", response_model=schemas.UserResponse)
+async def delete_user(
+    id: int, db: deps.AsyncDBSession, current_user: deps.AsyncCurrentUser
+):
+    if current_user.id != id:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    deleted_user = await db.scalar(select(models.User).where(models.User.id == current_user.id))
+    if deleted_user is None:
+        oauth2.user_cache.pop(current_user.id)
+        raise exceptions.credentials_exception
+    await db.delete(deleted_user)
+    await db.commit()
+    oauth2.user_cache.pop(current_user.id)
+    # their posts are deleted with them
+    feed_cache.invalidate()
+    return deleted_user
+
+@router.post("/{id}/follow", status_code=status.HTTP_201_CREATED)
+async def follow_user(
+    id: int, db: deps.AsyncDBSession, current_user: deps.AsyncCurrentUser, response: Response
+):
+    if id == current_user.id:
+        raise exceptions.cannot_follow_self_exception
+    try:
+        changed = (await db.execute(
+            queries.FOLLOW_INSERT, {"follower_id": current_user.id, "followee_id": id}
+        )).first()
+        if changed is not None:
+            for statement, params in timeline.backfill(current_user.id, id):
+                await db.execute(statement, params)
+        await db.commit()
+    except IntegrityError as e:
+        await db.rollback()
+        raise follow_integrity_error(e)
+    if changed is None:
+        response.status_code = status.HTTP_200_OK
+    return {"followee_id": id, "follower_id": current_user.id}
+
+@router.delete("/{id}/follow", status_code=status.HTTP_204_NO_CONTENT)
+async def unfollow_user(id: int, db: deps.AsyncDBSession, current_user: deps.AsyncCurrentUser):
+    params = {"follower_id": current_user.id, "followee_id": id}
+    if (await db.execute(queries.FOLLOW_DELETE, params)).first() is not None:
+        await db.execute(timeline.UNFOLLOW, params)
+    await db.commit()
@@ -0,0 +1,61 @@
+from fastapi import status, APIRouter, Response
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from ... import models, schemas, deps, exceptions, queries
+from ...config import settings
+from ...vote_buffer import vote_buffer, known_posts
+from ...feed_cache import feed_cache
+from ..vote import vote_integrity_error
+
+# Async twin of routers/vote.py, served when settings.db_async is on.
+
+router = APIRouter(
+    prefix="/vote",
+    tags=['Votes']
+)
+
+# Same single-statement, idempotent semantics as the sync route: 201 when the vote
+# changed, 200 when it was already in the requested state, 202 when buffered (write-behind).
+@router.post("/", status_code=status.HTTP_201_CREATED)
+async def vote(
+    vote: schemas.Vote,
+    db: deps.AsyncDBSession,
+    current_user: deps.AsyncCurrentUser,
+    response: Response
+):
+    if settings.vote_write_behind:
+        if not known_posts.get(vote.post_id):
+            if await db.scalar(select(models.Post.id).where(models.Post.id == vote.post_id)) is None:
+                raise exceptions.post_not_found_exception
+            known_posts.set(vote.post_id, True)
+        vote_buffer.add(current_user.id, vote.post_id, vote.dir)
+        response.status_code = status.HTTP_202_ACCEPTED
+        return {"post_id": vote.post_id, "user_id": current_user.id}
+    if (vote.dir == 1):
+        try:
+            changed = (await db.execute(
+                queries.VOTE_INSERT, {"user_id": current_user.id, "post_id": vote.post_id}
+            )).first()
+            await db.commit()
+        except IntegrityError as e:
+            await db.rollback()
+            raise vote_integrity_error(e)
+    else:
+        changed = (await db.execute(
+            queries.VOTE_DELETE, {"user_id": current_user.id, "post_id": vote.post_id}
+        )).first()
+        await db.commit()
+    if changed is None:
+        response.status_code = status.HTTP_200_OK
+    else:
+        feed_cache.invalidate()
+    return {"post_id": vote.post_id, "user_id": current_user.id}
+
+@router.get("/{post_id}")
+async def get_vote(post_id: int, db: deps.AsyncReadDBSession, current_user: deps.AsyncTokenUser):
+    voted = vote_buffer.pending(current_user.id, post_id)
+    if voted is None:
+        voted = await db.scalar(select(models.Vote.post_id).where(
+            models.Vote.post_id == post_id, models.Vote.user_id == current_user.id
+        )) is not None
+    return {"post_id": post_id, "user_id": current_user.id, "voted": bool(voted)}
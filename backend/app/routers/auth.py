@@ -1,6 +1,5 @@
-from datetime import timedelta
 from fastapi import APIRouter, HTTPException, status
-from .. import schemas, models, utils, deps, oauth2, exceptions
+from .. import schemas, models, utils, deps, oauth2, exceptions, refresh_tokens
 
 router = APIRouter(
     tags=["Authentication"]
@@ -16,10 +15,35 @@ def login_user(
     if user is None or not utils.verify_password(user_creds.password, user.password):
         raise exceptions.credentials_exception
 
-    access_token = oauth2.create_access_token(
-        # data={"sub": str(user.id)},
-        data=schemas.TokenData(sub=str(user.id)),
-        expires_delta=timedelta(minutes=oauth2.ACCESS_TOKEN_EXPIRE_MINUTES)
-    )
+    refresh_token, (statement, params) = refresh_tokens.issue(user.id)
+    db.execute(statement, params)
+    db.commit()
+    return oauth2.token_response(user.id, refresh_token)
 
-    return schemas.Token(access_token=access_token, token_type="bearer")
+# A new access token without the password: the refresh token sent is replaced by the one
+# returned and stops working. Sending one that was already replaced revokes every token
+# descending from the same login (see refresh_tokens.py).
+@router.post("/token/refresh", response_model=schemas.Token)
+def refresh_access_token(
+    body: schemas.RefreshTokenRequest,
+    db: deps.DBSession
+):
+    refresh_token, (statement, params) = refresh_tokens.rotate(body.refresh_token)
+    user_id = db.execute(statement, params).scalar()
+    if user_id is None:
+        reused = db.execute(*refresh_tokens.revoke_reused(body.refresh_token)).first()
+        db.commit()
+        if reused is not None:
+            refresh_tokens.logger.warning("refresh token reused, family %s revoked", reused.family_id)
+        raise exceptions.invalid_refresh_token_exception
+    db.commit()
+    return oauth2.token_response(user_id, refresh_token)
+
+# Logging out: the refresh token and every token rotated from the same login stop working
+@router.post("/token/revoke", status_code=status.HTTP_204_NO_CONTENT)
+def revoke_refresh_token(
+    body: schemas.RefreshTokenRequest,
+    db: deps.DBSession
+):
+    db.execute(*refresh_tokens.revoke(body.refresh_token))
+    db.commit()
@@ -0,0 +1,25 @@
+from typing import Annotated
+from fastapi import APIRouter, Header, Query
+from .. import schemas, deps, timeline
+from ..feed_cache import Page
+
+router = APIRouter(
+    prefix="/feed",
+    tags=['Feed']
+)
+
+FEED_PAGE_MAX = 100
+
+# Home timeline: published posts by the accounts the caller follows, newest first.
+# Keyset pages; the next page's cursor comes back in X-Next-Cursor. Pages carry an ETag
+# like GET /posts, but are built per reader, so they are never shared through feed_cache.
+@router.get("/", response_model=list[schemas.PostWithVotes])
+def get_feed(
+    db: deps.ReadDBSession,
+    current_user: deps.TokenUser,
+    limit: Annotated[int, Query(ge=1, le=FEED_PAGE_MAX)] = 10,
+    cursor: str | None = None,
+    if_none_match: Annotated[str | None, Header()] = None
+):
+    posts = db.execute(*timeline.page(current_user.id, limit, cursor)).all()
+    return Page(posts, timeline.next_cursor(posts, limit)).response(if_none_match)
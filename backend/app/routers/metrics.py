@@ -0,0 +1,31 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from .. import database, instrumentation, replicas
+from ..pool import pool_status
+
+router = APIRouter(
+    prefix="/metrics",
+    tags=['Metrics']
+)
+
+# Checked-out connections, overflow in use and time spent waiting for a connection
+@router.get("/pool")
+def get_pool_metrics():
+    return {
+        "sync": pool_status(database.engine.pool),
+        "async": pool_status(database.async_engine.pool),
+        "replicas": [
+            {**status, "sync": pool_status(replica.engine.pool), "async": pool_status(replica.async_engine.pool)}
+            for replica, status in zip(replicas.replica_set.replicas, replicas.replica_set.status())
+        ],
+    }
+
+# Prometheus scrape target: per-route latency histograms, in-flight requests,
+# statement counts/time, slow queries and the pool numbers above
+@router.get("", response_class=PlainTextResponse)
+def get_prometheus_metrics():
+    pools = {
+        "sync": pool_status(database.engine.pool),
+        "async": pool_status(database.async_engine.pool),
+    }
+    return PlainTextResponse(instrumentation.render_prometheus(pools), media_type="text/plain; version=0.0.4")
@@ -1,12 +1,21 @@
-from fastapi import status, HTTPException, APIRouter
-from sqlalchemy import func, or_
-from .. import models, schemas, deps
+from typing import Annotated
+from fastapi import status, HTTPException, APIRouter, Body, Header, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
+from .. import models, schemas, deps, queries, bulk, serialization, export, etags, timeline, counts
+from ..feed_cache import feed_cache, Page
+from ..config import settings
 
 router = APIRouter(
     prefix="/posts",
     tags=['Posts']
 )
 
+EXPORT_RESPONSES = {200: {"content": {export.NDJSON_MEDIA_TYPE: {}}}}
+POSTS_PAGE_MAX = 100
+TRENDING_PAGE_MAX = 100
+
 # # CRUD for managing posts
 
 # CRUD - C (ORM done)
@@ -18,59 +27,119 @@ def create_post(
 ):
     new_post = models.Post(**post.model_dump(), user_id=current_user.id)
     db.add(new_post)
+    db.flush()
+    post_id = new_post.id
+    for statement, params in timeline.fan_out([post_id]):
+        db.execute(statement, params)
     db.commit()
-    db.refresh(new_post)
-    return new_post
+    feed_cache.invalidate(current_user.id)
+    # reload with the owner in the same statement instead of a refresh plus a lazy load
+    return db.query(models.Post).options(joinedload(models.Post.owner)).filter(models.Post.id == post_id).one()
+
+# All-or-nothing bulk create; returns the new ids in request order
+@router.post("/batch", status_code=status.HTTP_201_CREATED, response_model=schemas.PostBatchResponse)
+def create_posts_batch(
+    posts: Annotated[list[schemas.PostCreate], Body(min_length=1, max_length=settings.post_batch_max)],
+    db: deps.DBSession,
+    current_user: deps.CurrentUser
+):
+    rows = [{**post.model_dump(), "user_id": current_user.id} for post in posts]
+    if len(rows) >= settings.post_batch_copy_threshold:
+        ids = bulk.copy_posts(db.connection().connection.driver_connection, rows)
+    else:
+        ids = list(db.execute(bulk.insert_posts_statement(), rows).scalars())
+    for statement, params in timeline.fan_out(ids):
+        db.execute(statement, params)
+    db.commit()
+    feed_cache.invalidate(current_user.id)
+    return schemas.PostBatchResponse(ids=ids)
 
 # CRUD - R (ORM done)
+# Public pages come from feed_cache without touching the database; every page carries an
+# ETag, and a matching If-None-Match gets a 304 without a body.
+# With ?count=true, X-Total-Count says how many posts the list holds (see counts.py).
 @router.get("/", response_model=list[schemas.PostWithVotes])
 def get_posts(
-    db: deps.DBSession,
-    current_user: deps.CurrentUser,
-    limit: int = 10,
+    db: deps.ReadDBSession,
+    current_user: deps.TokenUser,
+    limit: Annotated[int, Query(ge=1, le=POSTS_PAGE_MAX)] = 10,
     offset: int = 0,
-    search: str = ""
+    cursor: str | None = None,
+    search: str = "",
+    count: bool = False,
+    if_none_match: Annotated[str | None, Header()] = None
 ):
-    posts = db.query(
-        models.Post, func.count(models.Vote.post_id).label("vote_count")
-    ).join(
-        models.Vote,
-        models.Post.id == models.Vote.post_id,
-        isouter=True
-    ).group_by(models.Post.id).filter(
-        or_(
-            models.Post.user_id == current_user.id,
-            models.Post.published == True
-        ), models.Post.title.contains(search)
-    ).order_by(models.Post.id).limit(limit).offset(offset).all()
-    return posts
+    key = (limit, offset if cursor is None else None, cursor, search)
+    page = feed_cache.get(current_user.id, key)
+    if page is None:
+        version = feed_cache.version
+        posts = db.execute(*queries.feed_page(current_user.id, limit, offset, cursor, search)).all()
+        page = Page(posts, queries.next_feed_cursor(posts, limit, search))
+        feed_cache.set(version, current_user.id, key, posts, page)
+    response = page.response(if_none_match)
+    if count:
+        statements, params = queries.posts_count(current_user.id, search)
+        total = counts.total_count(db, ("posts", current_user.id, search), statements, params)
+        response.headers.update(total.headers())
+    return response
 
 
+# Every post the caller can see, with vote counts, as NDJSON from a server-side cursor.
+# gzip-encoded when the client accepts it; pass the last id received as `after_id` to resume.
+@router.get("/export", response_class=StreamingResponse, responses=EXPORT_RESPONSES)
+def export_posts(
+    db: deps.ReadDBSession,
+    current_user: deps.TokenUser,
+    after_id: int = 0,
+    accept_encoding: Annotated[str | None, Header()] = None
+):
+    result = db.execute(queries.posts_export(
+        select(*queries.POST_WITH_VOTES_COLUMNS).join(models.Post.owner), current_user.id, after_id
+    ).execution_options(yield_per=export.EXPORT_CHUNK_ROWS))
+    chunks = export.encode_partitions(
+        result.partitions(), lambda rows: export.ndjson_chunk(rows, serialization.post_with_votes)
+    )
+    headers = export.attachment("posts.ndjson")
+    if export.accepts_gzip(accept_encoding):
+        chunks = export.gzip_chunks(chunks)
+        headers.update(export.GZIP_HEADERS)
+    return StreamingResponse(chunks, media_type=export.NDJSON_MEDIA_TYPE, headers=headers)
+
+
+# Published posts ranked by votes decayed by age (posts.hot_score, kept up to date with
+# vote_count), best first; keyset pages with the next cursor in X-Next-Cursor, and an ETag
+@router.get("/trending", response_model=list[schemas.PostWithVotes])
+def get_trending_posts(
+    db: deps.ReadDBSession,
+    current_user: deps.TokenUser,
+    limit: Annotated[int, Query(ge=1, le=TRENDING_PAGE_MAX)] = 10,
+    cursor: str | None = None,
+    if_none_match: Annotated[str | None, Header()] = None
+):
+    posts = db.execute(*queries.trending_page(limit, cursor)).all()
+    return Page(posts, queries.next_trending_cursor(posts, limit)).response(if_none_match)
+
 @router.get("/{id}", response_model=schemas.PostWithVotes) # path parameter
 def get_post(
     id: int,
-    db: deps.DBSession,
-    current_user: deps.CurrentUser
+    db: deps.ReadDBSession,
+    current_user: deps.TokenUser,
+    if_none_match: Annotated[str | None, Header()] = None
 ):
-    post = db.query(
-        models.Post, func.count(models.Vote.post_id).label("vote_count")
-    ).join(
-        models.Vote,
-        models.Post.id == models.Vote.post_id,
-        isouter=True
-    ).group_by(
-        models.Post.id
-    ).filter(models.Post.id == id).first()
+    post = db.execute(queries.POST_BY_ID, {"id": id}).first()
     if post is None:
         raise HTTPException(
             status_code=404,
             detail=f"Post with id {id} not found!"
         )
-    if not (post[0].published or post[0].user_id == current_user.id):
+    if not (post.published or post.user_id == current_user.id):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, detail=f"Not authorized to perform requested action"
         )
-    return post
+    headers = etags.headers(etags.post_etag(post))
+    if etags.matches(if_none_match, headers["ETag"]):
+        return etags.not_modified(headers)
+    return serialization.json_response(serialization.post_with_votes(post), headers)
 
 # CRUD - U (ORM done)
 @router.put("/{id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -88,11 +157,18 @@ def update_post(
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, detail=f"Not authorized to perform requested action"
         )
+    # a draft being published reaches followers now, an unpublished post leaves their timelines
+    published_changed = payload.published != post.published
     post.title = payload.title
     post.content = payload.content
     post.category = payload.category
     post.published = payload.published
+    if published_changed:
+        db.flush()
+        for statement, params in timeline.set_published(id, payload.published):
+            db.execute(statement, params)
     db.commit()
+    feed_cache.invalidate(current_user.id)
     return
 
 # CRUD - D (ORM done)
@@ -102,7 +178,8 @@ def delete_post(
     db: deps.DBSession,
     current_user: deps.CurrentUser
 ):
-    deleted_post = db.query(models.Post).filter(models.Post.id == id).first()
+    # owner is loaded up front: it is serialized after the post is deleted and detached
+    deleted_post = db.query(models.Post).options(joinedload(models.Post.owner)).filter(models.Post.id == id).first()
     if deleted_post is None:
         raise HTTPException(
             status_code=404, detail=f"Post with id {id} not found!"
@@ -113,5 +190,6 @@ def delete_post(
         )
     db.delete(deleted_post)
     db.commit()
+    feed_cache.invalidate(current_user.id)
     return deleted_post
 
@@ -1,11 +1,21 @@
-from fastapi import status, Depends, HTTPException, APIRouter
-from .. import models, schemas, utils, deps
+from typing import Annotated
+from fastapi import status, Depends, HTTPException, APIRouter, Query, Response
+from fastapi.responses import StreamingResponse
+from psycopg.errors import ForeignKeyViolation
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from .. import models, schemas, utils, deps, oauth2, exceptions, export, pagination, queries, serialization, timeline, counts, refresh_tokens
+from ..feed_cache import feed_cache
 
 router = APIRouter(
     prefix="/users",
     tags=['Users']
 )
 
+USERS_PAGE_MAX = 1000
+USER_EXPORT_COLUMNS = ["id", "email", "created_at"]
+EXPORT_RESPONSES = {200: {"content": {export.NDJSON_MEDIA_TYPE: {}, export.CSV_MEDIA_TYPE: {}}}}
+
 # # CRUD for managing users
 
 # CRUD - C
@@ -25,19 +35,45 @@ def create_user(
     return new_user
 
 # CRUD - R
+# Keyset pages in id order; the next page's cursor comes back in X-Next-Cursor, and the
+# number of users in X-Total-Count with ?count=true
 @router.get("/", response_model=list[schemas.UserResponse])
 def get_users(
-    db: deps.DBSession,
-    current_user: deps.CurrentUser
+    db: deps.ReadDBSession,
+    current_user: deps.TokenUser,
+    limit: Annotated[int, Query(ge=1, le=USERS_PAGE_MAX)] = 100,
+    cursor: str | None = None,
+    count: bool = False
 ):
-    users = db.query(models.User).all()
-    return users
+    users = queries.users_page(db.query(*queries.USER_COLUMNS), limit, cursor).all()
+    next_cursor = queries.next_users_cursor(users, limit)
+    headers = {pagination.NEXT_CURSOR_HEADER: next_cursor} if next_cursor is not None else {}
+    if count:
+        headers.update(counts.total_count(db, ("users",), queries.USERS_COUNT_STATEMENTS, {}).headers())
+    return serialization.json_response([serialization.user_response(user) for user in users], headers)
+
+# Every user, streamed from a server-side cursor as NDJSON (default) or CSV
+@router.get("/export", response_class=StreamingResponse, responses=EXPORT_RESPONSES)
+def export_users(
+    db: deps.ReadDBSession,
+    current_user: deps.TokenUser,
+    format: export.ExportFormat = "ndjson"
+):
+    result = db.execute(
+        select(*queries.USER_COLUMNS).order_by(models.User.id)
+        .execution_options(yield_per=export.EXPORT_CHUNK_ROWS)
+    )
+    encode, prefix, media_type = export.encoder(format, serialization.user_response, USER_EXPORT_COLUMNS)
+    return StreamingResponse(
+        export.encode_partitions(result.partitions(), encode, prefix),
+        media_type=media_type, headers=export.attachment(f"users.{format}")
+    )
 
 @router.get("/{id}", response_model=schemas.UserResponse) # path parameter
 def get_user(
     id: int,
-    db: deps.DBSession,
-    current_user: deps.CurrentUser
+    db: deps.ReadDBSession,
+    current_user: deps.TokenUser
 ):
     user = db.query(models.User).filter(models.User.id == id).first()
     if user is None:
@@ -62,9 +98,17 @@ def update_user(
         raise HTTPException(status_code=409, detail="Email already registered")
     
     user = db.query(models.User).filter(models.User.id == current_user.id).first()
+    if user is None: # deleted since its identity was cached
+        oauth2.user_cache.pop(current_user.id)
+        raise exceptions.credentials_exception
     user.email = payload.email
     user.password = utils.get_password_hash(payload.password)
+    # sessions started with the old password end at their next refresh
+    db.execute(*refresh_tokens.revoke_user(current_user.id))
     db.commit()
+    oauth2.user_cache.pop(current_user.id)
+    # their posts render with the owner's email
+    feed_cache.invalidate()
     db.refresh(user)
     return user
 
@@ -76,6 +120,50 @@ def delete_user(
     if current_user.id != id:
         raise HTTPException(status_code=403, detail="Not authorized")
     deleted_user = db.query(models.User).filter(models.User.id == current_user.id).first()
+    if deleted_user is None:
+        oauth2.user_cache.pop(current_user.id)
+        raise exceptions.credentials_exception
     db.delete(deleted_user)
     db.commit()
-    return deleted_user
\ No newline at end of file
+    oauth2.user_cache.pop(current_user.id)
+    # their posts are deleted with them
+    feed_cache.invalidate()
+    return deleted_user
+
+# Following is idempotent like voting: 201 when the follow was just added, 200 when it
+# already existed. A new follow backfills the followee's recent posts into the caller's
+# home timeline (see timeline.py), in the same transaction.
+@router.post("/{id}/follow", status_code=status.HTTP_201_CREATED)
+def follow_user(
+    id: int, db: deps.DBSession, current_user: deps.CurrentUser, response: Response
+):
+    if id == current_user.id:
+        raise exceptions.cannot_follow_self_exception
+    try:
+        changed = db.execute(queries.FOLLOW_INSERT, {"follower_id": current_user.id, "followee_id": id}).first()
+        if changed is not None:
+            for statement, params in timeline.backfill(current_user.id, id):
+                db.execute(statement, params)
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        raise follow_integrity_error(e)
+    if changed is None:
+        response.status_code = status.HTTP_200_OK
+    return {"followee_id": id, "follower_id": current_user.id}
+
+# Unfollowing takes the followee's posts out of the caller's timeline; 204 either way
+@router.delete("/{id}/follow", status_code=status.HTTP_204_NO_CONTENT)
+def unfollow_user(id: int, db: deps.DBSession, current_user: deps.CurrentUser):
+    params = {"follower_id": current_user.id, "followee_id": id}
+    if db.execute(queries.FOLLOW_DELETE, params).first() is not None:
+        db.execute(timeline.UNFOLLOW, params)
+    db.commit()
+
+# A foreign key violation means the followee (or, rarely, the caller) no longer exists
+def follow_integrity_error(e: IntegrityError) -> Exception:
+    if not isinstance(e.orig, ForeignKeyViolation):
+        return e
+    if e.orig.diag.constraint_name == "follows_follower_id_fkey":
+        return exceptions.credentials_exception
+    return exceptions.user_not_found_exception
@@ -1,36 +1,72 @@
-from fastapi import status, HTTPException, APIRouter
-from .. import models, schemas, deps
+from fastapi import status, APIRouter, Response
+from psycopg.errors import ForeignKeyViolation
+from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError
+from .. import models, schemas, deps, exceptions, queries
+from ..config import settings
+from ..vote_buffer import vote_buffer, known_posts
+from ..feed_cache import feed_cache
 
 router = APIRouter(
     prefix="/vote",
     tags=['Votes']
 )
 
+# One statement per vote, no read-then-write race: the upvote is an INSERT .. ON CONFLICT DO NOTHING
+# and the un-vote a DELETE, both RETURNING the row they changed. Repeating a request is harmless:
+# 201 means the vote was just added, 200 that it was already in the requested state.
+# posts.vote_count is kept in step by the votes_vote_count_* triggers, in the same transaction.
+# With settings.vote_write_behind the vote is only validated and buffered: 202, written shortly.
 @router.post("/", status_code=status.HTTP_201_CREATED)
 def vote(
     vote: schemas.Vote,
     db: deps.DBSession,
-    current_user: deps.CurrentUser
+    current_user: deps.CurrentUser,
+    response: Response
 ):
-    post = db.query(models.Post).filter(models.Post.id == vote.post_id).first()
-    if post is None:
-        raise HTTPException(status_code=404, detail="Post not found")
-    found_vote = db.query(models.Vote).filter(
-        models.Vote.post_id == vote.post_id,
-        models.Vote.user_id == current_user.id
-    ).first()
+    if settings.vote_write_behind:
+        if not known_posts.get(vote.post_id):
+            if db.scalar(select(models.Post.id).where(models.Post.id == vote.post_id)) is None:
+                raise exceptions.post_not_found_exception
+            known_posts.set(vote.post_id, True)
+        vote_buffer.add(current_user.id, vote.post_id, vote.dir)
+        response.status_code = status.HTTP_202_ACCEPTED
+        return {"post_id": vote.post_id, "user_id": current_user.id}
     if (vote.dir == 1):
-        if found_vote:
-            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"user already has a vote on post_id {vote.post_id}")
-        new_vote = models.Vote(user_id=current_user.id, post_id=vote.post_id)
-        db.add(new_vote)
-        db.commit()
-        db.refresh(new_vote)
-        return new_vote
+        try:
+            changed = db.execute(
+                queries.VOTE_INSERT, {"user_id": current_user.id, "post_id": vote.post_id}
+            ).first()
+            db.commit()
+        except IntegrityError as e:
+            db.rollback()
+            raise vote_integrity_error(e)
     else:
-        if found_vote is None:
-            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"user does not have a vote on post_id {vote.post_id}")
-        db.delete(found_vote)
+        changed = db.execute(
+            queries.VOTE_DELETE, {"user_id": current_user.id, "post_id": vote.post_id}
+        ).first()
         db.commit()
-        return found_vote
\ No newline at end of file
+    if changed is None:
+        response.status_code = status.HTTP_200_OK
+    else:
+        feed_cache.invalidate()
+    return {"post_id": vote.post_id, "user_id": current_user.id}
+
+# The current user's vote on a post, including one still waiting in the write-behind buffer
+@router.get("/{post_id}")
+def get_vote(post_id: int, db: deps.ReadDBSession, current_user: deps.TokenUser):
+    voted = vote_buffer.pending(current_user.id, post_id)
+    if voted is None:
+        voted = db.scalar(select(models.Vote.post_id).where(
+            models.Vote.post_id == post_id, models.Vote.user_id == current_user.id
+        )) is not None
+    return {"post_id": post_id, "user_id": current_user.id, "voted": bool(voted)}
+
+# A foreign key violation on insert means the post (or, rarely, the voter) no longer exists;
+# anything else is re-raised as is
+def vote_integrity_error(e: IntegrityError) -> Exception:
+    if not isinstance(e.orig, ForeignKeyViolation):
+        return e
+    if e.orig.diag.constraint_name == "votes_user_id_fkey":
+        return exceptions.credentials_exception
+    return exceptions.post_not_found_exception
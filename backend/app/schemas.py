@@ -38,6 +38,9 @@ class PostResponse(PostBase):
     class Config:
         from_attributes = True
 
+class PostBatchResponse(BaseModel):
+    ids: list[int]
+
 class PostWithVotes(BaseModel):
     Post: PostResponse
     vote_count: int
@@ -50,11 +53,19 @@ class PostWithVotes(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: str
+
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
 
 class TokenData(BaseModel):
     sub: str | None = None
     exp: datetime | None = None
 
+# Identity taken straight from a verified token, without a database lookup
+class TokenUser(BaseModel):
+    id: int
+
 # Voting management schema
 
 class Vote(BaseModel):
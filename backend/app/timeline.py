@@ -0,0 +1,161 @@
+from sqlalchemy import Select, bindparam, select, text, true, union, Integer
+from . import models, pagination, queries
+from .config import settings
+
+# Home timelines, fanned out on write. Publishing a post copies its id into the timeline of
+# every follower of its author, in the same transaction, so GET /feed is one index range
+# scan of the reader's own timeline rows instead of an `IN (everyone I follow)` scan of posts.
+#
+# Authors with timeline_pull_min_followers or more followers are not fanned out (one post
+# would be that many writes); a reader pulls their newest posts at read time instead, one
+# index range per such author (ix_posts_user_id_id), merged with the timeline page.
+# Timelines are trimmed to timeline_max_entries, amortized over timeline_trim_every posts.
+# Timeline rows cascade with their post, and are deleted when it is unpublished.
+#
+# Callers run the statements returned here with their own session, sync or async.
+
+# params: follower_id, followee_id, max_entries, pull_min_followers.
+# A new follow brings in the followee's recent posts, unless they are pulled at read time.
+BACKFILL = text("""
+    INSERT INTO timeline (user_id, post_id)
+    SELECT :follower_id, posts.id
+    FROM posts
+    WHERE posts.user_id = :followee_id
+      AND posts.published
+      AND (SELECT follower_count FROM users WHERE id = :followee_id) < :pull_min_followers
+    ORDER BY posts.id DESC
+    LIMIT :max_entries
+    ON CONFLICT DO NOTHING
+""")
+
+# params: follower_id, followee_id
+UNFOLLOW = text("""
+    DELETE FROM timeline
+    USING posts
+    WHERE timeline.user_id = :follower_id
+      AND posts.id = timeline.post_id
+      AND posts.user_id = :followee_id
+""")
+
+# params: post_id. A post that is no longer published leaves every timeline; publishing it
+# again fans it out again.
+UNPUBLISH = text("DELETE FROM timeline WHERE post_id = :post_id")
+
+# Drops everything older than each reader's newest max_entries rows; `readers` is a
+# subquery of user ids. The cutoff is looked up once per reader, not per row.
+def _trim(readers: str) -> str:
+    return f"""
+        DELETE FROM timeline
+        USING (
+            SELECT reader.id, oldest.post_id
+            FROM ({readers}) AS reader(id)
+            CROSS JOIN LATERAL (
+                SELECT post_id FROM timeline
+                WHERE user_id = reader.id
+                ORDER BY post_id DESC
+                OFFSET :max_entries LIMIT 1
+            ) AS oldest
+        ) AS cutoff
+        WHERE timeline.user_id = cutoff.id AND timeline.post_id <= cutoff.post_id
+    """
+
+# params: post_ids, pull_min_followers, trim, max_entries. Skips unpublished posts, so any
+# new ids can be passed. With `trim`, the timelines written to are also trimmed, in the same
+# statement; the trim doesn't see the rows being inserted, so it keeps max_entries besides them.
+FAN_OUT = text("""
+    WITH fanned_out AS (
+        INSERT INTO timeline (user_id, post_id)
+        SELECT follows.follower_id, posts.id
+        FROM posts
+        JOIN users ON users.id = posts.user_id
+        JOIN follows ON follows.followee_id = posts.user_id
+        WHERE posts.id = ANY(CAST(:post_ids AS integer[]))
+          AND posts.published
+          AND users.follower_count < :pull_min_followers
+        ON CONFLICT DO NOTHING
+        RETURNING user_id
+    )
+""" + _trim("SELECT DISTINCT user_id FROM fanned_out WHERE :trim"))
+
+# params: user_id, max_entries
+TRIM_USER = text(_trim("SELECT CAST(:user_id AS integer)"))
+
+# Statements that copy newly written posts (`post_ids`) to their author's followers
+def fan_out(post_ids: list[int]) -> list[tuple]:
+    return [(FAN_OUT, {
+        "post_ids": post_ids,
+        "pull_min_followers": settings.timeline_pull_min_followers,
+        "trim": any(post_id % settings.timeline_trim_every == 0 for post_id in post_ids),
+        "max_entries": settings.timeline_max_entries,
+    })]
+
+# Statements that fill `follower_id`'s timeline after they followed `followee_id`
+def backfill(follower_id: int, followee_id: int) -> list[tuple]:
+    return [
+        (BACKFILL, {
+            "follower_id": follower_id, "followee_id": followee_id,
+            "max_entries": settings.timeline_max_entries,
+            "pull_min_followers": settings.timeline_pull_min_followers,
+        }),
+        (TRIM_USER, {"user_id": follower_id, "max_entries": settings.timeline_max_entries}),
+    ]
+
+# Statements for a post whose `published` flag was just changed to `published`
+def set_published(post_id: int, published: bool) -> list[tuple]:
+    if published:
+        return fan_out([post_id])
+    return [(UNPUBLISH, {"post_id": post_id})]
+
+# Newest first. Each half is limited on its own, then the two are merged; UNION also drops
+# a post found in both, e.g. fanned out before its author crossed the pull threshold.
+# The reader's timeline rows are limited before posts are joined, so Postgres can't walk
+# posts in id order looking for them; unpublished posts are taken out of timelines (UNPUBLISH).
+def _page_statement(after: bool) -> Select:
+    limit = bindparam("limit", type_=Integer)
+    entries = (
+        select(models.TimelineEntry.post_id)
+        .where(models.TimelineEntry.user_id == bindparam("user_id"))
+        .order_by(models.TimelineEntry.post_id.desc())
+        .limit(limit)
+    )
+    pulled_authors = (
+        select(models.Follow.followee_id.label("id"))
+        .join(models.User, models.User.id == models.Follow.followee_id)
+        .where(
+            models.Follow.follower_id == bindparam("user_id"),
+            models.User.follower_count >= bindparam("pull_min_followers")
+        )
+        .subquery("pulled_authors")
+    )
+    pulled_posts = (
+        select(*queries.POST_WITH_VOTES_COLUMNS).join(models.Post.owner)
+        .where(models.Post.user_id == pulled_authors.c.id, models.Post.published == true())
+        .order_by(models.Post.id.desc())
+        .limit(limit)
+    )
+    if after:
+        entries = entries.where(models.TimelineEntry.post_id < bindparam("last_id"))
+        pulled_posts = pulled_posts.where(models.Post.id < bindparam("last_id"))
+    entries = entries.subquery("entries")
+    pushed = (
+        select(*queries.POST_WITH_VOTES_COLUMNS).select_from(entries)
+        .join(models.Post, models.Post.id == entries.c.post_id).join(models.Post.owner)
+        .where(models.Post.published == true())
+    )
+    pulled_posts = pulled_posts.lateral("pulled_posts")
+    pulled = select(pulled_posts).select_from(pulled_authors).join(pulled_posts, true())
+    merged = union(pushed, pulled).subquery("merged")
+    return select(merged).order_by(merged.c.id.desc()).limit(limit)
+
+# has cursor -> statement
+PAGE_STATEMENTS = {after: _page_statement(after) for after in (False, True)}
+
+# The timeline statement for these request parameters, and the values to run it with
+def page(user_id: int, limit: int, cursor: str | None) -> tuple[Select, dict]:
+    params = {"user_id": user_id, "limit": limit, "pull_min_followers": settings.timeline_pull_min_followers}
+    if cursor is not None:
+        (params["last_id"],) = pagination.decode_cursor(cursor, "id")
+    return PAGE_STATEMENTS[cursor is not None], params
+
+def next_cursor(posts, limit: int) -> str | None:
+    return queries.next_feed_cursor(posts, limit, "")
@@ -1,11 +1,113 @@
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pwdlib import PasswordHash
+from pwdlib.hashers.argon2 import Argon2Hasher
+from . import config, exceptions
 
 
 # Password Hashing
-password_hash = PasswordHash.recommended()
+password_hash = PasswordHash((
+    Argon2Hasher(
+        time_cost=config.settings.argon2_time_cost,
+        memory_cost=config.settings.argon2_memory_cost,
+        parallelism=config.settings.argon2_parallelism,
+    ),
+))
 
-def get_password_hash(password: str):
+def _hash(password: str):
     return password_hash.hash(password=password)
 
+def _verify(plain_password, hashed_password):
+    return password_hash.verify(plain_password, hashed_password)
+
+# argon2 burns tens of milliseconds of CPU and memory per call, so it runs in its own
+# worker processes instead of on request workers. At most `max_pending` calls may be
+# queued or running; past that callers get a 503 instead of piling up behind a login storm.
+# The processes start on first use, so a pool shut down at the end of one app lifespan
+# comes back for the next; a pool broken by a dying worker is replaced the same way.
+class HashPool:
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self._executor = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_pending)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn, not fork: the API process is multi-threaded
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+            return self._executor
+
+    def _discard(self, executor: ProcessPoolExecutor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _done(self, executor: ProcessPoolExecutor, future: Future):
+        self._slots.release()
+        if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+            self._discard(executor)
+
+    def submit(self, fn, *args) -> Future:
+        if not self._slots.acquire(blocking=False):
+            raise exceptions.hashing_busy_exception
+        executor = self._get_executor()
+        try:
+            future = executor.submit(fn, *args)
+        except (BrokenProcessPool, RuntimeError):
+            # a worker died, or the pool is being shut down: the caller retries on a new one
+            self._slots.release()
+            self._discard(executor)
+            raise exceptions.hashing_busy_exception
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda future: self._done(executor, future))
+        return future
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+# hash_workers = 0 hashes inline on the calling worker (handy for scripts and tests)
+hash_pool = (
+    HashPool(config.settings.hash_workers, config.settings.hash_max_pending)
+    if config.settings.hash_workers > 0 else None
+)
+
+# Sync routes run in the threadpool, so they can simply block on the result.
+# A worker dying mid-call is answered like a full queue: 503, try again.
+def _call(fn, *args):
+    if hash_pool is None:
+        return fn(*args)
+    try:
+        return hash_pool.submit(fn, *args).result()
+    except BrokenProcessPool:
+        raise exceptions.hashing_busy_exception
+
+async def _call_async(fn, *args):
+    if hash_pool is None:
+        return fn(*args)
+    try:
+        return await asyncio.wrap_future(hash_pool.submit(fn, *args))
+    except BrokenProcessPool:
+        raise exceptions.hashing_busy_exception
+
+def get_password_hash(password: str):
+    return _call(_hash, password)
+
 def verify_password(plain_password, hashed_password):
-    return password_hash.verify(plain_password, hashed_password)
\ No newline at end of file
+    return _call(_verify, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str):
+    return await _call_async(_hash, password)
+
+async def verify_password_async(plain_password, hashed_password):
+    return await _call_async(_verify, plain_password, hashed_password)
@@ -0,0 +1,147 @@
+import asyncio
+import logging
+import threading
+from sqlalchemy import text
+from . import cache, database, exceptions
+from .config import settings
+from .feed_cache import feed_cache
+
+# Write-behind votes (settings.vote_write_behind). A vote is validated and answered with 202
+# straight away; the intent waits here, keyed by (user_id, post_id) so the last one wins, and
+# a background task writes the whole buffer in one transaction every vote_flush_interval_ms,
+# or as soon as vote_flush_max_items intents are waiting. A hot post then takes one
+# vote_count update per flush instead of one per vote. Until a flush lands, reads of the
+# user's own vote go through pending() first. The buffer is per worker process and is
+# flushed once more on shutdown; a crash loses at most one interval of votes.
+
+logger = logging.getLogger("app.vote_buffer")
+
+# Each statement skips votes for posts/users deleted since validation, so one stale intent
+# can't fail the batch. Both take their row locks in (post_id, user_id) order, the insert as
+# it writes and the delete by locking the rows it will remove first, so concurrent flushes
+# (one per worker) wait on each other instead of deadlocking.
+FLUSH_INSERT = text("""
+    INSERT INTO votes (user_id, post_id)
+    SELECT intent.user_id, intent.post_id
+    FROM unnest(CAST(:user_ids AS integer[]), CAST(:post_ids AS integer[])) AS intent(user_id, post_id)
+    WHERE EXISTS (SELECT 1 FROM posts WHERE posts.id = intent.post_id)
+      AND EXISTS (SELECT 1 FROM users WHERE users.id = intent.user_id)
+    ORDER BY intent.post_id, intent.user_id
+    ON CONFLICT DO NOTHING
+""")
+FLUSH_DELETE = text("""
+    WITH doomed AS MATERIALIZED (
+        SELECT votes.user_id, votes.post_id
+        FROM votes
+        JOIN unnest(CAST(:user_ids AS integer[]), CAST(:post_ids AS integer[])) AS intent(user_id, post_id)
+          ON votes.user_id = intent.user_id AND votes.post_id = intent.post_id
+        ORDER BY votes.post_id, votes.user_id
+        FOR UPDATE OF votes
+    )
+    DELETE FROM votes
+    USING doomed
+    WHERE votes.user_id = doomed.user_id AND votes.post_id = doomed.post_id
+""")
+
+# keys in lock order
+def _columns(keys: list[tuple[int, int]]) -> dict:
+    keys = sorted(keys, key=lambda key: (key[1], key[0]))
+    return {"user_ids": [user_id for user_id, _ in keys], "post_ids": [post_id for _, post_id in keys]}
+
+class VoteBuffer:
+    def __init__(self, max_items: int, max_pending: int):
+        self.max_items = max_items
+        self.max_pending = max_pending
+        self._intents: dict[tuple[int, int], int] = {}
+        # the batch being written right now, still visible to pending()
+        self._flushing: dict[tuple[int, int], int] = {}
+        self._lock = threading.Lock()
+        # serializes flushes (the background task and the final one on shutdown)
+        self._flush_lock = threading.Lock()
+        # set when max_items are waiting, even before run() starts waiting on it
+        self._wake = asyncio.Event()
+        self._loop = None
+
+    # Called from sync routes' threadpool workers as well as the event loop
+    def add(self, user_id: int, post_id: int, dir: int):
+        with self._lock:
+            key = (user_id, post_id)
+            # the batch being flushed counts too: if the flush fails it comes back
+            if key not in self._intents and len(self) >= self.max_pending:
+                # the database is down or can't keep up; don't grow without bound
+                raise exceptions.vote_buffer_full_exception
+            self._intents[key] = dir
+            full = len(self._intents) >= self.max_items
+        if full:
+            loop = self._loop
+            if loop is not None:
+                loop.call_soon_threadsafe(self._wake.set)
+            else:
+                # nothing waits yet; run() finds it set and flushes straight away
+                self._wake.set()
+
+    # The user's unflushed vote on the post (1 or 0), or None to ask the database
+    def pending(self, user_id: int, post_id: int) -> int | None:
+        key = (user_id, post_id)
+        with self._lock:
+            dir = self._intents.get(key)
+            return dir if dir is not None else self._flushing.get(key)
+
+    def __len__(self):
+        return len(self._intents) + len(self._flushing)
+
+    # Write everything buffered so far; returns the number of intents written
+    def flush(self) -> int:
+        with self._flush_lock:
+            with self._lock:
+                batch, self._intents = self._intents, {}
+                self._flushing = batch
+            if not batch:
+                return 0
+            upvotes = [key for key, dir in batch.items() if dir == 1]
+            unvotes = [key for key, dir in batch.items() if dir == 0]
+            try:
+                with database.engine.begin() as conn:
+                    if upvotes:
+                        conn.execute(FLUSH_INSERT, _columns(upvotes))
+                    if unvotes:
+                        conn.execute(FLUSH_DELETE, _columns(unvotes))
+            except Exception:
+                # put the batch back for the next attempt, behind anything newer
+                with self._lock:
+                    self._intents = {**batch, **self._intents}
+                    self._flushing = {}
+                raise
+            with self._lock:
+                self._flushing = {}
+            feed_cache.invalidate()
+            return len(batch)
+
+    # Runs for the app's lifetime (started from main.lifespan); cancel, then flush() once more
+    async def run(self, interval: float):
+        self._loop = asyncio.get_running_loop()
+        try:
+            while True:
+                try:
+                    async with asyncio.timeout(interval):
+                        await self._wake.wait()
+                except TimeoutError:
+                    pass
+                self._wake.clear()
+                try:
+                    await asyncio.to_thread(self.flush)
+                except Exception:
+                    logger.exception("vote flush failed, %d intents kept for retry", len(self))
+        finally:
+            self._loop = None
+            # an Event belongs to the loop that waited on it; the next run() may be on another
+            woken = self._wake.is_set()
+            self._wake = asyncio.Event()
+            if woken:
+                self._wake.set()
+
+vote_buffer = VoteBuffer(max_items=settings.vote_flush_max_items, max_pending=settings.vote_buffer_max_pending)
+
+# Posts recently seen to exist, so validating a vote on a hot post costs no query.
+# A post deleted meanwhile is skipped by the flush.
+known_posts = cache.TTLCache(maxsize=settings.user_cache_size, ttl=settings.user_cache_ttl)
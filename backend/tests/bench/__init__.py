@@ -0,0 +1,5 @@
+import os
+
+# Every benchmark request comes from one client, so per-user/IP rate limits would only
+# measure the limiter; the load test can turn them back on with --set RATE_LIMIT_ENABLED=true
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
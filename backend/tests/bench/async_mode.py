@@ -0,0 +1,62 @@
+# Requests per second of the sync (threadpool) routes against the async (AsyncEngine) routes.
+# Starts a uvicorn server per mode with DB_ASYNC overridden and drives it over HTTP.
+#   python -m tests.bench.async_mode [--concurrency 100] [--duration 15]
+import argparse
+import asyncio
+import random
+import time
+import httpx
+from . import common
+
+async def drive(base_url: str, headers: dict, post_ids: list[int], concurrency: int, duration: float) -> dict:
+    counts = {"ok": 0, "error": 0}
+    deadline = time.perf_counter() + duration
+
+    async def worker(client: httpx.AsyncClient):
+        while time.perf_counter() < deadline:
+            if random.random() < 0.5:
+                request = client.get("/posts/", params={"limit": 10})
+            else:
+                request = client.get(f"/posts/{random.choice(post_ids)}")
+            try:
+                response = await request
+                counts["ok" if response.status_code == 200 else "error"] += 1
+            except httpx.HTTPError:
+                counts["error"] += 1
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, limits=limits, timeout=30) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return {**counts, "rps": counts["ok"] / elapsed}
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--posts", type=int, default=10_000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=15)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    user_id = common.bench_user_id()
+    common.seed_posts(args.posts, user_id)
+    headers = common.auth_headers(user_id)
+    post_ids = common.published_post_ids()
+
+    results = {}
+    for mode, db_async in (("sync", False), ("async", True)):
+        server = common.serve(args.port, DB_ASYNC="true" if db_async else "false")
+        try:
+            results[mode] = asyncio.run(drive(f"http://127.0.0.1:{args.port}", headers, post_ids, args.concurrency, args.duration))
+        finally:
+            server.terminate()
+            server.wait()
+
+    print(f"\nGET /posts + GET /posts/{{id}}, concurrency={args.concurrency}, {args.duration:.0f}s per mode")
+    print(f"{'mode':<10}{'req/s':>10}{'ok':>10}{'errors':>10}")
+    for mode, result in results.items():
+        print(f"{mode:<10}{result['rps']:>10.1f}{result['ok']:>10}{result['error']:>10}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+# Creating posts one POST /posts at a time vs POST /posts/batch (multi-row INSERT and COPY).
+#   python -m tests.bench.batch [--batch 100] [--copy-batch 1000] [--repeat 20]
+import argparse
+from fastapi.testclient import TestClient
+from app.main import app
+from app.config import settings
+from . import common
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch", type=int, default=100)
+    parser.add_argument("--copy-batch", type=int, default=settings.post_batch_max)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    headers = common.auth_headers(common.bench_user_id())
+    client = TestClient(app)
+
+    def posts(n):
+        return [{"title": f"bench batch {i}", "content": " ".join(common.WORDS[:8])} for i in range(n)]
+
+    def single():
+        for post in posts(args.batch):
+            client.post("/posts", json=post, headers=headers).raise_for_status()
+
+    def batch(n):
+        body = posts(n)
+        return lambda: client.post("/posts/batch", json=body, headers=headers).raise_for_status()
+
+    cases = {
+        f"{args.batch} x POST /posts": (args.batch, common.measure(single, args.repeat, warmup=1)),
+        f"batch of {args.batch} (INSERT)": (args.batch, common.measure(batch(args.batch), args.repeat)),
+        f"batch of {args.copy_batch} (COPY)": (args.copy_batch, common.measure(batch(args.copy_batch), args.repeat)),
+    }
+    common.print_table(f"Creating posts, COPY from {settings.post_batch_copy_threshold} items", {
+        name: stats for name, (_, stats) in cases.items()
+    })
+    print(f"\n{'case':<32}{'posts/s':>10}")
+    for name, (n, stats) in cases.items():
+        print(f"{name:<32}{n / stats['p50'] * 1000:>10.0f}")
+
+if __name__ == "__main__":
+    main()
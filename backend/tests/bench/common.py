@@ -0,0 +1,95 @@
+# Shared helpers for the benchmark scripts in this package.
+# Run them from backend/ so the app's .env is picked up, e.g.
+#   python -m tests.bench.pagination
+import os
+import statistics
+import subprocess
+import sys
+import time
+import httpx
+from datetime import timedelta
+from sqlalchemy import text
+from app import database, oauth2, schemas, utils
+
+BENCH_EMAIL = "bench@example.com"
+BENCH_PASSWORD = "bench-password"
+WORDS = [
+    "alpha", "bravo", "charlie", "delta", "echo", "foxtrot", "golf", "hotel",
+    "india", "juliet", "kilo", "lima", "mike", "november", "oscar", "papa",
+]
+
+def bench_user_id() -> int:
+    with database.engine.begin() as conn:
+        user_id = conn.execute(
+            text("SELECT id FROM users WHERE email = :email"), {"email": BENCH_EMAIL}
+        ).scalar()
+        if user_id is None:
+            user_id = conn.execute(
+                text("INSERT INTO users (email, password) VALUES (:email, :password) RETURNING id"),
+                {"email": BENCH_EMAIL, "password": utils.get_password_hash(BENCH_PASSWORD)}
+            ).scalar_one()
+    return user_id
+
+# Bulk-load posts in one server-side statement until the table holds at least `total` rows
+def seed_posts(total: int, user_id: int) -> int:
+    with database.engine.begin() as conn:
+        existing = conn.execute(text("SELECT count(*) FROM posts")).scalar_one()
+        if existing < total:
+            conn.execute(text("""
+                INSERT INTO posts (title, content, category, published, user_id)
+                SELECT 'bench title ' || g,
+                       'bench content ' || g || ' ' || (CAST(:words AS text[]))[1 + g % 16] || ' ' || (CAST(:words AS text[]))[1 + (g / 16) % 16],
+                       'bench', true, :user_id
+                FROM generate_series(1, :count) AS g
+            """), {"count": total - existing, "user_id": user_id, "words": WORDS})
+            conn.execute(text("ANALYZE posts"))
+    return max(existing, total)
+
+def published_post_ids(limit: int = 10_000) -> list[int]:
+    with database.engine.connect() as conn:
+        return list(conn.execute(
+            text("SELECT id FROM posts WHERE published ORDER BY id LIMIT :limit"), {"limit": limit}
+        ).scalars())
+
+def auth_headers(user_id: int) -> dict:
+    token = oauth2.create_access_token(
+        data=schemas.TokenData(sub=str(user_id)), expires_delta=timedelta(hours=1)
+    )
+    return {"Authorization": f"Bearer {token}"}
+
+# Call `fn` `repeat` times and return latency percentiles in milliseconds
+def measure(fn, repeat: int = 50, warmup: int = 5) -> dict:
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "p50": statistics.median(samples),
+        "p95": samples[int(len(samples) * 0.95) - 1],
+        "max": samples[-1],
+    }
+
+def print_table(title: str, rows: dict, unit: str = "ms"):
+    print(f"\n{title}")
+    print(f"{'case':<32}{'p50 ' + unit:>10}{'p95 ' + unit:>10}{'max ' + unit:>10}")
+    for name, stats in rows.items():
+        print(f"{name:<32}{stats['p50']:>10.2f}{stats['p95']:>10.2f}{stats['max']:>10.2f}")
+
+# Start `uvicorn app.main:app` with some settings overridden through the environment
+def serve(port: int, **env) -> subprocess.Popen:
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env={**os.environ, **env}
+    )
+    for _ in range(100):
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/")
+            return server
+        except httpx.TransportError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError("server did not start")
@@ -0,0 +1,63 @@
+# Latency histogram in the spirit of HdrHistogram: values are counted in log-spaced
+# buckets ~1% wide, so memory stays bounded however many samples a run records, any
+# percentile is accurate to ~1%, and histograms from several workers or runs merge
+# by adding counts.
+import math
+
+PRECISION = 0.01
+_LOG_BASE = math.log1p(PRECISION)
+
+class Histogram:
+    def __init__(self):
+        self.counts: dict[int, int] = {}
+        self.total = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def record(self, ms: float):
+        bucket = math.ceil(math.log(max(ms, 0.001)) / _LOG_BASE)
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.total += 1
+        self.sum += ms
+        self.max = max(self.max, ms)
+
+    def merge(self, other: "Histogram"):
+        for bucket, count in other.counts.items():
+            self.counts[bucket] = self.counts.get(bucket, 0) + count
+        self.total += other.total
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+
+    # Upper edge of the bucket holding the q-th quantile (q in 0..1), capped at the exact max
+    def percentile(self, q: float) -> float:
+        if not self.total:
+            return 0.0
+        rank = max(1, math.ceil(q * self.total))
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= rank:
+                return min((1 + PRECISION) ** bucket, self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            "count": self.total,
+            "mean": self.sum / self.total if self.total else 0.0,
+            "p50": self.percentile(0.50),
+            "p95": self.percentile(0.95),
+            "p99": self.percentile(0.99),
+            "max": self.max,
+        }
+
+    def to_json(self) -> dict:
+        return {"counts": {str(k): v for k, v in self.counts.items()}, "sum": self.sum, "max": self.max}
+
+    @classmethod
+    def from_json(cls, data: dict) -> "Histogram":
+        histogram = cls()
+        histogram.counts = {int(k): v for k, v in data["counts"].items()}
+        histogram.total = sum(histogram.counts.values())
+        histogram.sum = data["sum"]
+        histogram.max = data["max"]
+        return histogram
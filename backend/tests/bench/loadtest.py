@@ -0,0 +1,255 @@
+# Scenario-driven load test: authenticated virtual users hammer the API for a fixed time,
+# and every endpoint gets its own latency histogram (p50/p95/p99/max), status counts and
+# throughput. Results can be saved as JSON and two saved runs compared for regressions.
+#   python -m tests.bench.loadtest run feed [--concurrency 32] [--duration 30] [--json feed.json]
+#   python -m tests.bench.loadtest run mixed --url http://127.0.0.1:8000   # an already running server
+#   python -m tests.bench.loadtest run feed --set DB_ASYNC=true             # settings for the started server
+#   python -m tests.bench.loadtest compare before.json after.json [--threshold 10]
+# Without --url a single uvicorn worker is started with the app's .env (plus any --set).
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+import httpx
+from sqlalchemy import text
+from app import database, utils
+from . import common
+from .histogram import Histogram
+
+LOADTEST_PASSWORD = "loadtest-password"
+HOT_POSTS = 20
+
+class Recorder:
+    def __init__(self):
+        self.histograms: dict[str, Histogram] = defaultdict(Histogram)
+        self.statuses: dict[str, Counter] = defaultdict(Counter)
+        self.recording = False
+
+    # `name` is the endpoint template results are grouped under, e.g. "GET /posts/{id}"
+    async def request(self, client: httpx.AsyncClient, name: str, method: str, url: str, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            if self.recording:
+                self.statuses[name]["error"] += 1
+            return None
+        if self.recording:
+            self.histograms[name].record((time.perf_counter() - start) * 1000)
+            self.statuses[name][str(response.status_code)] += 1
+        if response.status_code == 503 and "Retry-After" in response.headers:
+            await asyncio.sleep(float(response.headers["Retry-After"]))
+        return response
+
+class VirtualUser:
+    def __init__(self, client: httpx.AsyncClient, email: str, recorder: Recorder, hot_posts: list[int]):
+        self.client = client
+        self.email = email
+        self.recorder = recorder
+        self.hot_posts = hot_posts
+        self.cursor = None
+
+    async def request(self, name: str, method: str, url: str, **kwargs):
+        return await self.recorder.request(self.client, name, method, url, **kwargs)
+
+# Scenarios: one iteration of what a virtual user does, repeated until the run ends
+
+async def feed(vu: VirtualUser):
+    cursor = None
+    for _ in range(3):
+        params = {"limit": 20} if cursor is None else {"limit": 20, "cursor": cursor}
+        response = await vu.request("GET /posts", "GET", "/posts/", params=params)
+        cursor = response.headers.get("X-Next-Cursor") if response is not None else None
+        if cursor is None:
+            return
+
+async def deep_pagination(vu: VirtualUser):
+    # every user keeps scrolling down the whole feed, starting over at the end
+    params = {"limit": 20} if vu.cursor is None else {"limit": 20, "cursor": vu.cursor}
+    response = await vu.request("GET /posts (cursor)", "GET", "/posts/", params=params)
+    vu.cursor = response.headers.get("X-Next-Cursor") if response is not None else None
+
+async def search(vu: VirtualUser):
+    terms = " ".join(random.sample(common.WORDS, random.randint(1, 2)))
+    await vu.request("GET /posts?search", "GET", "/posts/", params={"search": terms, "limit": 20})
+
+async def vote_storm(vu: VirtualUser):
+    # everyone piles onto the same handful of posts
+    post_id = random.choice(vu.hot_posts)
+    await vu.request("POST /vote", "POST", "/vote/", json={"post_id": post_id, "dir": 1})
+    await vu.request("POST /vote", "POST", "/vote/", json={"post_id": post_id, "dir": 0})
+
+async def login_storm(vu: VirtualUser):
+    await vu.request("POST /login", "POST", "/login", data={"username": vu.email, "password": LOADTEST_PASSWORD})
+
+async def get_post(vu: VirtualUser):
+    await vu.request("GET /posts/{id}", "GET", f"/posts/{random.choice(vu.hot_posts)}")
+
+async def create_post(vu: VirtualUser):
+    words = " ".join(random.choices(common.WORDS, k=8))
+    await vu.request("POST /posts", "POST", "/posts/", json={"title": f"loadtest {words[:20]}", "content": words})
+
+MIXED = [(feed, 60), (get_post, 15), (search, 10), (vote_storm, 10), (create_post, 5)]
+
+async def mixed(vu: VirtualUser):
+    scenario = random.choices([s for s, _ in MIXED], weights=[w for _, w in MIXED])[0]
+    await scenario(vu)
+
+SCENARIOS = {
+    "feed": feed,
+    "deep_pagination": deep_pagination,
+    "search": search,
+    "vote_storm": vote_storm,
+    "login_storm": login_storm,
+    "mixed": mixed,
+}
+
+# One account per virtual user, all sharing a password hashed once
+def virtual_users(count: int) -> list[tuple[int, str]]:
+    emails = [f"loadtest-{i}@example.com" for i in range(count)]
+    with database.engine.begin() as conn:
+        existing = dict(conn.execute(
+            text("SELECT email, id FROM users WHERE email = ANY(:emails)"), {"emails": emails}
+        ).all())
+        missing = [email for email in emails if email not in existing]
+        if missing:
+            password = utils.get_password_hash(LOADTEST_PASSWORD)
+            existing.update(conn.execute(
+                text("INSERT INTO users (email, password) SELECT unnest(CAST(:emails AS text[])), :password RETURNING email, id"),
+                {"emails": missing, "password": password}
+            ).all())
+    return [(existing[email], email) for email in emails]
+
+async def drive(args, base_url: str, users: list[tuple[int, str]], hot_posts: list[int]) -> dict:
+    recorder = Recorder()
+    scenario = SCENARIOS[args.scenario]
+
+    clients = [
+        httpx.AsyncClient(base_url=base_url, timeout=args.timeout, headers=common.auth_headers(user_id))
+        for user_id, _ in users
+    ]
+    vus = [VirtualUser(client, email, recorder, hot_posts) for client, (_, email) in zip(clients, users)]
+    async def run(vu: VirtualUser, deadline: float):
+        while time.perf_counter() < deadline:
+            await scenario(vu)
+
+    started_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    try:
+        start = time.perf_counter()
+        tasks = [asyncio.create_task(run(vu, start + args.warmup + args.duration)) for vu in vus]
+        await asyncio.sleep(args.warmup)
+        recorder.recording = True
+        measured_from = time.perf_counter()
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - measured_from
+    finally:
+        await asyncio.gather(*(client.aclose() for client in clients))
+
+    return {
+        "scenario": args.scenario,
+        "concurrency": args.concurrency,
+        "duration": elapsed,
+        "url": base_url,
+        "started_at": started_at,
+        "endpoints": {
+            name: {
+                **histogram.summary(),
+                "rps": histogram.total / elapsed,
+                "statuses": dict(recorder.statuses[name]),
+                "histogram": histogram.to_json(),
+            }
+            for name, histogram in sorted(recorder.histograms.items())
+        },
+    }
+
+def print_run(result: dict):
+    print(f"\n{result['scenario']}, {result['concurrency']} users, {result['duration']:.0f}s against {result['url']}")
+    print(f"{'endpoint':<24}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}  statuses")
+    for name, stats in result["endpoints"].items():
+        statuses = " ".join(f"{code}:{count}" for code, count in sorted(stats["statuses"].items()))
+        print(
+            f"{name:<24}{stats['rps']:>9.1f}{stats['p50']:>9.2f}{stats['p95']:>9.2f}"
+            f"{stats['p99']:>9.2f}{stats['max']:>9.2f}  {statuses}"
+        )
+
+def run(args):
+    users = virtual_users(args.concurrency)
+    common.seed_posts(args.posts, common.bench_user_id())
+    hot_posts = common.published_post_ids(HOT_POSTS)
+
+    server = None
+    base_url = args.url
+    if base_url is None:
+        server = common.serve(args.port, **dict(setting.split("=", 1) for setting in args.set))
+        base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        result = asyncio.run(drive(args, base_url, users, hot_posts))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    print_run(result)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+
+# Latencies are worse when higher, throughput when lower
+COMPARED = [("p50", 1), ("p95", 1), ("p99", 1), ("rps", -1)]
+
+def compare(args) -> int:
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    regressions = 0
+    print(f"\n{baseline['scenario']} ({args.baseline}) -> {current['scenario']} ({args.current}), threshold {args.threshold:.0f}%")
+    print(f"{'endpoint':<24}{'metric':<8}{'before':>10}{'after':>10}{'change':>10}")
+    for name, before in baseline["endpoints"].items():
+        after = current["endpoints"].get(name)
+        if after is None:
+            print(f"{name:<24}missing from {args.current}")
+            continue
+        for metric, direction in COMPARED:
+            change = (after[metric] - before[metric]) / before[metric] * 100 if before[metric] else 0.0
+            regressed = change * direction > args.threshold
+            regressions += regressed
+            flag = "  REGRESSION" if regressed else ""
+            print(f"{name:<24}{metric:<8}{before[metric]:>10.2f}{after[metric]:>10.2f}{change:>+9.1f}%{flag}")
+    print(f"\n{regressions} regression(s)")
+    return 1 if regressions else 0
+
+def main():
+    parser = argparse.ArgumentParser()
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run")
+    run_parser.add_argument("scenario", choices=SCENARIOS)
+    run_parser.add_argument("--concurrency", type=int, default=32)
+    run_parser.add_argument("--duration", type=float, default=30)
+    run_parser.add_argument("--warmup", type=float, default=3)
+    run_parser.add_argument("--timeout", type=float, default=30)
+    run_parser.add_argument("--posts", type=int, default=10_000)
+    run_parser.add_argument("--url")
+    run_parser.add_argument("--port", type=int, default=8765)
+    run_parser.add_argument("--set", action="append", default=[], metavar="SETTING=VALUE")
+    run_parser.add_argument("--json")
+
+    compare_parser = commands.add_parser("compare")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=10, help="percent change counted as a regression")
+
+    args = parser.parse_args()
+    if args.command == "run":
+        run(args)
+    else:
+        sys.exit(compare(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# POST /login throughput as argon2 gets more worker processes (HASH_WORKERS).
+# With --refresh, POST /token/refresh instead: each client logs in once, then keeps
+# rotating its refresh token, which involves no argon2 at all.
+# Rate limiting is switched off for the server under test.
+#   python -m tests.bench.login [--workers 1 2 4 8] [--concurrency 32] [--duration 10] [--refresh]
+import argparse
+import asyncio
+import os
+import time
+import httpx
+from . import common
+
+async def drive(base_url: str, concurrency: int, duration: float, refresh: bool) -> dict:
+    counts = {"ok": 0, "busy": 0, "error": 0}
+    credentials = {"username": common.BENCH_EMAIL, "password": common.BENCH_PASSWORD}
+    deadline = time.perf_counter() + duration
+
+    async def worker(client: httpx.AsyncClient):
+        refresh_token = None
+        while refresh and refresh_token is None:
+            response = await client.post("/login", data=credentials)
+            if response.status_code == 503:
+                await asyncio.sleep(float(response.headers.get("Retry-After", 1)))
+                continue
+            refresh_token = response.raise_for_status().json()["refresh_token"]
+        while time.perf_counter() < deadline:
+            try:
+                if refresh_token is None:
+                    response = await client.post("/login", data=credentials)
+                else:
+                    response = await client.post("/token/refresh", json={"refresh_token": refresh_token})
+            except httpx.HTTPError:
+                counts["error"] += 1
+                continue
+            if response.status_code == 200:
+                counts["ok"] += 1
+                if refresh_token is not None:
+                    refresh_token = response.json()["refresh_token"]
+            elif response.status_code == 503:
+                counts["busy"] += 1
+                await asyncio.sleep(float(response.headers.get("Retry-After", 1)))
+            else:
+                counts["error"] += 1
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return {**counts, "rps": counts["ok"] / elapsed}
+
+def main():
+    cores = os.cpu_count() or 1
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=sorted({1, 2, 4, cores}))
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--refresh", action="store_true")
+    args = parser.parse_args()
+
+    common.bench_user_id()
+    results = {}
+    for workers in args.workers:
+        server = common.serve(
+            args.port, HASH_WORKERS=str(workers), HASH_MAX_PENDING=str(workers * 4), RATE_LIMIT_ENABLED="false"
+        )
+        try:
+            results[workers] = asyncio.run(
+                drive(f"http://127.0.0.1:{args.port}", args.concurrency, args.duration, args.refresh)
+            )
+        finally:
+            server.terminate()
+            server.wait()
+
+    route = "/token/refresh" if args.refresh else "/login"
+    print(f"\nPOST {route}, concurrency={args.concurrency}, {args.duration:.0f}s per run, {cores} cores")
+    print(f"{'hash workers':<14}{'requests/s':>12}{'ok':>8}{'503':>8}{'errors':>8}")
+    for workers, result in results.items():
+        print(f"{workers:<14}{result['rps']:>12.1f}{result['ok']:>8}{result['busy']:>8}{result['error']:>8}")
+
+if __name__ == "__main__":
+    main()
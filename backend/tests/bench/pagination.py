@@ -0,0 +1,39 @@
+# Page 1 vs page 10,000 of GET /posts: offset paging against keyset (cursor) paging.
+#   python -m tests.bench.pagination [--posts 200000] [--limit 10] [--page 10000]
+import argparse
+from fastapi.testclient import TestClient
+from app.main import app
+from app.pagination import encode_cursor
+from . import common
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--posts", type=int, default=200_000)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--page", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    user_id = common.bench_user_id()
+    total = common.seed_posts(max(args.posts, args.limit * args.page), user_id)
+    headers = common.auth_headers(user_id)
+    client = TestClient(app)
+
+    # The cursor for page N is simply the id of the last row of page N - 1
+    deep_offset = args.limit * (args.page - 1)
+    first = client.get("/posts", params={"limit": args.limit, "offset": deep_offset - 1}, headers=headers)
+    last_seen_id = first.json()[0]["Post"]["id"]
+
+    def get(params):
+        return lambda: client.get("/posts", params=params, headers=headers).raise_for_status()
+
+    rows = {
+        "page 1 (offset)": common.measure(get({"limit": args.limit}), args.repeat),
+        f"page {args.page} (offset)": common.measure(get({"limit": args.limit, "offset": deep_offset}), args.repeat),
+        "page 1 (cursor)": common.measure(get({"limit": args.limit, "cursor": encode_cursor(id=0)}), args.repeat),
+        f"page {args.page} (cursor)": common.measure(get({"limit": args.limit, "cursor": encode_cursor(id=last_seen_id)}), args.repeat),
+    }
+    common.print_table(f"GET /posts, {total} posts, limit={args.limit}", rows)
+
+if __name__ == "__main__":
+    main()
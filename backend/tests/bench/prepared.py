@@ -0,0 +1,86 @@
+# CPU time per execution of the hot queries, built per request with the ORM and sent as
+# unprepared SQL (how the routes used to run them) vs the prebuilt statements in
+# app/queries.py, prepared server side after DB_PREPARE_THRESHOLD executions.
+# CPU is this process only (query building, compilation, result handling); wall time
+# also includes Postgres parsing and planning, which preparing saves.
+#   python -m tests.bench.prepared [--repeat 5000]
+import argparse
+import time
+from sqlalchemy import create_engine, delete
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from app import config, models, pagination, queries
+from . import common
+
+def ad_hoc(db: Session, user_id: int, post_id: int) -> dict:
+    def feed():
+        query = queries.visible_posts(db.query(*queries.POST_WITH_VOTES_COLUMNS).join(models.Post.owner), user_id)
+        query.order_by(models.Post.id).filter(models.Post.id > post_id).limit(10).all()
+
+    def single_post():
+        db.query(*queries.POST_WITH_VOTES_COLUMNS).join(models.Post.owner).filter(models.Post.id == post_id).first()
+
+    def user_lookup():
+        db.query(models.User).filter(models.User.id == user_id).first()
+
+    def vote():
+        db.execute(
+            insert(models.Vote).values(user_id=user_id, post_id=post_id)
+            .on_conflict_do_nothing().returning(models.Vote.post_id)
+        ).first()
+        db.execute(
+            delete(models.Vote).where(models.Vote.post_id == post_id, models.Vote.user_id == user_id)
+            .returning(models.Vote.post_id)
+        ).first()
+        db.commit()
+
+    return {"feed page": feed, "single post": single_post, "user lookup": user_lookup, "vote + unvote": vote}
+
+def cached(db: Session, user_id: int, post_id: int) -> dict:
+    ids = {"user_id": user_id, "post_id": post_id}
+    cursor = pagination.encode_cursor(id=post_id)
+    return {
+        "feed page": lambda: db.execute(*queries.feed_page(user_id, 10, 0, cursor, "")).all(),
+        "single post": lambda: db.execute(queries.POST_BY_ID, {"id": post_id}).first(),
+        "user lookup": lambda: db.execute(queries.USER_BY_ID, {"id": user_id}).first(),
+        "vote + unvote": lambda: (
+            db.execute(queries.VOTE_INSERT, ids).first(), db.execute(queries.VOTE_DELETE, ids).first(), db.commit()
+        ),
+    }
+
+# Mean CPU and wall microseconds per call
+def measure(fn, repeat: int) -> tuple[float, float]:
+    for _ in range(max(10, repeat // 20)):
+        fn()
+    cpu, wall = time.process_time(), time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.process_time() - cpu) / repeat * 1e6, (time.perf_counter() - wall) / repeat * 1e6
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5000)
+    args = parser.parse_args()
+
+    user_id = common.bench_user_id()
+    common.seed_posts(1000, user_id)
+    post_id = common.published_post_ids(1)[0]
+
+    results = {}
+    for mode, statements, prepare_threshold in (
+        ("ad hoc", ad_hoc, None),
+        ("cached", cached, max(config.settings.db_prepare_threshold, 0)),
+    ):
+        engine = create_engine(config.db_url, connect_args={"prepare_threshold": prepare_threshold})
+        with Session(engine) as db:
+            for name, fn in statements(db, user_id, post_id).items():
+                results[(name, mode)] = measure(fn, args.repeat)
+        engine.dispose()
+
+    print(f"\nHot queries, mean per execution over {args.repeat} runs")
+    print(f"{'query':<16}{'mode':<10}{'cpu us':>10}{'wall us':>10}")
+    for (name, mode), (cpu, wall) in sorted(results.items()):
+        print(f"{name:<16}{mode:<10}{cpu:>10.1f}{wall:>10.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+# GET /posts?search=... on a large table: the old `title LIKE '%...%'` scan against
+# the tsvector (GIN) + pg_trgm (GIN) search path. Both run as plain statements on one
+# connection, so the numbers compare the queries and nothing else (no HTTP, no page cache).
+#   python -m tests.bench.search [--posts 1000000]
+import argparse
+from sqlalchemy import text
+from app import database, queries
+from . import common
+
+# The query get_posts used to run, kept here only as the baseline
+LEGACY_SQL = text("""
+    SELECT posts.id FROM posts
+    WHERE (posts.user_id = :user_id OR posts.published = true) AND posts.title LIKE '%' || :search || '%'
+    ORDER BY posts.id LIMIT :limit
+""")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--posts", type=int, default=1_000_000)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    user_id = common.bench_user_id()
+    total = common.seed_posts(args.posts, user_id)
+
+    terms = {
+        "rare": f"title {total // 2}",
+        "common": common.WORDS[3],
+        "no match": "zzzyyyxxx",
+    }
+    rows = {}
+    with database.engine.connect() as conn:
+        for name, term in terms.items():
+            params = {"user_id": user_id, "search": term, "limit": args.limit}
+            rows[f"{name} (legacy LIKE)"] = common.measure(
+                lambda: conn.execute(LEGACY_SQL, params).all(), args.repeat
+            )
+        # the statement get_posts runs for a first page
+        for name, term in {**terms, "empty": ""}.items():
+            statement = queries.feed_page(user_id, args.limit, 0, None, term)
+            rows[f"{name} (search)"] = common.measure(
+                lambda: conn.execute(*statement).all(), args.repeat
+            )
+    common.print_table(f"search, {total} posts, limit={args.limit}", rows)
+
+if __name__ == "__main__":
+    main()
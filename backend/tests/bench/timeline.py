@@ -0,0 +1,118 @@
+# GET /feed for a reader who follows 1k accounts, one of them with 10k followers.
+# Reads: the naive `IN (followed ids)` scan of posts, the fanned-out timeline (with the big
+# account pulled at read time, the default), and every followee pulled at read time.
+# Writes: one post fanned out to the big account's 10k followers, which is what pulling
+# such accounts avoids (rolled back).
+# The 11k seeded users are deleted again afterwards, with their posts, follows and timelines.
+#   python -m tests.bench.timeline [--followees 1000] [--followers 10000]
+import argparse
+from fastapi.testclient import TestClient
+from sqlalchemy import select, text
+from app import config, database, models, queries, timeline
+from app.main import app
+from . import common
+
+BENCH_DOMAIN = "timeline-bench.example.com"
+
+# `count` users named <prefix>-<n>@BENCH_DOMAIN; returns their ids
+def seed_users(prefix: str, count: int) -> list[int]:
+    with database.engine.begin() as conn:
+        conn.execute(text("""
+            INSERT INTO users (email, password)
+            SELECT :prefix || '-' || g || '@' || :domain, 'x' FROM generate_series(1, :count) AS g
+            ON CONFLICT (email) DO NOTHING
+        """), {"prefix": prefix, "domain": BENCH_DOMAIN, "count": count})
+        return list(conn.execute(
+            text("SELECT id FROM users WHERE email LIKE :pattern ORDER BY id"),
+            {"pattern": f"{prefix}-%@{BENCH_DOMAIN}"}
+        ).scalars())[:count]
+
+def seed(reader: int, followees: list[int], followers: list[int], posts_per_followee: int):
+    star = followees[0]
+    with database.engine.begin() as conn:
+        conn.execute(text("""
+            INSERT INTO posts (title, content, user_id)
+            SELECT 'timeline bench ' || g, 'timeline bench', author
+            FROM generate_series(1, :per_author) AS g, unnest(CAST(:authors AS int[])) AS author
+            ORDER BY g, author
+        """), {"per_author": posts_per_followee, "authors": followees})
+        conn.execute(text("""
+            INSERT INTO follows (follower_id, followee_id)
+            SELECT :reader, unnest(CAST(:followees AS int[]))
+            ON CONFLICT DO NOTHING
+        """), {"reader": reader, "followees": followees})
+        conn.execute(text("""
+            INSERT INTO follows (follower_id, followee_id)
+            SELECT unnest(CAST(:followers AS int[])), :star
+            ON CONFLICT DO NOTHING
+        """), {"followers": followers, "star": star})
+        # the reader's timeline as fan-out would have left it
+        for followee in followees:
+            for statement, params in timeline.backfill(reader, followee):
+                conn.execute(statement, params)
+        conn.execute(text("ANALYZE users, posts, follows, timeline"))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--followees", type=int, default=1000)
+    parser.add_argument("--followers", type=int, default=10_000)
+    parser.add_argument("--posts-per-followee", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=100)
+    args = parser.parse_args()
+
+    reader = common.bench_user_id()
+    try:
+        run(args, reader)
+    finally:
+        with database.engine.begin() as conn:
+            conn.execute(text("DELETE FROM users WHERE email LIKE :pattern"), {"pattern": f"%@{BENCH_DOMAIN}"})
+
+def run(args, reader: int):
+    followees = seed_users("followee", args.followees)
+    followers = seed_users("follower", args.followers)
+    seed(reader, followees, followers, args.posts_per_followee)
+
+    followed = select(models.Follow.followee_id).where(models.Follow.follower_id == reader)
+    naive = (
+        select(*queries.POST_WITH_VOTES_COLUMNS).join(models.Post.owner)
+        .where(models.Post.user_id.in_(followed), models.Post.published)
+        .order_by(models.Post.id.desc()).limit(args.limit)
+    )
+    page, params = timeline.page(reader, args.limit, None)
+    reads = {
+        "IN (followed ids)": (naive, {}),
+        "timeline + pulled big account": (page, params),
+        "every followee pulled": (page, {**params, "pull_min_followers": 0}),
+    }
+    rows = {}
+    with database.engine.connect() as conn:
+        for name, (statement, statement_params) in reads.items():
+            rows[name] = common.measure(lambda: conn.execute(statement, statement_params).all(), args.repeat)
+            conn.rollback()
+
+    headers = common.auth_headers(reader)
+    client = TestClient(app)
+    rows["GET /feed"] = common.measure(
+        lambda: client.get("/feed", params={"limit": args.limit}, headers=headers).raise_for_status(), args.repeat
+    )
+
+    star = followees[0]
+    def fan_out():
+        with database.engine.connect() as conn:
+            post_id = conn.scalar(text(
+                "INSERT INTO posts (title, content, user_id) VALUES ('fan-out', 'timeline bench', :star) RETURNING id"
+            ), {"star": star})
+            [(statement, params)] = timeline.fan_out([post_id])
+            conn.execute(statement, {**params, "pull_min_followers": len(followers) + 2})
+            conn.rollback()
+    rows[f"fan out 1 post to {len(followers) + 1}"] = common.measure(fan_out, 20)
+
+    threshold = config.settings.timeline_pull_min_followers
+    common.print_table(
+        f"Home timeline, {len(followees)} followees x {args.posts_per_followee} posts, "
+        f"limit={args.limit}, accounts with >= {threshold} followers pulled", rows
+    )
+
+if __name__ == "__main__":
+    main()
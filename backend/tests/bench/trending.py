@@ -0,0 +1,64 @@
+# Top trending posts scored per request from votes and created_at, against the
+# precomputed posts.hot_score read off its index (GET /posts/trending).
+#   python -m tests.bench.trending [--posts 200000] [--votes 100000]
+import argparse
+from sqlalchemy import Integer, cast, func, select, text
+from app import database, models, queries
+from . import common
+
+# Until the table holds at least `total` votes; returns how many it holds
+def seed_votes(total: int) -> int:
+    with database.engine.begin() as conn:
+        existing = conn.execute(text("SELECT count(*) FROM votes")).scalar_one()
+        if existing < total:
+            # 100 voters spread over the newest 50k posts, skewed towards the newest
+            conn.execute(text("""
+                INSERT INTO users (email, password)
+                SELECT 'trending-voter-' || g || '@example.com', 'x' FROM generate_series(1, 100) AS g
+                ON CONFLICT (email) DO NOTHING
+            """))
+            conn.execute(text("""
+                INSERT INTO votes (user_id, post_id)
+                SELECT voter.id, recent.ids[1 + CAST(floor(random() ^ 2 * cardinality(recent.ids)) AS integer)]
+                FROM (SELECT id FROM users WHERE email LIKE 'trending-voter-%') AS voter
+                CROSS JOIN generate_series(1, CAST(:per_voter AS integer))
+                CROSS JOIN (
+                    SELECT array_agg(id ORDER BY id DESC) AS ids
+                    FROM (SELECT id FROM posts ORDER BY id DESC LIMIT 50000) AS newest
+                ) AS recent
+                ON CONFLICT DO NOTHING
+            """), {"per_voter": (total - existing) // 100 + 1})
+            conn.execute(text("ANALYZE posts, votes"))
+        return conn.execute(text("SELECT count(*) FROM votes")).scalar_one()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--posts", type=int, default=200_000)
+    parser.add_argument("--votes", type=int, default=100_000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    posts = common.seed_posts(args.posts, common.bench_user_id())
+    votes_total = seed_votes(args.votes)
+
+    votes = cast(func.count(models.Vote.post_id), Integer)
+    score = func.posts_hot_score(votes, models.Post.created_at)
+    per_request = (
+        select(models.Post.id, score.label("score"))
+        .outerjoin(models.Vote, models.Vote.post_id == models.Post.id)
+        .where(models.Post.published)
+        .group_by(models.Post.id)
+        .order_by(score.desc(), models.Post.id.desc())
+        .limit(args.limit)
+    )
+    precomputed, params = queries.trending_page(args.limit, None)
+    with database.engine.connect() as conn:
+        rows = {
+            "scored per request": common.measure(lambda: conn.execute(per_request).all(), args.repeat),
+            "hot_score index": common.measure(lambda: conn.execute(precomputed, params).all(), args.repeat),
+        }
+    common.print_table(f"Top {args.limit} trending posts, {posts} posts, {votes_total} votes", rows)
+
+if __name__ == "__main__":
+    main()
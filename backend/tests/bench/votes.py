@@ -0,0 +1,53 @@
+# Sustained vote throughput with votes written inline against write-behind buffering
+# (VOTE_WRITE_BEHIND). Runs the load test's vote_storm scenario, where every virtual user
+# up- and un-votes the same handful of hot posts, once per mode, then checks that the hot
+# posts' vote_count matches their votes once the buffer has been flushed.
+#   python -m tests.bench.votes [--concurrency 32] [--duration 15]
+import argparse
+import asyncio
+from sqlalchemy import text
+from app import database
+from . import common, loadtest
+
+def drifted_posts(post_ids: list[int]) -> int:
+    with database.engine.connect() as conn:
+        return conn.scalar(text("""
+            SELECT count(*) FROM posts
+            WHERE id = ANY(:ids) AND vote_count <> (SELECT count(*) FROM votes WHERE votes.post_id = posts.id)
+        """), {"ids": post_ids})
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--posts", type=int, default=10_000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=15)
+    parser.add_argument("--warmup", type=float, default=3)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    args.scenario = "vote_storm"
+
+    users = loadtest.virtual_users(args.concurrency)
+    common.seed_posts(args.posts, common.bench_user_id())
+    hot_posts = common.published_post_ids(loadtest.HOT_POSTS)
+
+    rows = []
+    for mode, write_behind in (("inline", "false"), ("write-behind", "true")):
+        server = common.serve(args.port, VOTE_WRITE_BEHIND=write_behind)
+        try:
+            result = asyncio.run(loadtest.drive(args, f"http://127.0.0.1:{args.port}", users, hot_posts))
+        finally:
+            # a clean shutdown flushes whatever is still buffered
+            server.terminate()
+            server.wait()
+        stats = result["endpoints"]["POST /vote"]
+        statuses = " ".join(f"{code}:{count}" for code, count in sorted(stats["statuses"].items()))
+        rows.append((mode, stats["rps"], stats["p50"], stats["p99"], drifted_posts(hot_posts), statuses))
+
+    print(f"\nPOST /vote on {len(hot_posts)} hot posts, {args.concurrency} users, {args.duration:.0f}s per mode")
+    print(f"{'mode':<14}{'votes/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'drifted':>10}  statuses")
+    for mode, rps, p50, p99, drifted, statuses in rows:
+        print(f"{mode:<14}{rps:>10.1f}{p50:>10.2f}{p99:>10.2f}{drifted:>10}  {statuses}")
+
+if __name__ == "__main__":
+    main()
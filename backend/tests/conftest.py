@@ -0,0 +1,40 @@
+# Fixtures and helpers shared by the test modules. Runs against the database in .env.
+import uuid
+from datetime import timedelta
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import delete, insert
+from app import database, models, oauth2, schemas
+from app.main import app
+
+# Authorization header for `user_id`, signed like a /login token
+def bearer(user_id: int) -> dict:
+    token = oauth2.create_access_token(data=schemas.TokenData(sub=str(user_id)), expires_delta=timedelta(minutes=5))
+    return {"Authorization": f"Bearer {token}"}
+
+# The app, with its lifespan running
+@pytest.fixture
+def client():
+    with TestClient(app) as client:
+        yield client
+
+# make_users(count, prefix) -> ids of new users named <prefix>-<random>@example.com.
+# They are deleted after the test, and their posts, votes and follows cascade with them.
+@pytest.fixture
+def make_users():
+    created = []
+    def make(count: int = 1, prefix: str = "test", password: str = "x") -> list[int]:
+        rows = [{"email": f"{prefix}-{uuid.uuid4().hex[:8]}@example.com", "password": password} for _ in range(count)]
+        with database.engine.begin() as conn:
+            ids = list(conn.scalars(insert(models.User).returning(models.User.id, sort_by_parameter_order=True), rows))
+        created.extend(ids)
+        return ids
+    yield make
+    with database.engine.begin() as conn:
+        conn.execute(delete(models.User).where(models.User.id.in_(created)))
+
+# New posts by `user_id`, one per title, with `columns` set on each; returns their ids in order
+def add_posts(user_id: int, titles: list[str], content: str = "test", **columns) -> list[int]:
+    rows = [{"title": title, "content": content, "user_id": user_id, **columns} for title in titles]
+    with database.engine.begin() as conn:
+        return list(conn.scalars(insert(models.Post).returning(models.Post.id, sort_by_parameter_order=True), rows))
@@ -0,0 +1,67 @@
+# Rate limiting and load shedding, with tiny budgets so they trip quickly.
+import asyncio
+import pytest
+from app.admission import LoadSheddingMiddleware
+from app.config import settings
+from app.main import app
+from conftest import bearer
+
+@pytest.fixture(autouse=True)
+def limits(monkeypatch):
+    monkeypatch.setattr(settings, "rate_limit_enabled", True)
+    monkeypatch.setattr(settings, "rate_limit_burst_seconds", 10)
+    monkeypatch.setattr(settings, "rate_limit_ip_multiplier", 3)
+    # 0.3 per second, so buckets of 3 that don't refill during the test
+    for kind in ("login", "write", "read"):
+        monkeypatch.setattr(settings, f"rate_limit_{kind}_per_minute", 18)
+    # a fresh middleware stack each time, so no buckets carry over between tests
+    app.middleware_stack = None
+    yield
+    app.middleware_stack = None
+
+def test_user_budget(client):
+    # routes answer 401 for these made-up users, but they still count against the budget
+    statuses = [client.get("/posts/1", headers=bearer(-1)).status_code for _ in range(4)]
+    assert statuses[:3] == [401] * 3
+    assert statuses[3] == 429
+    response = client.get("/posts/1", headers=bearer(-1))
+    assert int(response.headers["Retry-After"]) >= 1
+    # another user behind the same IP still has budget
+    assert client.get("/posts/1", headers=bearer(-2)).status_code == 401
+
+def test_budgets_are_separate_per_kind(client):
+    # /login has no user yet, so only the IP budget (3 x 3) applies
+    for _ in range(9):
+        client.post("/login", data={"username": "nobody@example.com", "password": "x"})
+    assert client.post("/login", data={"username": "nobody@example.com", "password": "x"}).status_code == 429
+    assert client.get("/posts/1", headers=bearer(-3)).status_code == 401
+
+def test_ip_budget(client):
+    # 3 x 3 anonymous reads per IP, whoever sends them
+    statuses = [client.get("/posts/").status_code for _ in range(10)]
+    assert statuses.count(429) == 1
+    assert client.get("/metrics").status_code == 200
+
+def test_load_shedding(monkeypatch):
+    monkeypatch.setattr(settings, "max_concurrent_requests", 1)
+    monkeypatch.setattr(settings, "max_queue_wait_ms", 50)
+
+    async def slow_app(scope, receive, send):
+        await asyncio.sleep(0.2)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def call(middleware) -> int:
+        statuses = []
+        async def send(message):
+            if message["type"] == "http.response.start":
+                statuses.append(message["status"])
+        scope = {"type": "http", "method": "GET", "path": "/posts/", "headers": []}
+        await middleware(scope, None, send)
+        return statuses[0]
+
+    async def main():
+        middleware = LoadSheddingMiddleware(slow_app)
+        return await asyncio.gather(*(call(middleware) for _ in range(3)))
+
+    assert sorted(asyncio.run(main())) == [200, 503, 503]
@@ -0,0 +1,55 @@
+# X-Total-Count on GET /posts and GET /users.
+import uuid
+import pytest
+from sqlalchemy import func, select
+from app import counts, database, models
+from app.config import settings
+from conftest import add_posts, bearer
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    counts.totals.clear()
+
+@pytest.fixture
+def seeded(make_users):
+    word = f"counted{uuid.uuid4().hex[:8]}"
+    [user_id] = make_users(1, "counted")
+    add_posts(user_id, [f"{word} {i}" for i in range(3)], content="total count")
+    return user_id, word
+
+def total(response) -> tuple[int, str]:
+    assert response.status_code == 200
+    return int(response.headers[counts.TOTAL_COUNT_HEADER]), response.headers[counts.TOTAL_COUNT_EXACT_HEADER]
+
+def test_small_lists_are_counted_exactly(client, seeded):
+    user_id, word = seeded
+    response = client.get("/posts", params={"search": word, "limit": 1, "count": True}, headers=bearer(user_id))
+    assert total(response) == (3, "true")
+    assert len(response.json()) == 1
+
+    with database.engine.connect() as conn:
+        users = conn.scalar(select(func.count()).select_from(models.User))
+    response = client.get("/users", params={"limit": 1, "count": True}, headers=bearer(user_id))
+    assert total(response) == (users, "true")
+
+    # only sent when asked for
+    response = client.get("/posts", params={"search": word}, headers=bearer(user_id))
+    assert counts.TOTAL_COUNT_HEADER not in response.headers
+
+def test_large_lists_are_estimated(client, seeded, monkeypatch):
+    user_id, word = seeded
+    monkeypatch.setattr(settings, "total_count_exact_max", 0)
+    value, exact = total(client.get("/users", params={"limit": 1, "count": True}, headers=bearer(user_id)))
+    assert exact == "false"
+    assert value > 0
+
+def test_counts_are_cached_per_filter(client, seeded):
+    user_id, word = seeded
+    params = {"search": word, "count": True}
+    assert total(client.get("/posts", params=params, headers=bearer(user_id))) == (3, "true")
+    client.post("/posts", json={"title": f"{word} 3", "content": "total count"}, headers=bearer(user_id))
+    # the same filter is answered from the cache until it expires; another filter is not
+    assert total(client.get("/posts", params=params, headers=bearer(user_id))) == (3, "true")
+    assert total(client.get("/posts", params={**params, "search": f"{word} 3"}, headers=bearer(user_id))) == (1, "true")
+    counts.totals.clear()
+    assert total(client.get("/posts", params=params, headers=bearer(user_id))) == (4, "true")
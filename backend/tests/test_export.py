@@ -0,0 +1,77 @@
+# Keyset pagination and streaming exports. Runs against the database in .env.
+import csv
+import io
+import json
+import pytest
+from app import export
+from app.pagination import encode_cursor
+from conftest import add_posts, bearer
+
+USERS = 7
+
+@pytest.fixture
+def user_ids(make_users):
+    return make_users(USERS, "export")
+
+# The shared client, signed in as the first of this test's users
+@pytest.fixture
+def client(client, user_ids):
+    client.headers.update(bearer(user_ids[0]))
+    return client
+
+# Other tests may add or remove users meanwhile: check the order, and that this test's
+# users are all there
+def assert_includes_in_order(ids: list[int], user_ids: list[int]):
+    assert ids == sorted(set(ids))
+    assert [id for id in ids if id in set(user_ids)] == user_ids
+
+def test_users_keyset_pages(client, user_ids):
+    # start just before this test's users
+    seen, cursor = [], encode_cursor(id=user_ids[0] - 1)
+    while cursor is not None:
+        response = client.get("/users/", params={"limit": 3, "cursor": cursor})
+        assert response.status_code == 200
+        page = response.json()
+        assert len(page) <= 3
+        seen += [user["id"] for user in page]
+        cursor = response.headers.get("X-Next-Cursor")
+    assert_includes_in_order(seen, user_ids)
+    assert client.get("/users/", params={"limit": 0}).status_code == 422
+
+@pytest.mark.parametrize("format", ["ndjson", "csv"])
+def test_users_export_streams_every_user(client, user_ids, monkeypatch, format):
+    # several server-side cursor partitions even on a small table
+    monkeypatch.setattr(export, "EXPORT_CHUNK_ROWS", 2)
+    with client.stream("GET", "/users/export", params={"format": format}) as response:
+        assert response.status_code == 200
+        body = response.read().decode()
+    if format == "csv":
+        assert response.headers["content-type"].startswith("text/csv")
+        rows = list(csv.DictReader(io.StringIO(body)))
+    else:
+        assert response.headers["content-type"] == "application/x-ndjson"
+        rows = [json.loads(line) for line in body.splitlines()]
+    assert_includes_in_order([int(row["id"]) for row in rows], user_ids)
+    assert {"id", "email", "created_at"} == set(rows[0])
+
+@pytest.fixture
+def posts(user_ids):
+    return [
+        *add_posts(user_ids[0], ["export"], content="mine, draft", published=False),
+        *add_posts(user_ids[1], ["export"], content="theirs, draft", published=False),
+        *add_posts(user_ids[1], ["export"], content="theirs, published"),
+    ]
+
+@pytest.mark.parametrize("encoding", ["identity", "gzip"])
+def test_posts_export_visibility_and_resume(client, posts, monkeypatch, encoding):
+    monkeypatch.setattr(export, "EXPORT_CHUNK_ROWS", 1)
+    mine_draft, theirs_draft, theirs_published = posts
+    # resume from just before this test's posts, so only they (and later ones) are exported
+    response = client.get("/posts/export", params={"after_id": mine_draft - 1}, headers={"Accept-Encoding": encoding})
+    assert response.status_code == 200
+    assert response.headers.get("content-encoding") == (encoding if encoding == "gzip" else None)
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    ids = [line["Post"]["id"] for line in lines]
+    assert ids == sorted(ids)
+    assert [id for id in ids if id in posts] == [mine_draft, theirs_published]
+    assert {"Post", "vote_count"} == set(lines[0])
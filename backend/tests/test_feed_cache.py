@@ -0,0 +1,94 @@
+# Conditional GETs and the shared feed page cache.
+import pytest
+from sqlalchemy import event
+from app import database
+from app.feed_cache import feed_cache
+from app.pagination import encode_cursor
+from conftest import add_posts, bearer
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    feed_cache.invalidate()
+
+@pytest.fixture
+def seeded(make_users):
+    user_ids = make_users(2, "etag")
+    post_ids = add_posts(user_ids[0], [f"etag {i}" for i in range(3)], content="conditional get")
+    return user_ids, post_ids
+
+@pytest.fixture
+def statements():
+    executed = []
+    def count(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+    engines = (database.engine, database.async_engine.sync_engine)
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", count)
+    yield executed
+    for engine in engines:
+        event.remove(engine, "before_cursor_execute", count)
+
+def test_post_etag(client, seeded):
+    (owner, _), post_ids = seeded
+    headers = bearer(owner)
+    response = client.get(f"/posts/{post_ids[0]}", headers=headers)
+    etag = response.headers["ETag"]
+    not_modified = client.get(f"/posts/{post_ids[0]}", headers={**headers, "If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert not_modified.headers["ETag"] == etag
+
+    # an edit bumps the post's version, a vote its vote_count; both change the ETag
+    payload = {"title": "etag edited", "content": "conditional get"}
+    assert client.put(f"/posts/{post_ids[0]}", json=payload, headers=headers).status_code == 204
+    edited = client.get(f"/posts/{post_ids[0]}", headers={**headers, "If-None-Match": etag})
+    assert edited.status_code == 200
+    assert edited.json()["Post"]["title"] == "etag edited"
+    client.post("/vote", json={"post_id": post_ids[0], "dir": 1}, headers=headers)
+    voted = client.get(f"/posts/{post_ids[0]}", headers={**headers, "If-None-Match": edited.headers["ETag"]})
+    assert voted.status_code == 200
+    assert voted.json()["vote_count"] == 1
+
+def test_feed_pages_are_shared_until_a_write(client, seeded, statements):
+    (owner, reader), post_ids = seeded
+    params = {"limit": 2, "cursor": encode_cursor(id=post_ids[0] - 1)}
+    # a caller's first feed page shows whether they have drafts (and warms the user cache)
+    client.get("/posts", params={"limit": 1}, headers=bearer(owner))
+    client.get("/posts", params={"limit": 1}, headers=bearer(reader))
+
+    first = client.get("/posts", params=params, headers=bearer(reader))
+    assert [post["Post"]["id"] for post in first.json()] == post_ids[:2]
+    statements.clear()
+    # another caller with no drafts gets the same page without a query, or a 304
+    second = client.get("/posts", params=params, headers=bearer(owner))
+    assert second.content == first.content
+    assert second.headers["X-Next-Cursor"] == first.headers["X-Next-Cursor"]
+    again = client.get("/posts", params=params, headers={**bearer(reader), "If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 304
+    assert statements == []
+
+    # a vote invalidates the page
+    client.post("/vote", json={"post_id": post_ids[1], "dir": 1}, headers=bearer(reader))
+    statements.clear()
+    refreshed = client.get("/posts", params=params, headers={**bearer(reader), "If-None-Match": first.headers["ETag"]})
+    assert refreshed.status_code == 200
+    assert [post["vote_count"] for post in refreshed.json()] == [0, 1]
+    assert len(statements) == 1
+
+def test_feed_with_drafts_is_not_shared(client, seeded):
+    (owner, reader), post_ids = seeded
+    params = {"limit": 3, "cursor": encode_cursor(id=post_ids[0] - 1)}
+    assert len(client.get("/posts", params=params, headers=bearer(reader)).json()) == 3
+    payload = {"title": "etag draft", "content": "conditional get", "published": False}
+    assert client.put(f"/posts/{post_ids[1]}", json=payload, headers=bearer(owner)).status_code == 204
+
+    for _ in range(2):
+        mine = client.get("/posts", params=params, headers=bearer(owner)).json()
+        assert [post["Post"]["id"] for post in mine] == post_ids
+        theirs = client.get("/posts", params=params, headers=bearer(reader)).json()
+        assert [post["Post"]["id"] for post in theirs] == [post_ids[0], post_ids[2]]
+
+@pytest.mark.parametrize("limit", [-1, 0, 101])
+def test_feed_limit_is_bounded(client, seeded, limit):
+    (owner, _), _ = seeded
+    assert client.get("/posts", params={"limit": limit}, headers=bearer(owner)).status_code == 422
@@ -0,0 +1,39 @@
+# The argon2 worker pool across app lifespans, and when it breaks.
+import uuid
+from concurrent.futures.process import BrokenProcessPool
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import delete
+from app import database, models, utils
+from app.main import app
+
+PASSWORD = "hashing-test-password"
+
+@pytest.fixture
+def email():
+    email = f"hashing-{uuid.uuid4().hex[:8]}@example.com"
+    yield email
+    with database.engine.begin() as conn:
+        conn.execute(delete(models.User).where(models.User.email == email))
+
+def test_pool_survives_lifespans(email):
+    with TestClient(app) as client:
+        assert client.post("/users", json={"email": email, "password": PASSWORD}).status_code == 201
+    # the first lifespan shut the pool down; the next one starts it again
+    with TestClient(app) as client:
+        assert client.post("/login", data={"username": email, "password": PASSWORD}).status_code == 200
+
+class BrokenExecutor:
+    def submit(self, fn, *args):
+        raise BrokenProcessPool("a worker died")
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+@pytest.mark.skipif(utils.hash_pool is None, reason="HASH_WORKERS=0 hashes inline")
+def test_broken_pool_is_busy(email, monkeypatch):
+    monkeypatch.setattr(utils.hash_pool, "_get_executor", lambda: BrokenExecutor())
+    with TestClient(app) as client:
+        response = client.post("/users", json={"email": email, "password": PASSWORD})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
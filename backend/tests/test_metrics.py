@@ -0,0 +1,51 @@
+# Request instrumentation: Server-Timing on every response, Prometheus series per route
+# template and the slow-query log. Runs against the database in .env.
+import logging
+import pytest
+from app import oauth2
+from app.config import settings
+from app.feed_cache import feed_cache
+from conftest import add_posts, bearer
+
+# Cold caches, so every request reaches the database
+@pytest.fixture(autouse=True)
+def empty_caches():
+    oauth2.user_cache.clear()
+    feed_cache.invalidate()
+
+@pytest.fixture
+def seeded(make_users):
+    [user_id] = make_users(1, "metrics")
+    [post_id] = add_posts(user_id, ["metrics"], content="instrumented")
+    return user_id, post_id
+
+def test_server_timing_counts_statements(client, seeded):
+    user_id, _ = seeded
+    response = client.get("/posts", params={"limit": 1}, headers=bearer(user_id))
+    assert response.status_code == 200
+    db, _ = response.headers["server-timing"].split(", ")
+    assert db.startswith("db;dur=")
+    # authenticated-user lookup + the feed page
+    assert db.endswith('desc="2 statements"')
+
+def test_prometheus_series_use_route_templates(client, seeded):
+    user_id, post_id = seeded
+    assert client.get(f"/posts/{post_id}", headers=bearer(user_id)).status_code == 200
+    body = client.get("/metrics").text
+    assert 'http_request_duration_seconds_count{method="GET",route="/posts/{id}"}' in body
+    assert 'http_requests_total{method="GET",route="/posts/{id}",status="200"}' in body
+    assert f"/posts/{post_id}" not in body
+
+def test_slow_query_log(client, seeded, caplog, monkeypatch):
+    user_id, _ = seeded
+    monkeypatch.setattr(settings, "slow_query_ms", 0.001)
+    with caplog.at_level(logging.WARNING, logger="app.slow_query"):
+        client.get("/posts", params={"limit": 1}, headers=bearer(user_id))
+    assert any("on /posts/" in record.getMessage() and "FROM posts" in record.getMessage() for record in caplog.records)
+
+def test_unknown_methods_share_a_series(client):
+    for method in ("BREW", "WHEN"):
+        client.request(method, "/posts/1")
+    body = client.get("/metrics").text
+    assert 'http_requests_total{method="OTHER",route="unmatched",status="405"}' in body
+    assert "BREW" not in body and "WHEN" not in body
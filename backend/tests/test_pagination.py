@@ -0,0 +1,46 @@
+# Keyset cursors: what encode_cursor produces decodes back, anything forged is a 400.
+import base64
+import json
+import pytest
+from fastapi import HTTPException
+from app.pagination import decode_cursor, encode_cursor
+from conftest import bearer
+
+def forged(raw: str) -> str:
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def test_round_trip():
+    assert decode_cursor(encode_cursor(id=42), "id") == (42,)
+    assert decode_cursor(encode_cursor(rank=0.0607927, id=7), "rank", "id") == (0.0607927, 7)
+    assert decode_cursor(encode_cursor(score=-3.5, id=2**31 - 1), "score", "id") == (-3.5, 2**31 - 1)
+
+@pytest.mark.parametrize("cursor, fields", [
+    ("not base64!", ("id",)),
+    (forged("[1]"), ("id",)),
+    (forged('{"rank": 1.0}'), ("rank", "id")),
+    (forged('{"id": "1"}'), ("id",)),
+    (forged('{"id": true}'), ("id",)),
+    (forged('{"id": 1.5}'), ("id",)),
+    (forged('{"id": 1e300}'), ("id",)),
+    (forged(json.dumps({"id": 10**30})), ("id",)),
+    (forged(json.dumps({"id": 2**31})), ("id",)),
+    (forged('{"score": NaN, "id": 1}'), ("score", "id")),
+    (forged('{"rank": Infinity, "id": 1}'), ("rank", "id")),
+    (forged('{"rank": 1e400, "id": 1}'), ("rank", "id")),
+])
+def test_forged_cursors_are_rejected(cursor, fields):
+    with pytest.raises(HTTPException) as e:
+        decode_cursor(cursor, *fields)
+    assert e.value.status_code == 400
+
+@pytest.mark.parametrize("path, raw, params", [
+    ("/posts", '{"id": 1e300}', {}),
+    ("/posts", '{"rank": NaN, "id": 1}', {"search": "alpha"}),
+    ("/users", json.dumps({"id": 10**30}), {}),
+    ("/posts/trending", '{"score": Infinity, "id": 1}', {}),
+    ("/feed", '{"id": -1e300}', {}),
+])
+def test_routes_answer_400(client, make_users, path, raw, params):
+    [user_id] = make_users(1, "cursor")
+    response = client.get(path, params={**params, "cursor": forged(raw)}, headers=bearer(user_id))
+    assert response.status_code == 400
@@ -0,0 +1,91 @@
+# Statement budgets per endpoint, so an N+1 (e.g. lazy-loading each post's owner
+# while serializing a feed page) fails the build. Runs against the database in .env.
+import pytest
+from sqlalchemy import event
+from app import database, oauth2, refresh_tokens
+from app.config import settings
+from app.feed_cache import feed_cache
+from app.pagination import encode_cursor
+from conftest import add_posts, bearer
+
+OWNERS = 5
+
+@pytest.fixture
+def seeded(make_users):
+    user_ids = make_users(OWNERS, "count")
+    post_ids = [add_posts(user_id, [f"count {user_id}"], content="statement budget")[0] for user_id in user_ids]
+    return user_ids, post_ids
+
+# The shared client, signed in as the first seeded user
+@pytest.fixture
+def client(client, seeded):
+    user_ids, _ = seeded
+    client.headers.update(bearer(user_ids[0]))
+    return client
+
+@pytest.fixture
+def statements():
+    executed = []
+    def count(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+    engines = (database.engine, database.async_engine.sync_engine)
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", count)
+    # start every request cold, so the authenticated-user lookup and the feed query are counted too
+    oauth2.user_cache.clear()
+    feed_cache.invalidate()
+    yield executed
+    for engine in engines:
+        event.remove(engine, "before_cursor_execute", count)
+
+def test_feed_page_is_constant(client, seeded, statements):
+    _, post_ids = seeded
+    response = client.get("/posts", params={"limit": OWNERS, "cursor": encode_cursor(id=min(post_ids) - 1)})
+    assert response.status_code == 200
+    assert len({post["Post"]["owner"]["id"] for post in response.json()}) == OWNERS
+    assert len(statements) <= 2, statements
+
+def test_single_post(client, seeded, statements):
+    _, post_ids = seeded
+    assert client.get(f"/posts/{post_ids[-1]}").status_code == 200
+    assert len(statements) <= 2, statements
+
+def test_users(client, seeded, statements):
+    user_ids, _ = seeded
+    assert client.get(f"/users/{user_ids[1]}").status_code == 200
+    assert len(statements) <= 2, statements
+
+def test_create_post(client, statements):
+    response = client.post("/posts", json={"title": "count", "content": "statement budget"})
+    assert response.status_code == 201
+    # user, insert, fan-out to followers' timelines, reload with the owner
+    assert len(statements) <= 4, statements
+
+def test_vote(client, seeded, statements):
+    _, post_ids = seeded
+    assert client.post("/vote", json={"post_id": post_ids[1], "dir": 1}).status_code == 201
+    assert len(statements) <= 2, statements
+
+@pytest.mark.parametrize("size", [10, settings.post_batch_copy_threshold])
+def test_create_posts_batch(client, statements, size):
+    body = [{"title": f"count {i}", "content": "statement budget"} for i in range(size)]
+    response = client.post("/posts/batch", json=body)
+    assert response.status_code == 201
+    assert len(response.json()["ids"]) == size
+    # user, insert or COPY, fan-out to followers' timelines
+    assert len(statements) <= 3, statements
+
+def test_users_page(client, statements):
+    assert client.get("/users/", params={"limit": 50}).status_code == 200
+    assert len(statements) <= 2, statements
+
+def test_token_refresh(client, seeded, statements):
+    user_ids, _ = seeded
+    token, (statement, params) = refresh_tokens.issue(user_ids[0])
+    with database.engine.begin() as conn:
+        conn.execute(statement, params)
+    statements.clear()
+    response = client.post("/token/refresh", json={"refresh_token": token})
+    assert response.status_code == 200
+    # rotation and the new token in one statement; no user lookup, no password hashing
+    assert len(statements) <= 1, statements
@@ -0,0 +1,169 @@
+# EXPLAIN the hot statements against a seeded table and fail if any of them has to
+# read all of posts or votes. Seeding happens in a transaction that is rolled back.
+import pytest
+from psycopg import sql
+from sqlalchemy import select, text
+from sqlalchemy.dialects.postgresql import psycopg
+from app import database, models, queries, timeline, vote_buffer
+from app.pagination import encode_cursor
+
+USERS = 100
+POSTS = 50_000
+VOTERS = 20
+RARE_POSTS = 5
+
+@pytest.fixture(scope="module")
+def conn():
+    with database.engine.connect() as conn:
+        trans = conn.begin()
+        user_ids = list(conn.execute(text("""
+            INSERT INTO users (email, password)
+            SELECT 'plan-' || g || '-' || md5(random()::text) || '@example.com', 'x'
+            FROM generate_series(1, :users) AS g
+            RETURNING id
+        """), {"users": USERS}).scalars())
+        # one post in ten is a draft, spread across all users
+        conn.execute(text("""
+            INSERT INTO posts (title, content, published, user_id)
+            SELECT 'plan ' || g, 'query plan test', g % 10 <> 0, (CAST(:user_ids AS int[]))[1 + g % :users]
+            FROM generate_series(1, :posts) AS g
+        """), {"user_ids": user_ids, "users": USERS, "posts": POSTS})
+        # a handful of posts with words no other title has, for the search plan
+        conn.execute(text("""
+            INSERT INTO posts (title, content, user_id)
+            SELECT 'quokka sighting ' || g, 'rare words', :user_id FROM generate_series(1, :rare) AS g
+        """), {"user_id": user_ids[1], "rare": RARE_POSTS})
+        conn.execute(text("""
+            INSERT INTO votes (user_id, post_id)
+            SELECT u, p.id FROM unnest(CAST(:voters AS int[])) AS u
+            CROSS JOIN (SELECT id FROM posts WHERE user_id = ANY(CAST(:user_ids AS int[])) LIMIT 1000) AS p
+        """), {"voters": user_ids[:VOTERS], "user_ids": user_ids})
+        # the first user follows everyone else; every user has a full timeline
+        conn.execute(text("""
+            INSERT INTO follows (follower_id, followee_id)
+            SELECT :reader, u FROM unnest(CAST(:user_ids AS int[])) AS u WHERE u <> :reader
+        """), {"reader": user_ids[0], "user_ids": user_ids})
+        conn.execute(text("""
+            INSERT INTO timeline (user_id, post_id)
+            SELECT u, recent.id FROM unnest(CAST(:user_ids AS int[])) AS u
+            CROSS JOIN LATERAL (
+                SELECT id FROM posts WHERE user_id = ANY(CAST(:user_ids AS int[])) AND user_id <> u
+                ORDER BY id DESC LIMIT 800
+            ) AS recent
+        """), {"user_ids": user_ids})
+        # rows inserted in this transaction sit in the GIN pending lists, which the planner
+        # charges to every search; merge them, as autovacuum would on a live table
+        conn.execute(text("""
+            SELECT gin_clean_pending_list(index)
+            FROM unnest(ARRAY[to_regclass('ix_posts_search_vector'), to_regclass('ix_posts_title_trgm')]) AS index
+            WHERE index IS NOT NULL
+        """))
+        conn.execute(text("ANALYZE users, posts, votes, follows, timeline"))
+        conn.info["user_ids"] = user_ids
+        yield conn
+        trans.rollback()
+
+def plan(conn, statement) -> str:
+    sql = statement.compile(conn.engine, compile_kwargs={"literal_binds": True})
+    return "\n".join(conn.exec_driver_sql(f"EXPLAIN {sql}").scalars())
+
+def assert_no_seq_scan(conn, statement):
+    explained = plan(conn, statement)
+    for table in ("posts", "votes"):
+        assert f"Seq Scan on {table}" not in explained, explained
+
+# The plan a prepared statement settles on once Postgres stops planning it per execution
+def generic_plan(conn, statement, params: dict) -> str:
+    compiled = statement.compile(dialect=psycopg.dialect(paramstyle="numeric_dollar"))
+    values = compiled.construct_params(params)
+    conn.exec_driver_sql(f"PREPARE plan_test AS {compiled.string}")
+    try:
+        conn.exec_driver_sql("SET LOCAL plan_cache_mode = force_generic_plan")
+        # EXECUTE is a utility statement, so its arguments can't be bound server side
+        driver_conn = conn.connection.driver_connection
+        arguments = ", ".join(sql.Literal(values[name]).as_string(driver_conn) for name in compiled.positiontup)
+        return "\n".join(conn.exec_driver_sql(f"EXPLAIN EXECUTE plan_test({arguments})").scalars())
+    finally:
+        conn.exec_driver_sql("DEALLOCATE plan_test")
+        conn.exec_driver_sql("RESET plan_cache_mode")
+
+# The first user's posts are all drafts; the second has hundreds of published posts and no
+# drafts, so the drafts check must not walk them
+VIEWERS = [0, 1]
+
+@pytest.mark.parametrize("viewer", VIEWERS)
+@pytest.mark.parametrize("cursor", [None, encode_cursor(id=POSTS // 2)])
+def test_feed_page(conn, cursor, viewer):
+    statement, params = queries.feed_page(conn.info["user_ids"][viewer], 10, 0, cursor, "")
+    explained = plan(conn, statement.params(params))
+    for table in ("posts", "votes"):
+        assert f"Seq Scan on {table}" not in explained, explained
+    assert "ix_posts_user_id_drafts" in explained, explained
+
+@pytest.mark.parametrize("viewer", VIEWERS)
+@pytest.mark.parametrize("cursor", [None, encode_cursor(id=POSTS // 2)])
+def test_feed_page_generic_plan(conn, cursor, viewer):
+    statement, params = queries.feed_page(conn.info["user_ids"][viewer], 10, 0, cursor, "")
+    explained = generic_plan(conn, statement, params)
+    assert "Seq Scan on posts" not in explained, explained
+    assert "ix_posts_user_id_drafts" in explained, explained
+
+# Pulling every followee at read time is the worst case: one index range per author
+@pytest.mark.parametrize("cursor", [None, encode_cursor(id=POSTS // 2)])
+@pytest.mark.parametrize("pull_min_followers", [1, 10_000])
+def test_timeline_page_generic_plan(conn, cursor, pull_min_followers):
+    statement, params = timeline.page(conn.info["user_ids"][0], 10, cursor)
+    explained = generic_plan(conn, statement, {**params, "pull_min_followers": pull_min_followers})
+    for table in ("posts", "timeline"):
+        assert f"Seq Scan on {table}" not in explained, explained
+
+# Straight off the index, already in order: no sort, and no scoring of every post
+@pytest.mark.parametrize("cursor", [None, encode_cursor(score=1e6, id=POSTS // 2)])
+def test_trending_page_generic_plan(conn, cursor):
+    statement, params = queries.trending_page(10, cursor)
+    explained = generic_plan(conn, statement, params)
+    assert "Index Scan Backward using ix_posts_published_hot_score" in explained, explained
+    assert "Sort" not in explained, explained
+
+def test_hot_statements_generic_plan(conn):
+    post_id = conn.execute(select(models.Vote.post_id).limit(1)).scalar_one()
+    user_id = conn.info["user_ids"][0]
+    for statement, params in (
+        (queries.POST_BY_ID, {"id": post_id}),
+        (queries.USER_BY_ID, {"id": user_id}),
+        (queries.VOTE_DELETE, {"user_id": user_id, "post_id": post_id}),
+    ):
+        explained = generic_plan(conn, statement, params)
+        for table in ("posts", "votes"):
+            assert f"Seq Scan on {table}" not in explained, explained
+
+def test_posts_by_owner(conn):
+    # also the lookup behind ON DELETE CASCADE from users
+    assert_no_seq_scan(conn, select(models.Post.id).where(models.Post.user_id == conn.info["user_ids"][0]))
+
+def test_votes_by_post(conn):
+    # also the lookup behind ON DELETE CASCADE from posts
+    post_id = conn.execute(select(models.Vote.post_id).limit(1)).scalar_one()
+    assert_no_seq_scan(conn, select(models.Vote).where(models.Vote.post_id == post_id))
+
+# Concurrent vote flushes must lock rows in the same order the insert writes them
+def test_vote_flush_delete_locks_in_key_order(conn):
+    keys = conn.execute(select(models.Vote.user_id, models.Vote.post_id).limit(50)).all()
+    statement = text(f"EXPLAIN {vote_buffer.FLUSH_DELETE.text}")
+    explained = [line.strip() for line in conn.execute(statement, vote_buffer._columns(keys)).scalars()]
+    lock = next(i for i, line in enumerate(explained) if "LockRows" in line)
+    assert explained[lock + 1].startswith("->  Sort"), "\n".join(explained)
+    assert explained[lock + 2] == "Sort Key: votes_1.post_id, votes_1.user_id", "\n".join(explained)
+
+# Both arms of the search filter come off their GIN index; pg_trgm is an optional extension
+@pytest.mark.parametrize("search", ["quokka", "sighting 3", "okka sigh"])
+def test_search_page(conn, search):
+    if conn.scalar(text("SELECT to_regclass('ix_posts_title_trgm')")) is None:
+        pytest.skip("ix_posts_title_trgm needs the pg_trgm extension")
+    statement, params = queries.feed_page(conn.info["user_ids"][1], 10, 0, None, search)
+    # with its parameters bound, as get_posts runs it: a regconfig can't be a literal bind
+    compiled = statement.compile(dialect=psycopg.dialect())
+    explained = "\n".join(conn.exec_driver_sql(f"EXPLAIN {compiled.string}", compiled.construct_params(params)).scalars())
+    assert "Bitmap Index Scan on ix_posts_search_vector" in explained, explained
+    assert "Bitmap Index Scan on ix_posts_title_trgm" in explained, explained
+    assert "Seq Scan on posts" not in explained, explained
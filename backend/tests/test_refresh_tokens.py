@@ -0,0 +1,73 @@
+# Rotating refresh tokens: POST /login, /token/refresh and /token/revoke.
+import pytest
+from sqlalchemy import func, select
+from app import database, models, utils
+
+PASSWORD = "refresh-test-password"
+
+@pytest.fixture
+def user(make_users):
+    [user_id] = make_users(1, "refresh", password=utils.get_password_hash(PASSWORD))
+    with database.engine.connect() as conn:
+        return user_id, conn.scalar(select(models.User.email).where(models.User.id == user_id))
+
+def login(client, email: str) -> dict:
+    response = client.post("/login", data={"username": email, "password": PASSWORD})
+    assert response.status_code == 200
+    return response.json()
+
+def refresh(client, token: str):
+    return client.post("/token/refresh", json={"refresh_token": token})
+
+def authorized(client, tokens: dict, user_id: int) -> bool:
+    response = client.get(f"/users/{user_id}", headers={"Authorization": f"Bearer {tokens['access_token']}"})
+    return response.status_code == 200
+
+def test_refresh_rotates(client, user):
+    user_id, email = user
+    first = login(client, email)
+    response = refresh(client, first["refresh_token"])
+    assert response.status_code == 200
+    second = response.json()
+    assert second["refresh_token"] != first["refresh_token"]
+    assert authorized(client, second, user_id)
+    # only hashes are stored
+    with database.engine.connect() as conn:
+        stored = conn.scalars(select(models.RefreshToken.token_hash).where(models.RefreshToken.user_id == user_id)).all()
+    assert len(stored) == 2
+    assert first["refresh_token"].encode() not in stored
+
+    assert refresh(client, second["refresh_token"]).status_code == 200
+    assert refresh(client, "not a token").status_code == 401
+
+def test_reuse_revokes_the_family(client, user):
+    _, email = user
+    other_session = login(client, email)
+    first = login(client, email)
+    second = refresh(client, first["refresh_token"]).json()
+    # the replaced token comes back: whoever holds the newest one loses it too
+    assert refresh(client, first["refresh_token"]).status_code == 401
+    assert refresh(client, second["refresh_token"]).status_code == 401
+    # other logins are untouched
+    assert refresh(client, other_session["refresh_token"]).status_code == 200
+
+def test_revoke(client, user):
+    _, email = user
+    tokens = login(client, email)
+    other_session = login(client, email)
+    assert client.post("/token/revoke", json={"refresh_token": tokens["refresh_token"]}).status_code == 204
+    assert refresh(client, tokens["refresh_token"]).status_code == 401
+    assert refresh(client, other_session["refresh_token"]).status_code == 200
+
+def test_password_change_revokes_every_session(client, user):
+    user_id, email = user
+    tokens = login(client, email)
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    response = client.put(f"/users/{user_id}", json={"email": email, "password": PASSWORD}, headers=headers)
+    assert response.status_code == 200
+    assert refresh(client, tokens["refresh_token"]).status_code == 401
+    with database.engine.connect() as conn:
+        live = conn.scalar(select(func.count()).where(
+            models.RefreshToken.user_id == user_id, models.RefreshToken.revoked_at.is_(None)
+        ))
+    assert live == 0
@@ -0,0 +1,28 @@
+# The feed's fast serialization path must produce exactly what response_model would.
+from pydantic import TypeAdapter
+from sqlalchemy import insert
+from sqlalchemy.orm import joinedload
+from app import database, models, queries, schemas, serialization
+from conftest import add_posts
+
+def test_fast_path_matches_response_model(make_users):
+    owner, voter = make_users(2, "serialize")
+    post_ids = [
+        *add_posts(owner, ["serialized", "serialized, quoted \"title\" é"], content="fast path"),
+        *add_posts(owner, ["serialized draft"], content="fast path", published=False),
+    ]
+    with database.engine.begin() as conn:
+        conn.execute(insert(models.Vote), [{"user_id": voter, "post_id": post_ids[0]}])
+    with database.SessionLocal() as db:
+        orm_rows = db.query(models.Post, models.Post.vote_count).options(
+            joinedload(models.Post.owner)
+        ).filter(models.Post.id.in_(post_ids)).order_by(models.Post.id).all()
+        column_rows = db.query(*queries.POST_WITH_VOTES_COLUMNS).join(
+            models.Post.owner
+        ).filter(models.Post.id.in_(post_ids)).order_by(models.Post.id).all()
+    assert len(orm_rows) == len(post_ids)
+
+    adapter = TypeAdapter(list[schemas.PostWithVotes])
+    expected = adapter.dump_json(adapter.validate_python(orm_rows, from_attributes=True))
+    fast = serialization.json_response([serialization.post_with_votes(row) for row in column_rows]).body
+    assert fast == expected
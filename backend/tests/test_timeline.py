@@ -0,0 +1,99 @@
+# Follows and the fanned-out home timeline behind GET /feed.
+import pytest
+from sqlalchemy import func, select
+from app import database, models
+from app.config import settings
+from conftest import bearer
+
+@pytest.fixture
+def users(make_users):
+    return make_users(3, "timeline")
+
+def publish(client, author: int, title: str, published: bool = True) -> int:
+    response = client.post("/posts", json={"title": title, "content": "timeline", "published": published}, headers=bearer(author))
+    assert response.status_code == 201
+    return response.json()["id"]
+
+def feed_titles(client, reader: int, **params) -> list[str]:
+    response = client.get("/feed", params=params, headers=bearer(reader))
+    assert response.status_code == 200
+    return [post["Post"]["title"] for post in response.json()]
+
+def timeline_size(user_id: int) -> int:
+    with database.engine.connect() as conn:
+        return conn.scalar(select(func.count()).where(models.TimelineEntry.user_id == user_id))
+
+def follower_count(user_id: int) -> int:
+    with database.engine.connect() as conn:
+        return conn.scalar(select(models.User.follower_count).where(models.User.id == user_id))
+
+def test_follow(client, users):
+    reader, author, _ = users
+    assert client.post(f"/users/{author}/follow", headers=bearer(reader)).status_code == 201
+    assert client.post(f"/users/{author}/follow", headers=bearer(reader)).status_code == 200
+    assert follower_count(author) == 1
+    assert client.post(f"/users/{reader}/follow", headers=bearer(reader)).status_code == 400
+    assert client.post("/users/-1/follow", headers=bearer(reader)).status_code == 404
+
+    assert client.delete(f"/users/{author}/follow", headers=bearer(reader)).status_code == 204
+    assert client.delete(f"/users/{author}/follow", headers=bearer(reader)).status_code == 204
+    assert follower_count(author) == 0
+
+def test_posts_fan_out_to_followers(client, users):
+    reader, author, stranger = users
+    old = publish(client, author, "before the follow")
+    publish(client, stranger, "not followed")
+    client.post(f"/users/{author}/follow", headers=bearer(reader))
+    # the follow backfills what the author already published
+    assert feed_titles(client, reader) == ["before the follow"]
+
+    draft = publish(client, author, "draft", published=False)
+    publish(client, author, "after the follow")
+    assert feed_titles(client, reader) == ["after the follow", "before the follow"]
+    assert timeline_size(reader) == 2
+
+    # publishing the draft fans it out then; unpublishing hides it again
+    payload = {"title": "draft", "content": "timeline", "published": True}
+    client.put(f"/posts/{draft}", json=payload, headers=bearer(author))
+    assert feed_titles(client, reader) == ["after the follow", "draft", "before the follow"]
+    client.put(f"/posts/{old}", json={**payload, "title": "before the follow", "published": False}, headers=bearer(author))
+    assert feed_titles(client, reader) == ["after the follow", "draft"]
+
+    # keyset pages, newest first
+    response = client.get("/feed", params={"limit": 1}, headers=bearer(reader))
+    cursor = response.headers["X-Next-Cursor"]
+    assert feed_titles(client, reader, limit=1, cursor=cursor) == ["draft"]
+
+    client.delete(f"/users/{author}/follow", headers=bearer(reader))
+    assert feed_titles(client, reader) == []
+    assert timeline_size(reader) == 0
+
+def test_big_accounts_are_pulled(client, users, monkeypatch):
+    reader, author, other = users
+    client.post(f"/users/{author}/follow", headers=bearer(reader))
+    client.post(f"/users/{other}/follow", headers=bearer(reader))
+    publish(client, author, "fanned out")
+    publish(client, other, "other account")
+
+    # the author now counts as big: their posts stay out of timelines and are read directly
+    monkeypatch.setattr(settings, "timeline_pull_min_followers", 1)
+    publish(client, author, "pulled")
+    assert timeline_size(reader) == 2
+    # no duplicate for the post fanned out before the author crossed the threshold
+    assert feed_titles(client, reader) == ["pulled", "other account", "fanned out"]
+    response = client.get("/feed", params={"limit": 2}, headers=bearer(reader))
+    cursor = response.headers["X-Next-Cursor"]
+    assert feed_titles(client, reader, limit=2, cursor=cursor) == ["fanned out"]
+
+def test_timelines_are_trimmed(client, users, monkeypatch):
+    reader, author, _ = users
+    monkeypatch.setattr(settings, "timeline_max_entries", 3)
+    monkeypatch.setattr(settings, "timeline_trim_every", 1)
+    client.post(f"/users/{author}/follow", headers=bearer(reader))
+    titles = [f"post {i}" for i in range(5)]
+    response = client.post("/posts/batch", json=[{"title": title, "content": "timeline"} for title in titles], headers=bearer(author))
+    assert response.status_code == 201
+    # a fan-out trims what was there before it, so the newest 3 are kept besides the new post
+    publish(client, author, "post 5")
+    assert timeline_size(reader) == 4
+    assert feed_titles(client, reader) == ["post 5", "post 4", "post 3", "post 2"]
@@ -0,0 +1,48 @@
+# GET /posts/trending: published posts by votes decayed by age.
+from datetime import datetime, timedelta, timezone
+import pytest
+from sqlalchemy import insert
+from app import database, models
+from conftest import add_posts, bearer
+
+NOW = datetime.now(timezone.utc)
+
+@pytest.fixture
+def seeded(make_users):
+    user_ids = make_users(8, "trending")
+    # far in the future, so these outrank whatever else the database holds
+    future = NOW + timedelta(days=3650)
+    post_ids = {
+        "fresh": add_posts(user_ids[0], ["fresh"], content="trending", created_at=future)[0],
+        # 12 hours older with 4 votes: two doublings, worth 24 hours of recency
+        "popular": add_posts(user_ids[0], ["popular"], content="trending", created_at=future - timedelta(hours=12))[0],
+        # 30 hours older: 4 votes aren't enough to catch up, 8 are
+        "stale": add_posts(user_ids[0], ["stale"], content="trending", created_at=future - timedelta(hours=30))[0],
+        "draft": add_posts(user_ids[0], ["draft"], content="trending", created_at=future, published=False)[0],
+    }
+    with database.engine.begin() as conn:
+        conn.execute(insert(models.Vote), [
+            {"user_id": user_id, "post_id": post_ids[title]} for title in ("popular", "stale") for user_id in user_ids[:4]
+        ])
+    return user_ids, post_ids
+
+def trending(client, user_id: int, **params):
+    response = client.get("/posts/trending", params=params, headers=bearer(user_id))
+    assert response.status_code == 200
+    return [post["Post"]["title"] for post in response.json()], response.headers.get("X-Next-Cursor")
+
+def test_trending(client, seeded):
+    user_ids, _ = seeded
+    titles, _ = trending(client, user_ids[0], limit=3)
+    assert titles == ["popular", "fresh", "stale"]
+
+    first, cursor = trending(client, user_ids[0], limit=2)
+    assert first == ["popular", "fresh"]
+    assert trending(client, user_ids[0], limit=2, cursor=cursor)[0][:1] == ["stale"]
+    assert client.get("/posts/trending", params={"limit": 0}, headers=bearer(user_ids[0])).status_code == 422
+
+def test_votes_move_scores(client, seeded):
+    user_ids, post_ids = seeded
+    for user_id in user_ids[4:]:
+        assert client.post("/vote", json={"post_id": post_ids["stale"], "dir": 1}, headers=bearer(user_id)).status_code == 201
+    assert trending(client, user_ids[0], limit=3)[0] == ["popular", "stale", "fresh"]
@@ -0,0 +1,106 @@
+# Write-behind votes: buffered intents, the user's own view of them, and the flush.
+import asyncio
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+from app import database, models
+from app.config import settings
+from app.main import app
+from app.vote_buffer import VoteBuffer, vote_buffer
+from conftest import add_posts, bearer
+
+@pytest.fixture
+def seeded(make_users):
+    [user_id] = make_users(1, "buffer")
+    return user_id, add_posts(user_id, ["buffer 0", "buffer 1"], content="write-behind")
+
+@pytest.fixture
+def write_behind(monkeypatch):
+    monkeypatch.setattr(settings, "vote_write_behind", True)
+    # nothing is flushed during the test unless it asks for it
+    monkeypatch.setattr(settings, "vote_flush_interval_ms", 60_000)
+    assert len(vote_buffer) == 0
+
+def vote_counts(post_ids: list[int]) -> list[int]:
+    with database.engine.connect() as conn:
+        return [conn.scalar(select(models.Post.vote_count).where(models.Post.id == id)) for id in post_ids]
+
+def test_votes_are_buffered_and_flushed_on_shutdown(seeded, write_behind):
+    user_id, post_ids = seeded
+    with TestClient(app, headers=bearer(user_id)) as client:
+        # last intent per (user, post) wins
+        for dir in (1, 0, 1):
+            assert client.post("/vote", json={"post_id": post_ids[0], "dir": dir}).status_code == 202
+        assert client.post("/vote", json={"post_id": post_ids[1], "dir": 1}).status_code == 202
+        assert client.post("/vote", json={"post_id": post_ids[1], "dir": 0}).status_code == 202
+        assert client.post("/vote", json={"post_id": -1, "dir": 1}).status_code == 404
+        assert len(vote_buffer) == 2
+
+        # not written yet, but the voter already sees their own votes
+        assert vote_counts(post_ids) == [0, 0]
+        assert client.get(f"/vote/{post_ids[0]}").json()["voted"] is True
+        assert client.get(f"/vote/{post_ids[1]}").json()["voted"] is False
+    assert len(vote_buffer) == 0
+    assert vote_counts(post_ids) == [1, 0]
+
+    with TestClient(app, headers=bearer(user_id)) as client:
+        assert client.get(f"/vote/{post_ids[0]}").json()["voted"] is True
+        client.post("/vote", json={"post_id": post_ids[0], "dir": 0})
+    assert vote_counts(post_ids) == [0, 0]
+
+def test_flush_skips_deleted_posts(seeded):
+    user_id, post_ids = seeded
+    buffer = VoteBuffer(max_items=10, max_pending=10)
+    buffer.add(user_id, post_ids[0], 1)
+    buffer.add(user_id, -1, 1)
+    assert buffer.flush() == 2
+    assert buffer.pending(user_id, post_ids[0]) is None
+    assert vote_counts(post_ids) == [1, 0]
+
+def test_full_buffer_rejects_new_votes(seeded):
+    user_id, post_ids = seeded
+    buffer = VoteBuffer(max_items=10, max_pending=1)
+    buffer.add(user_id, post_ids[0], 1)
+    # changing a buffered vote still fits
+    buffer.add(user_id, post_ids[0], 0)
+    with pytest.raises(HTTPException) as e:
+        buffer.add(user_id, post_ids[1], 1)
+    assert e.value.status_code == 503
+
+def test_batch_being_flushed_counts_against_the_cap(seeded, monkeypatch):
+    user_id, post_ids = seeded
+    buffer = VoteBuffer(max_items=10, max_pending=1)
+    buffer.add(user_id, post_ids[0], 1)
+
+    class DatabaseDown:
+        def begin(self):
+            # the failed batch is about to come back, so there is no room meanwhile
+            with pytest.raises(HTTPException) as e:
+                buffer.add(user_id, post_ids[1], 1)
+            assert e.value.status_code == 503
+            raise ConnectionError("database down")
+
+    monkeypatch.setattr(database, "engine", DatabaseDown())
+    with pytest.raises(ConnectionError):
+        buffer.flush()
+    assert len(buffer) == 1
+    assert buffer.pending(user_id, post_ids[0]) == 1
+
+def test_full_buffer_wakes_a_flusher_started_later(seeded):
+    user_id, post_ids = seeded
+    buffer = VoteBuffer(max_items=1, max_pending=10)
+    buffer.add(user_id, post_ids[0], 1)
+
+    async def flushed() -> bool:
+        task = asyncio.create_task(buffer.run(interval=60))
+        try:
+            async with asyncio.timeout(5):
+                while len(buffer):
+                    await asyncio.sleep(0.01)
+            return True
+        finally:
+            task.cancel()
+
+    assert asyncio.run(flushed())
+    assert vote_counts(post_ids) == [1, 0]